@@ -81,6 +81,7 @@ from .widgets.node_properties import NodePropertiesWindow
 from .widgets.console import ConsoleManager, InternalObjectDescriptor
 from .widgets.subscriber import SubscriberWindow
 from .widgets.plotter import PlotterManager
+from .widgets.time_cursor import TimeCursorBroker
 from .widgets.about_window import AboutWindow
 from .widgets.can_adapter_control_panel import spawn_window as spawn_can_adapter_control_panel
 
@@ -122,8 +123,9 @@ class MainWindow(QMainWindow):
                                                                                self._node_monitor_widget.monitor)
         self._file_server_widget = FileServerWidget(self, node)
 
-        self._plotter_manager = PlotterManager(self._node)
-        self._bus_monitor_manager = BusMonitorManager(self._node, iface_name)
+        self._time_cursor_broker = TimeCursorBroker(self)
+        self._plotter_manager = PlotterManager(self._node, self._time_cursor_broker)
+        self._bus_monitor_manager = BusMonitorManager(self._node, iface_name, self._time_cursor_broker)
         # Console manager depends on other stuff via context, initialize it last
         self._console_manager = ConsoleManager(self._make_console_context)
 
@@ -530,7 +532,8 @@ class MainWindow(QMainWindow):
             del self._node_windows[node_id]
 
         w = NodePropertiesWindow(self, self._node, node_id, self._file_server_widget,
-                                 self._node_monitor_widget.monitor, self._dynamic_node_id_allocation_widget)
+                                 self._node_monitor_widget.monitor, self._dynamic_node_id_allocation_widget,
+                                 self._node_monitor_widget.history)
         w.show()
         self._node_windows[node_id] = w
 
@@ -56,10 +56,12 @@ class BasicTable(QTableWidget):
             self.searchable = searchable
             self.filterable = filterable if filterable is not None else self.searchable
 
-    def __init__(self, parent, columns, multi_line_rows=False, font=None):
+    def __init__(self, parent, columns, multi_line_rows=False, font=None, keep_row_models=False):
+        """If keep_row_models is set, the model of every row is retained for get_row_model()."""
         super(BasicTable, self).__init__(parent)
 
         self.columns = columns
+        self._keep_row_models = keep_row_models
 
         self.filter = None
 
@@ -122,10 +124,17 @@ class BasicTable(QTableWidget):
                 w.setBackground(color)
             w.setTextAlignment(Qt.AlignVCenter | Qt.AlignLeft)
             w.setFlags(Qt.ItemIsSelectable | Qt.ItemIsEnabled)
+            if col == 0 and self._keep_row_models:
+                w.setData(Qt.UserRole, model)
             self.setItem(row, col, w)
 
         self.setRowHidden(row, not self.apply_filter_to_row(row))
 
+    def get_row_model(self, row):
+        """Returns the model object the row was rendered from, or None if row models are not kept."""
+        item = self.item(row, 0)
+        return item.data(Qt.UserRole) if item is not None else None
+
     def keyPressEvent(self, qkeyevent):
         if qkeyevent.matches(QKeySequence.Copy):
             selected_rows = [x.row() for x in self.selectionModel().selectedRows()]
@@ -243,6 +252,39 @@ class SearchMatcher:
         return out if not self.inverse else not out
 
 
+class ExpressionMatcher:
+    """
+    Matches structured data rather than text, e.g. "msg.esc_index == 3". The expression is compiled once.
+    Variables available to the expression are defined by the user of the filter.
+    A missing field is not an error, the object just does not match; on_error(exception) is invoked on the first
+    failure of any other kind.
+    """
+    BadPatternException = SearchMatcher.BadPatternException
+
+    def __init__(self, source, inverse=False):
+        self.source = source.strip()
+        self.inverse = inverse
+        self.on_error = lambda _: None
+        self._error_reported = False
+        try:
+            self._compiled = compile(self.source, '<filter-expression>', 'eval')
+        except Exception as ex:
+            raise self.BadPatternException(str(ex))
+
+    def match_fields(self, **variables):
+        try:
+            out = bool(eval(self._compiled, {}, variables))
+        except (AttributeError, KeyError):
+            out = False         # The fields referred to by the expression may not exist in every object
+        except Exception as ex:
+            out = False
+            if not self._error_reported:
+                self._error_reported = True
+                logger.warning('Filter expression %r has failed', self.source, exc_info=True)
+                self.on_error(ex)
+        return out if not self.inverse else not out
+
+
 class SearchMatcherChain:
     def __init__(self):
         self.matchers = []
@@ -250,11 +292,21 @@ class SearchMatcherChain:
     def append(self, m):
         self.matchers.append(m)
 
+    @property
+    def text_matchers(self):
+        return [m for m in self.matchers if isinstance(m, SearchMatcher)]
+
+    @property
+    def expression_matchers(self):
+        return [m for m in self.matchers if isinstance(m, ExpressionMatcher)]
+
     def match(self, text):
-        if len(self.matchers) > 0:
-            return all([m.match(text) for m in self.matchers])
-        else:
-            return True
+        """Expression matchers are not applicable to text, they are ignored here."""
+        return all([m.match(text) for m in self.text_matchers])
+
+    def match_fields(self, **variables):
+        """Text matchers are not applicable to structured data, they are ignored here."""
+        return all([m.match_fields(**variables) for m in self.expression_matchers])
 
 
 class SearchBarComboBox(CommitableComboBoxWithHistory):
@@ -342,7 +394,7 @@ class SearchBar(QWidget):
 
 class FilterBar(QWidget):
     class Filter(QWidget):
-        def __init__(self, parent, pattern_completion_model):
+        def __init__(self, parent, pattern_completion_model, expression_help):
             super(FilterBar.Filter, self).__init__(parent)
 
             self.on_commit = lambda: None
@@ -367,6 +419,12 @@ class FilterBar(QWidget):
             self._case_sensitive_button = make_icon_button('text-height', 'Filter expression is case sensitive', self,
                                                            checkable=True, on_clicked=self._on_commit)
 
+            self._expression_button = make_icon_button('calculator', 'Evaluate the filter as a Python expression '
+                                                       'over the fields rather than matching the text\n' +
+                                                       (expression_help or ''),
+                                                       self, checkable=True, on_clicked=self._on_mode_changed)
+            self._expression_button.setVisible(expression_help is not None)
+
             layout = QHBoxLayout(self)
             layout.setContentsMargins(0, 0, 0, 0)
             layout.addWidget(self._remove_button)
@@ -375,8 +433,15 @@ class FilterBar(QWidget):
             layout.addWidget(self._inverse_button)
             layout.addWidget(self._regex_button)
             layout.addWidget(self._case_sensitive_button)
+            layout.addWidget(self._expression_button)
             self.setLayout(layout)
 
+        def _on_mode_changed(self):
+            text_mode = not self._expression_button.isChecked()
+            self._regex_button.setEnabled(text_mode)
+            self._case_sensitive_button.setEnabled(text_mode)
+            self._on_commit()
+
         def _on_commit(self):
             self._bar.add_current_text_to_history()
             self.on_commit()
@@ -387,15 +452,20 @@ class FilterBar(QWidget):
                 self.on_remove(self)
 
         def make_matcher(self):
+            if self._expression_button.isChecked():
+                return ExpressionMatcher(self._bar.currentText(), inverse=self._inverse_button.isChecked())
             matcher = SearchMatcher(self._bar.currentText(),
                                     use_regex=self._regex_button.isChecked(),
                                     case_sensitive=self._case_sensitive_button.isChecked(),
                                     inverse=self._inverse_button.isChecked())
             return matcher
 
-    def __init__(self, parent):
+    def __init__(self, parent, expression_help=None):
+        """If expression_help is provided, filters can be switched into the expression mode; see ExpressionMatcher."""
         super(FilterBar, self).__init__(parent)
 
+        self._expression_help = expression_help
+
         self.add_filter_button = make_icon_button('filter', 'Add filter', self, on_clicked=self._on_add_filter)
 
         self.on_filter = lambda *_: None
@@ -412,10 +482,12 @@ class FilterBar(QWidget):
     def _do_filter(self):
         if len(self._filters) > 0:
             chain = SearchMatcherChain()
-            for m in self._filters:
-                chain.append(m.make_matcher())
-            logger.info('Applying chain of %d filters', len(chain.matchers))
             try:
+                for m in self._filters:
+                    chain.append(m.make_matcher())
+                for m in chain.expression_matchers:
+                    m.on_error = lambda ex: flash(self, 'Filter expression has failed: %s' % ex, duration=10)
+                logger.info('Applying chain of %d filters', len(chain.matchers))
                 self.on_filter(chain)
             except SearchMatcher.BadPatternException as ex:
                 flash(self, 'Invalid filter pattern: %s' % ex, duration=10)
@@ -423,7 +495,7 @@ class FilterBar(QWidget):
             self.on_filter(None)
 
     def _on_add_filter(self):
-        new_filter = self.Filter(self, self._pattern_completion_model)
+        new_filter = self.Filter(self, self._pattern_completion_model, self._expression_help)
         new_filter.on_remove = self._on_remove_filter
         new_filter.on_commit = self._do_filter
 
@@ -523,6 +595,13 @@ class RealtimeLogWidget(QWidget):
         self._pause.setChecked(True)
         self._table.search(*args, **kwargs)
 
+    def select_row(self, row):
+        """Updates are paused, otherwise the table would scroll away from the selected row immediately."""
+        self._pause.setChecked(True)
+        self._table.clearSelection()
+        self._table.selectRow(row)
+        self._table.scrollTo(self._table.model().index(row, 0))
+
     def _clear(self):
         self._table.setRowCount(0)
         self._row_count.setText(str(self._table.rowCount()))
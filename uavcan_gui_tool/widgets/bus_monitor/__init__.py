@@ -14,6 +14,7 @@ import multiprocessing
 from PyQt5.QtWidgets import QApplication
 from PyQt5.QtCore import QTimer
 from .window import BusMonitorWindow
+from ..time_cursor import TimeCursor
 
 logger = logging.getLogger(__name__)
 
@@ -52,7 +53,7 @@ class IPCChannel:
 IPC_COMMAND_STOP = 'stop'
 
 
-def _process_entry_point(channel, iface_name):
+def _process_entry_point(channel, iface_name, time_cursor_link):
     logger.info('Bus monitor process started with PID %r', os.getpid())
     app = QApplication(sys.argv)    # Inheriting args from the parent process
 
@@ -73,10 +74,12 @@ def _process_entry_point(channel, iface_name):
             if obj == IPC_COMMAND_STOP:
                 logger.info('Bus monitor process has received a stop request, goodbye')
                 app.exit(0)
+            elif isinstance(obj, TimeCursor):
+                time_cursor_link.accept(obj)
             else:
                 return obj
 
-    win = BusMonitorWindow(get_frame, iface_name)
+    win = BusMonitorWindow(get_frame, iface_name, time_cursor_link)
     win.show()
 
     logger.info('Bus monitor process %r initialized successfully, now starting the event loop', os.getpid())
@@ -85,9 +88,10 @@ def _process_entry_point(channel, iface_name):
 
 # TODO: Duplicates PlotterManager; refactor into an abstract process factory
 class BusMonitorManager:
-    def __init__(self, node, can_iface_name):
+    def __init__(self, node, can_iface_name, time_cursor_broker):
         self._node = node
         self._can_iface_name = can_iface_name
+        self._time_cursor_broker = time_cursor_broker
         self._inferiors = []    # process object, channel
         self._hook_handle = None
 
@@ -101,6 +105,7 @@ class BusMonitorManager:
             else:
                 logger.info('Bus monitor process %r appears to be dead, removing', proc)
                 self._inferiors.remove((proc, channel))
+                self._time_cursor_broker.remove_subscriber(channel)
 
     def spawn_monitor(self):
         channel = IPCChannel()
@@ -108,8 +113,10 @@ class BusMonitorManager:
         if self._hook_handle is None:
             self._hook_handle = self._node.can_driver.add_io_hook(self._frame_hook)
 
+        time_cursor_link = self._time_cursor_broker.add_subscriber(channel)
+
         proc = multiprocessing.Process(target=_process_entry_point, name='bus_monitor',
-                                       args=(channel, self._can_iface_name))
+                                       args=(channel, self._can_iface_name, time_cursor_link))
         proc.daemon = True
         proc.start()
 
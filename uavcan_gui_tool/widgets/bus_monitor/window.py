@@ -16,7 +16,7 @@ from PyQt5.QtWidgets import QMainWindow, QHeaderView, QLabel, QSplitter, QSizePo
     QPlainTextEdit, QDialog, QVBoxLayout, QMenu, QAction
 from PyQt5.QtGui import QColor, QIcon, QTextOption
 from PyQt5.QtCore import Qt, QTimer
-from ...thirdparty.pyqtgraph import PlotWidget, mkPen
+from ...thirdparty.pyqtgraph import PlotWidget, mkPen, InfiniteLine
 from logging import getLogger
 from .. import BasicTable, map_7bit_to_color, RealtimeLogWidget, get_monospace_font, get_icon, flash, get_app_icon, \
     show_error
@@ -222,7 +222,7 @@ class BusMonitorWindow(QMainWindow):
     DEFAULT_PLOT_X_RANGE = 120
     BUS_LOAD_PLOT_MAX_SAMPLES = 50000
 
-    def __init__(self, get_frame, iface_name):
+    def __init__(self, get_frame, iface_name, time_cursor_link):
         super(BusMonitorWindow, self).__init__()
         self.setWindowTitle('CAN bus monitor (%s)' % iface_name.split(os.path.sep)[-1])
         self.setWindowIcon(get_app_icon())
@@ -233,12 +233,14 @@ class BusMonitorWindow(QMainWindow):
             pyuavcan_v0.load_dsdl(dsdl_directory)
 
         self._get_frame = get_frame
+        self._time_cursor_link = time_cursor_link
 
         self._log_widget = RealtimeLogWidget(self, columns=COLUMNS, font=get_monospace_font(),
-                                             pre_redraw_hook=self._redraw_hook)
+                                             pre_redraw_hook=self._redraw_hook, keep_row_models=True)
         self._log_widget.on_selection_changed = self._update_measurement_display
 
         self._log_widget.table.cellClicked.connect(lambda row, col: self._decode_transfer_at_row(row))
+        self._log_widget.table.cellClicked.connect(lambda row, col: self._publish_time_cursor(row))
 
         self._log_widget.table.setContextMenuPolicy(Qt.CustomContextMenu)
         self._log_widget.table.customContextMenuRequested.connect(self._context_menu_requested)
@@ -286,6 +288,10 @@ class BusMonitorWindow(QMainWindow):
         self._bus_load_plot = self._load_plot.plot(name='Frames per second', pen=mkPen(QColor(Qt.lightGray), width=1))
         self._bus_load_samples = [], []
         self._started_at_mono = time.monotonic()
+        self._time_cursor_line = InfiniteLine(angle=90, movable=False,
+                                              pen=mkPen(QColor(Qt.magenta), width=1, dash=[6, 3]))
+        self._time_cursor_line.hide()
+        self._load_plot.addItem(self._time_cursor_line, ignoreBounds=True)
 
         self._footer_splitter = QSplitter(Qt.Horizontal, self)
         self._footer_splitter.addWidget(self._decoded_message_box)
@@ -347,9 +353,45 @@ class BusMonitorWindow(QMainWindow):
             # There is no need to maintain a second queue actually; should be refactored
             self._log_widget.add_item_async((direction, frame))
 
+        ts_mono = self._time_cursor_link.take_received()
+        if ts_mono is not None:
+            self._show_time_cursor(ts_mono)
+
         bus_load, _ = self._traffic_stat.get_frames_per_second()
         self._stat_display.setText('%d / %d / %d' % (self._traffic_stat.tx, self._traffic_stat.rx, bus_load))
 
+    def _get_row_timestamp(self, row):
+        model = self._log_widget.table.get_row_model(row)
+        return model[1].ts_monotonic if model is not None else None
+
+    def _publish_time_cursor(self, row):
+        ts_mono = self._get_row_timestamp(row)
+        if ts_mono is not None:
+            self._time_cursor_line.setPos(ts_mono - self._started_at_mono)
+            self._time_cursor_line.show()
+            self._time_cursor_link.publish(ts_mono)
+
+    def _show_time_cursor(self, ts_mono):
+        """Selects the frame that is nearest to the specified monotonic time; frames are ordered by time."""
+        self._time_cursor_line.setPos(ts_mono - self._started_at_mono)
+        self._time_cursor_line.show()
+
+        num_rows = self._log_widget.table.rowCount()
+        if num_rows == 0:
+            return
+
+        lo, hi = 0, num_rows
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._get_row_timestamp(mid) < ts_mono:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        candidates = [r for r in (lo - 1, lo) if 0 <= r < num_rows]
+        row = min(candidates, key=lambda r: abs(self._get_row_timestamp(r) - ts_mono))
+        self._log_widget.select_row(row)
+
     def _decode_transfer_at_row(self, row):
         try:
             rows, text = decode_transfer_from_frame(row, partial(row_to_frame, self._log_widget.table))
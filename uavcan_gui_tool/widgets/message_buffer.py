@@ -0,0 +1,151 @@
+#
+# Copyright (C) 2016  UAVCAN Development Team  <uavcan.org>
+#
+# This software is distributed under the terms of the MIT License.
+#
+# Author: Pavel Kirienko <pavel.kirienko@zubax.com>
+#
+
+import queue
+import logging
+import threading
+import pyuavcan_v0
+from collections import deque
+
+
+logger = logging.getLogger(__name__)
+
+
+POLICY_DROP_OLDEST = 'Keep latest'
+POLICY_DROP_NEWEST = 'Keep earliest'
+POLICY_SPILL = 'Spill to disk'
+
+OVERFLOW_POLICIES = [POLICY_DROP_OLDEST, POLICY_DROP_NEWEST, POLICY_SPILL]
+
+
+class SpillWriter(threading.Thread):
+    """
+    Renders the messages into YAML and appends them to a file in a background thread.
+    The queue is bounded as well; if the writer cannot keep up, messages are dropped.
+    """
+    QUEUE_SIZE = 100000
+    POLL_INTERVAL = 0.1
+
+    def __init__(self, path):
+        super(SpillWriter, self).__init__(name='subscriber_spill_writer', daemon=True)
+        self.path = path
+        self.num_dropped = 0
+        self.error = None
+        self._file = open(path, 'w', encoding='utf8')
+        self._queue = queue.Queue(self.QUEUE_SIZE)
+        self._closing = False
+        self.start()
+
+    def put(self, msg):
+        """Returns False if the message had to be dropped."""
+        try:
+            self._queue.put_nowait(msg)
+            return True
+        except queue.Full:
+            self.num_dropped += 1
+            return False
+
+    def run(self):
+        try:
+            while True:
+                try:
+                    msg = self._queue.get(timeout=self.POLL_INTERVAL)
+                except queue.Empty:
+                    if self._closing:
+                        break
+                    continue
+                self._file.write(pyuavcan_v0.to_yaml(msg) + '\n\n')
+        except Exception as ex:
+            logger.error('Spill writer failure', exc_info=True)
+            self.error = ex
+        finally:
+            self._file.close()
+
+    def close(self):
+        """Does not block; the file is closed by the thread once the queue is drained."""
+        self._closing = True
+
+
+class MessageBuffer:
+    """
+    Bounded FIFO of messages that have not been displayed yet. When it is full, the overflow policy decides
+    whether the oldest message or the new one is dropped, or the oldest message is spilled into a file.
+    """
+    def __init__(self, capacity, policy=POLICY_DROP_OLDEST):
+        self._items = deque()
+        self._capacity = capacity
+        self._policy = policy
+        self._spill_writer = None
+        self.num_dropped = 0
+        self.num_spilled = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    @capacity.setter
+    def capacity(self, value):
+        self._capacity = value
+        while len(self._items) > self._capacity:
+            self.discard(self._items.popleft())
+
+    @property
+    def policy(self):
+        return self._policy
+
+    @property
+    def spill_path(self):
+        return self._spill_writer.path if self._spill_writer is not None else None
+
+    def set_policy(self, policy, spill_path=None):
+        """Spill path must be provided for the spill policy. May throw if the file could not be opened."""
+        self._close_spill_writer()
+        if policy == POLICY_SPILL:
+            self._spill_writer = SpillWriter(spill_path)
+        self._policy = policy
+
+    def append(self, msg):
+        if len(self._items) >= self._capacity:
+            if self._policy == POLICY_DROP_NEWEST:
+                self.num_dropped += 1
+                return
+            self.discard(self._items.popleft())
+        self._items.append(msg)
+
+    def pop_newest(self):
+        return self._items.pop()
+
+    def discard(self, msg):
+        """The message is removed without having been displayed; it will be spilled if the policy says so."""
+        if self._spill_writer is not None and self._spill_writer.error is None and self._spill_writer.put(msg):
+            self.num_spilled += 1
+        else:
+            self.num_dropped += 1
+
+    def skip_all(self):
+        """
+        Removes all messages without counting them as dropped or spilling them, e.g. the messages that would have
+        been scrolled out of the view immediately after rendering.
+        """
+        self._items.clear()
+
+    def clear(self):
+        self._items.clear()
+        self.num_dropped = 0
+        self.num_spilled = 0
+
+    def _close_spill_writer(self):
+        if self._spill_writer is not None:
+            self._spill_writer.close()
+            self._spill_writer = None
+
+    def close(self):
+        self._close_spill_writer()
@@ -0,0 +1,226 @@
+#
+# Copyright (C) 2016  UAVCAN Development Team  <uavcan.org>
+#
+# This software is distributed under the terms of the MIT License.
+#
+# Author: Pavel Kirienko <pavel.kirienko@zubax.com>
+#
+
+"""
+Compact binary recording of received messages, and its offline conversion into YAML or CSV.
+The recorder only serializes the messages back into their wire representation in a background thread, nothing is
+rendered while recording. File layout: the magic string, followed by records that begin with a one-byte tag:
+    'T' - data type definition: 2-byte type index, 2-byte name length, UTF-8 full data type name
+    'M' - message: real and monotonic timestamps (float64), source node ID (0 - anonymous), 2-byte type index,
+          2-byte payload length, payload as it was transferred over the bus (without the transfer CRC)
+All numbers are little-endian.
+"""
+
+import csv
+import queue
+import struct
+import logging
+import threading
+import pyuavcan_v0
+from pyuavcan_v0.transport import bits_from_bytes, bytes_from_bits
+from .message_snapshot import flatten_message
+
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'UAVCAN message recording v1\n'
+
+_TAG_TYPE = b'T'
+_TAG_MESSAGE = b'M'
+_TYPE_HEADER = struct.Struct('<HH')
+_MESSAGE_HEADER = struct.Struct('<ddBHH')
+
+
+def _pack_message(message):
+    # noinspection PyProtectedMember
+    bits = message._pack()
+    if len(bits) & 7:
+        bits += '0' * (8 - (len(bits) & 7))
+    return bytes(bytes_from_bits(bits))
+
+
+class MessageRecorder(threading.Thread):
+    """
+    Appends messages to a recording file in a background thread. The queue is bounded; if the writer cannot keep up,
+    messages are dropped and counted.
+    """
+    QUEUE_SIZE = 10000
+    BUFFER_SIZE = 1024 * 1024
+    POLL_INTERVAL = 0.1
+
+    def __init__(self, path):
+        super(MessageRecorder, self).__init__(name='subscriber_recorder', daemon=True)
+        self.path = path
+        self.num_recorded = 0
+        self.num_dropped = 0
+        self.num_bytes = 0
+        self.error = None
+        self._type_indexes = {}         # Data type name : index
+        self._file = open(path, 'wb', buffering=self.BUFFER_SIZE)
+        self._file.write(MAGIC)
+        self._queue = queue.Queue(self.QUEUE_SIZE)
+        self._closing = False
+        self.start()
+
+    def put(self, event):
+        """Invoked for every message; only references are queued, serialization happens in the writer thread."""
+        try:
+            self._queue.put_nowait((event.transfer.ts_real, event.transfer.ts_monotonic,
+                                    event.transfer.source_node_id or 0, event.message))
+        except queue.Full:
+            self.num_dropped += 1
+
+    def _get_type_index(self, message):
+        name = pyuavcan_v0.get_uavcan_data_type(message).full_name
+        try:
+            return self._type_indexes[name]
+        except KeyError:
+            index = self._type_indexes[name] = len(self._type_indexes)
+            encoded = name.encode('utf8')
+            self._write(_TAG_TYPE + _TYPE_HEADER.pack(index, len(encoded)) + encoded)
+            return index
+
+    def _write(self, data):
+        self._file.write(data)
+        self.num_bytes += len(data)
+
+    def run(self):
+        try:
+            while True:
+                try:
+                    item = self._queue.get(timeout=self.POLL_INTERVAL)
+                except queue.Empty:
+                    if self._closing:
+                        break
+                    continue
+                ts_real, ts_mono, source_node_id, message = item
+                type_index = self._get_type_index(message)
+                payload = _pack_message(message)
+                self._write(_TAG_MESSAGE + _MESSAGE_HEADER.pack(ts_real, ts_mono, source_node_id, type_index,
+                                                                len(payload)) + payload)
+                self.num_recorded += 1
+        except Exception as ex:
+            logger.error('Recorder failure', exc_info=True)
+            self.error = ex
+        finally:
+            self._file.close()
+
+    def close(self):
+        """
+        Does not block; the queued messages are written and the file is closed by the thread.
+        The recording is complete once the thread has finished (see is_alive()).
+        """
+        self._closing = True
+
+
+class RecordedMessage:
+    """The attributes mimic TransferEvent closely enough for pyuavcan_v0.to_yaml()."""
+    class TransferInfo:
+        def __init__(self, ts_real, ts_mono, source_node_id):
+            self.source_node_id = source_node_id or None
+            self.dest_node_id = None
+            self.ts_monotonic = ts_mono
+            self.ts_real = ts_real
+
+    def __init__(self, ts_real, ts_mono, source_node_id, data_type_name, message):
+        self.transfer = self.TransferInfo(ts_real, ts_mono, source_node_id)
+        self.data_type_name = data_type_name
+        self.message = message
+
+
+def _read_exactly(f, size):
+    data = f.read(size)
+    if len(data) != size:
+        raise EOFError('Recording is truncated')
+    return data
+
+
+def read_recording(path):
+    """
+    Yields RecordedMessage for every message in the recording. A truncated last record is ignored, since that is
+    what is left of a recording that was not closed properly.
+    """
+    type_names = {}
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError('%r is not a message recording' % path)
+        while True:
+            tag = f.read(1)
+            if not tag:
+                break
+            try:
+                if tag == _TAG_TYPE:
+                    index, name_length = _TYPE_HEADER.unpack(_read_exactly(f, _TYPE_HEADER.size))
+                    type_names[index] = _read_exactly(f, name_length).decode('utf8')
+                elif tag == _TAG_MESSAGE:
+                    ts_real, ts_mono, source_node_id, type_index, payload_length = \
+                        _MESSAGE_HEADER.unpack(_read_exactly(f, _MESSAGE_HEADER.size))
+                    payload = _read_exactly(f, payload_length)
+                    name = type_names[type_index]
+                    message = pyuavcan_v0.TYPENAMES[name]()
+                    # noinspection PyProtectedMember
+                    message._unpack(bits_from_bytes(payload))
+                    yield RecordedMessage(ts_real, ts_mono, source_node_id, name, message)
+                else:
+                    raise ValueError('Unknown record tag %r at offset %d' % (tag, f.tell() - 1))
+            except EOFError:
+                logger.warning('Recording %r is truncated', path)
+                break
+
+
+def convert_to_yaml(recording_path, output_path):
+    """Returns the number of converted messages."""
+    count = 0
+    with open(output_path, 'w', encoding='utf8') as f:
+        for rec in read_recording(recording_path):
+            f.write(pyuavcan_v0.to_yaml(rec) + '\n\n')
+            count += 1
+    return count
+
+
+def convert_to_csv(recording_path, output_path):
+    """
+    Every row contains the timestamps, the source node ID, the data type name, and the values of the fields.
+    The names of the fields are written into a comment line whenever the set of fields of a data type changes,
+    e.g. when a dynamic array changes its length. Returns the number of converted messages.
+    """
+    count = 0
+    columns = {}            # Data type name : list of field names
+    with open(output_path, 'w', newline='', encoding='utf8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['ts_real', 'ts_mono', 'source_node_id', 'data_type'])
+        for rec in read_recording(recording_path):
+            fields = [(path, text) for path, text in flatten_message(rec.message) if text is not None]
+            names = ['.'.join(path).replace('.[', '[') for path, _ in fields]
+            if columns.get(rec.data_type_name) != names:
+                columns[rec.data_type_name] = names
+                f.write('# %s: %s\n' % (rec.data_type_name, ','.join(names)))
+            writer.writerow(['%.6f' % rec.transfer.ts_real, '%.6f' % rec.transfer.ts_monotonic,
+                             rec.transfer.source_node_id or '', rec.data_type_name] + [text for _, text in fields])
+            count += 1
+    return count
+
+
+class ConversionTask(threading.Thread):
+    def __init__(self, convert_function, recording_path, output_path):
+        super(ConversionTask, self).__init__(name='recording_conversion', daemon=True)
+        self.recording_path = recording_path
+        self.output_path = output_path
+        self.num_messages = 0
+        self.error = None
+        self._convert_function = convert_function
+
+    def run(self):
+        logger.info('Converting %r into %r', self.recording_path, self.output_path)
+        try:
+            self.num_messages = self._convert_function(self.recording_path, self.output_path)
+        except Exception as ex:
+            logger.error('Conversion failed', exc_info=True)
+            self.error = ex
+        else:
+            logger.info('Conversion finished, %d messages written', self.num_messages)
@@ -0,0 +1,182 @@
+#
+# Copyright (C) 2016  UAVCAN Development Team  <uavcan.org>
+#
+# This software is distributed under the terms of the MIT License.
+#
+# Author: Pavel Kirienko <pavel.kirienko@zubax.com>
+#
+
+import time
+import pyuavcan_v0
+import logging
+from PyQt5.QtWidgets import QTreeWidget, QTreeWidgetItem, QHeaderView
+from PyQt5.QtGui import QColor, QBrush
+from . import get_monospace_font
+
+
+logger = logging.getLogger(__name__)
+
+
+def flatten_message(m, path=()):
+    """
+    Yields (path, text) for every field of the message, where path is a tuple of field names and array indexes.
+    Compound values yield text None; arrays of primitives are rendered as a single value.
+    """
+    if isinstance(m, pyuavcan_v0.transport.CompoundValue):
+        if path:
+            yield path, None
+        for field_name, field in pyuavcan_v0.get_fields(m).items():
+            if pyuavcan_v0.is_union(m) and pyuavcan_v0.get_active_union_field(m) != field_name:
+                continue
+            if isinstance(field, pyuavcan_v0.transport.VoidValue):
+                continue
+            yield from flatten_message(field, path + (field_name,))
+    elif isinstance(m, pyuavcan_v0.transport.ArrayValue) and \
+            isinstance(pyuavcan_v0.get_uavcan_data_type(m).value_type, pyuavcan_v0.dsdl.CompoundType):
+        yield path, None
+        for idx, item in enumerate(m):
+            yield from flatten_message(item, path + ('[%d]' % idx,))
+    elif isinstance(m, pyuavcan_v0.transport.ArrayValue):
+        yield path, str(m) if pyuavcan_v0.get_uavcan_data_type(m).is_string_like else \
+            '[%s]' % ', '.join(str(x.value) for x in m)
+    elif isinstance(m, pyuavcan_v0.transport.PrimitiveValue):
+        yield path, str(m.value)
+    else:
+        yield path, str(m)
+
+
+class _FieldState:
+    def __init__(self, item):
+        self.item = item
+        self.text = None
+        self.num_changes = 0
+        self.last_change_at = 0
+
+
+class _SourceState:
+    def __init__(self, item):
+        self.item = item
+        self.latest = None          # The latest received message, not yet displayed
+        self.num_messages = 0
+        self.fields = {}            # path : _FieldState
+
+
+class MessageSnapshotView(QTreeWidget):
+    """
+    Shows one tree per (data type, source node) with the latest value of every field.
+    Received messages are only stored; the tree is updated at the display rate, and only the fields whose values
+    have changed since the previous update are re-rendered, so the cost does not depend on the message rate.
+    The rate of a data type is the message rate; the rate of a field is how often its displayed value changes,
+    which cannot exceed the display rate.
+    """
+    COLUMNS = ['Field', 'Value', 'Rate, Hz']
+    HIGHLIGHT_DURATION = 1.0
+    HIGHLIGHT_COLOR = QColor(255, 230, 150)
+    RATE_AVERAGING_INTERVAL = 2.0
+
+    def __init__(self, parent):
+        super(MessageSnapshotView, self).__init__(parent)
+        self.setColumnCount(len(self.COLUMNS))
+        self.setHeaderLabels(self.COLUMNS)
+        self.setFont(get_monospace_font())
+        self.header().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.header().setStretchLastSection(False)
+        self.header().setSectionResizeMode(1, QHeaderView.Stretch)
+
+        self._sources = {}                  # (data type name, source node ID) : _SourceState
+        self._highlighted = set()           # _FieldState
+        self._rate_checkpoint = time.monotonic(), {}        # time, {key: number of messages or changes}
+        self._rates = {}
+
+    def add_message(self, data_type_name, source_node_id, message):
+        """Invoked for every message, must be fast."""
+        key = data_type_name, source_node_id
+        try:
+            state = self._sources[key]
+        except KeyError:
+            item = QTreeWidgetItem(self, ['%s from %s' % (data_type_name, source_node_id or 'Anon'), '', ''])
+            item.setExpanded(True)
+            state = self._sources[key] = _SourceState(item)
+        state.latest = message
+        state.num_messages += 1
+
+    def clear(self):
+        super(MessageSnapshotView, self).clear()
+        self._sources = {}
+        self._highlighted = set()
+        self._rate_checkpoint = time.monotonic(), {}
+        self._rates = {}
+
+    def _get_field_item(self, state, path):
+        try:
+            return state.fields[path]
+        except KeyError:
+            pass
+        parent = state.item if len(path) == 1 else self._get_field_item(state, path[:-1]).item
+        item = QTreeWidgetItem(parent, [path[-1], '', ''])
+        item.setExpanded(True)
+        field = state.fields[path] = _FieldState(item)
+        return field
+
+    def _update_source(self, state, ts):
+        message, state.latest = state.latest, None
+        seen = set()
+        for path, text in flatten_message(message):
+            seen.add(path)
+            field = self._get_field_item(state, path)
+            if text is not None and text != field.text:
+                field.text = text
+                field.item.setText(1, text)
+                field.num_changes += 1
+                field.last_change_at = ts
+                field.item.setBackground(1, QBrush(self.HIGHLIGHT_COLOR))
+                self._highlighted.add(field)
+
+        # Fields that are no longer present, e.g. due to shrinking of a dynamic array or a union switch
+        for path in [p for p in state.fields if p not in seen]:
+            field = state.fields.pop(path)
+            parent = field.item.parent()
+            if parent is not None:
+                parent.removeChild(field.item)
+            self._highlighted.discard(field)
+            self._rates.pop(field, None)
+
+    def _update_rates(self, ts):
+        checkpoint_ts, checkpoint_counts = self._rate_checkpoint
+        if ts - checkpoint_ts < self.RATE_AVERAGING_INTERVAL:
+            return
+
+        counts = {}
+        for state in self._sources.values():
+            counts[state] = state.num_messages
+            for field in state.fields.values():
+                if field.text is not None:
+                    counts[field] = field.num_changes
+
+        dt = ts - checkpoint_ts
+        for obj, count in counts.items():
+            rate = '%.1f' % ((count - checkpoint_counts.get(obj, count)) / dt)
+            if self._rates.get(obj) != rate:
+                self._rates[obj] = rate
+                obj.item.setText(2, rate)
+
+        self._rate_checkpoint = ts, counts
+
+    def update_display(self):
+        ts = time.monotonic()
+        self.setUpdatesEnabled(False)
+        try:
+            for state in self._sources.values():
+                if state.latest is not None:
+                    try:
+                        self._update_source(state, ts)
+                    except Exception:
+                        logger.error('Could not update snapshot', exc_info=True)
+
+            for field in [f for f in self._highlighted if ts - f.last_change_at > self.HIGHLIGHT_DURATION]:
+                field.item.setBackground(1, QBrush())
+                self._highlighted.discard(field)
+
+            self._update_rates(ts)
+        finally:
+            self.setUpdatesEnabled(True)
@@ -0,0 +1,155 @@
+#
+# Copyright (C) 2016  UAVCAN Development Team  <uavcan.org>
+#
+# This software is distributed under the terms of the MIT License.
+#
+# Author: Pavel Kirienko <pavel.kirienko@zubax.com>
+#
+
+import csv
+import time
+import numpy
+import datetime
+import pyuavcan_v0
+from logging import getLogger
+from .restart_detector import RestartDetector
+
+
+logger = getLogger(__name__)
+
+
+EVENT_ONLINE = 0
+EVENT_OFFLINE = 1
+EVENT_STATUS_CHANGE = 2
+EVENT_RESTART = 3
+
+EVENT_NAMES = {
+    EVENT_ONLINE: 'Online',
+    EVENT_OFFLINE: 'Offline',
+    EVENT_STATUS_CHANGE: 'Status change',
+    EVENT_RESTART: 'Restart',
+}
+
+EVENT_DTYPE = numpy.dtype([
+    ('ts_real', numpy.float64),
+    ('ts_mono', numpy.float64),
+    ('kind', numpy.uint8),
+    ('mode', numpy.uint8),
+    ('health', numpy.uint8),
+    ('uptime', numpy.uint32),
+])
+
+
+class NodeEventHistory:
+    """
+    Append-only array of the events of one node; the storage is grown geometrically.
+    """
+    INITIAL_CAPACITY = 64
+
+    def __init__(self):
+        self._events = numpy.empty(self.INITIAL_CAPACITY, dtype=EVENT_DTYPE)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, ts_real, ts_mono, kind, mode, health, uptime):
+        if self._size >= len(self._events):
+            self._events = numpy.resize(self._events, len(self._events) * 2)
+        self._events[self._size] = ts_real, ts_mono, kind, mode, health, uptime
+        self._size += 1
+
+    @property
+    def events(self):
+        """Returns a read-only view, which remains valid after new events are appended."""
+        view = self._events[:self._size]
+        view.flags.writeable = False
+        return view
+
+
+class _LastStatus:
+    def __init__(self, status):
+        self.mode = status.mode
+        self.health = status.health
+
+
+class NodeHistoryRecorder:
+    """
+    Records the events of every node from every NodeStatus message and from the updates of the node monitor.
+    Only the transitions are stored, so the memory usage does not depend on the number of messages received.
+    Restarts are detected by the RestartDetector, which is shared with the other users of restart statistics.
+    """
+    def __init__(self, node, node_monitor):
+        self._histories = {}            # Node ID : NodeEventHistory
+        self._last_status = {}          # Node ID : _LastStatus; retained when the node goes offline
+        self._restart_detector = RestartDetector()
+        self._monitor_handle = node_monitor.add_update_handler(self._on_monitor_update)
+        self._status_handle = node.add_handler(pyuavcan_v0.protocol.NodeStatus, self._on_node_status)
+
+    @property
+    def restart_detector(self):
+        return self._restart_detector
+
+    def get(self, node_id):
+        """Returns the NodeEventHistory of the node, or None if the node has never been seen."""
+        return self._histories.get(node_id)
+
+    def _append(self, node_id, *event):
+        try:
+            history = self._histories[node_id]
+        except KeyError:
+            history = self._histories[node_id] = NodeEventHistory()
+        history.append(*event)
+
+    def _on_monitor_update(self, e):
+        status = e.entry.status
+        if e.event_id == e.EVENT_ID_NEW:
+            self._append(e.entry.node_id, time.time(), e.entry.monotonic_timestamp, EVENT_ONLINE,
+                         status.mode, status.health, status.uptime_sec)
+        elif e.event_id == e.EVENT_ID_OFFLINE:
+            self._append(e.entry.node_id, time.time(), time.monotonic(), EVENT_OFFLINE,
+                         status.mode, status.health, status.uptime_sec)
+
+    def _on_node_status(self, e):
+        node_id = e.transfer.source_node_id
+        status = e.message
+        restarted = self._restart_detector.feed(node_id, status.uptime_sec, e.transfer.ts_monotonic)
+        try:
+            last = self._last_status[node_id]
+        except KeyError:
+            self._last_status[node_id] = _LastStatus(status)
+            return
+
+        if restarted:
+            self._append(node_id, e.transfer.ts_real, e.transfer.ts_monotonic, EVENT_RESTART,
+                         status.mode, status.health, status.uptime_sec)
+        elif status.mode != last.mode or status.health != last.health:
+            self._append(node_id, e.transfer.ts_real, e.transfer.ts_monotonic, EVENT_STATUS_CHANGE,
+                         status.mode, status.health, status.uptime_sec)
+
+        last.mode = status.mode
+        last.health = status.health
+
+    def close(self):
+        self._status_handle.remove()
+        self._monitor_handle.remove()
+
+
+def render_event(event):
+    """Returns the columns of the event as strings: time, event, mode, health, uptime."""
+    status = pyuavcan_v0.protocol.NodeStatus(mode=int(event['mode']), health=int(event['health']))
+    return (datetime.datetime.fromtimestamp(event['ts_real']).strftime('%Y-%m-%d %H:%M:%S.%f'),
+            EVENT_NAMES[int(event['kind'])],
+            pyuavcan_v0.value_to_constant_name(status, 'mode'),
+            pyuavcan_v0.value_to_constant_name(status, 'health'),
+            str(datetime.timedelta(seconds=int(event['uptime']))))
+
+
+def export_history(path, events):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['time', 'ts_real', 'ts_mono', 'event', 'mode', 'health', 'uptime_sec'])
+        for ev in events:
+            rendered = render_event(ev)
+            writer.writerow([rendered[0], '%.6f' % ev['ts_real'], '%.6f' % ev['ts_mono'],
+                             rendered[1], rendered[2], rendered[3], int(ev['uptime'])])
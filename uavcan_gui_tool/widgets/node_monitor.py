@@ -6,11 +6,18 @@
 # Author: Pavel Kirienko <pavel.kirienko@zubax.com>
 #
 
+import time
+import bisect
 import datetime
 import pyuavcan_v0
+from functools import partial
 from . import BasicTable, get_monospace_font
+from .node_history import NodeHistoryRecorder
+from .node_traffic import NodeTrafficMonitor
+from .restart_detector import RestartDetector
 from PyQt5.QtWidgets import QGroupBox, QVBoxLayout, QHeaderView, QLabel
 from PyQt5.QtCore import Qt, QTimer, pyqtSignal
+from PyQt5.QtGui import QBrush
 from logging import getLogger
 
 
@@ -76,20 +83,48 @@ class NodeTable(BasicTable):
                           lambda e: render_vendor_specific_status_code(e.status.vendor_specific_status_code))
     ]
 
+    REBOOT_LOOP_COLOR = Qt.red
+
+    # Renderers of these columns accept NodeTrafficStats
+    TRAFFIC_COLUMNS = [
+        ('Frames/s', lambda s: '%.0f' % s.frames_per_sec),
+        ('Bytes/s', lambda s: '%.0f' % s.bytes_per_sec),
+        ('Transfers/s', lambda s: '%.0f' % s.transfers_per_sec),
+        ('Types', lambda s: len(s.message_type_ids)),
+        ('Errors CRC/Frm/TID', lambda s: ('%d/%d/%d' % (s.num_crc_errors, s.num_missing_frame_errors,
+                                                        s.num_transfer_id_gaps),
+                                          Qt.yellow if s.num_errors else None)),
+    ]
+
     info_requested = pyqtSignal([int])
 
     def __init__(self, parent, node):
-        super(NodeTable, self).__init__(parent, self.COLUMNS, font=get_monospace_font())
+        columns = self.COLUMNS + [BasicTable.Column(name, partial(self._render_traffic_column, renderer))
+                                  for name, renderer in self.TRAFFIC_COLUMNS]
+        columns.append(BasicTable.Column('Restarts 1h/total', self._render_restarts_column))
+        super(NodeTable, self).__init__(parent, columns, font=get_monospace_font())
 
         self.cellDoubleClicked.connect(lambda row, col: self._call_info_requested_callback_on_row(row))
         self.on_enter_pressed = self._on_enter
 
+        # Rows are kept sorted by node ID; the rendered cells are cached, so that only the changed cells are touched
+        self._node_ids = []
+        self._rendered_cells = {}           # Node ID : list of (text, color)
+
         self._monitor = pyuavcan_v0.app.node_monitor.NodeMonitor(node)
+        self._monitor_handle = self._monitor.add_update_handler(self._on_monitor_update)
+
+        # Restarts are detected by the history recorder; it is created before the status handler below is registered,
+        # so that the restart statistics are already updated when the row is rendered
+        self._history = NodeHistoryRecorder(node, self._monitor)
+        self._restart_detector = self._history.restart_detector
+
+        # The monitor reports only appearance, discovery, and disappearance of nodes; status updates are received
+        # directly. This handler is registered after the monitor's own one, so the entry is already updated.
+        self._status_handle = node.add_handler(pyuavcan_v0.protocol.NodeStatus, self._on_node_status)
 
-        self._timer = QTimer(self)
-        self._timer.setSingleShot(False)
-        self._timer.timeout.connect(self._update)
-        self._timer.start(500)
+        # Traffic statistics are collected continuously, but displayed only when the row is updated
+        self._traffic = NodeTrafficMonitor(node)
 
         self.setMinimumWidth(600)
 
@@ -99,50 +134,97 @@ class NodeTable(BasicTable):
     def monitor(self):
         return self._monitor
 
+    @property
+    def history(self):
+        return self._history
+
     def close(self):
+        self._traffic.close()
+        self._history.close()
+        self._status_handle.remove()
+        self._monitor_handle.remove()
         self._monitor.close()
 
     def _call_info_requested_callback_on_row(self, row):
-        nid = int(self.item(row, 0).text())
-        self.info_requested.emit(nid)
+        self.info_requested.emit(self._node_ids[row])
 
     def _on_enter(self, list_of_row_col_pairs):
         unique_rows = set([row for row, _col in list_of_row_col_pairs])
         if len(unique_rows) == 1:
             self._call_info_requested_callback_on_row(list(unique_rows)[0])
 
-    def _update(self):
-        known_nodes = {e.node_id: e for e in self._monitor.find_all(lambda _: True)}
-        displayed_nodes = set()
-        rows_to_remove = []
-
-        # Updating existing entries
-        for row in range(self.rowCount()):
-            nid = int(self.item(row, 0).text())
-            displayed_nodes.add(nid)
-            if nid not in known_nodes:
-                rows_to_remove.append(row)
-            else:
-                self.set_row(row, known_nodes[nid])
-
-        # Removing nonexistent entries
-        for row in rows_to_remove[::-1]:     # It is important to traverse from end
-            logger.info('Removing row %d', row)
-            self.removeRow(row)
-
-        # Adding new entries
-        def find_insertion_pos_for_node_id(target_nid):
-            for row in range(self.rowCount()):
-                nid = int(self.item(row, 0).text())
-                if nid > target_nid:
-                    return row
-            return self.rowCount()
-
-        for nid in set(known_nodes.keys()) - displayed_nodes:
-            row = find_insertion_pos_for_node_id(nid)
+    def _on_monitor_update(self, e):
+        if e.event_id == e.EVENT_ID_OFFLINE:
+            self._remove_node(e.entry.node_id)
+        else:
+            self._update_node(e.entry)
+
+    def _on_node_status(self, e):
+        try:
+            entry = self._monitor.get(e.transfer.source_node_id)
+        except KeyError:
+            return
+        self._update_node(entry)
+
+    def _render_traffic_column(self, renderer, entry):
+        stats = self._traffic.get(entry.node_id)
+        return renderer(stats) if stats is not None else '?'
+
+    def _render_restarts_column(self, entry):
+        stats = self._restart_detector.get(entry.node_id)
+        if stats is None:
+            return '?'
+        return ('%d/%d' % (stats.count_recent(RestartDetector.WINDOWS[-1]), stats.num_restarts),
+                self.REBOOT_LOOP_COLOR if stats.in_reboot_loop else None)
+
+    def _render_cells(self, entry):
+        cells = []
+        for spec in self.columns:
+            value = spec.render(entry)
+            color = None
+            if isinstance(value, tuple):
+                value, color = value
+            cells.append((str(value), color))
+
+        # Nodes in a reboot loop are highlighted by their node ID as well
+        stats = self._restart_detector.get(entry.node_id)
+        if stats is not None and stats.in_reboot_loop:
+            cells[0] = cells[0][0], self.REBOOT_LOOP_COLOR
+        return cells
+
+    def _update_node(self, entry):
+        nid = entry.node_id
+        stats = self._traffic.get(nid)
+        if stats is not None:
+            stats.update_rates(time.monotonic())
+
+        cells = self._render_cells(entry)
+        row = bisect.bisect_left(self._node_ids, nid)
+
+        if nid not in self._rendered_cells:
             logger.info('Adding new row %d for node %d', row, nid)
+            self._node_ids.insert(row, nid)
             self.insertRow(row)
-            self.set_row(row, known_nodes[nid])
+            self.set_row(row, entry)
+            if cells[0][1] is not None:
+                self.item(row, 0).setBackground(QBrush(cells[0][1]))
+        else:
+            for col, (cell, old_cell) in enumerate(zip(cells, self._rendered_cells[nid])):
+                if cell != old_cell:
+                    text, color = cell
+                    item = self.item(row, col)
+                    item.setText(text)
+                    item.setBackground(QBrush(color) if color is not None else QBrush())
+
+        self._rendered_cells[nid] = cells
+
+    def _remove_node(self, nid):
+        if nid in self._rendered_cells:
+            row = bisect.bisect_left(self._node_ids, nid)
+            logger.info('Removing row %d of node %d', row, nid)
+            del self._node_ids[row]
+            del self._rendered_cells[nid]
+            self.removeRow(row)
 
 
 class NodeMonitorWidget(QGroupBox):
@@ -174,6 +256,10 @@ class NodeMonitorWidget(QGroupBox):
     def monitor(self):
         return self._table.monitor
 
+    @property
+    def history(self):
+        return self._table.history
+
     def close(self):
         self._table.close()
         self._monitor_handle.remove()
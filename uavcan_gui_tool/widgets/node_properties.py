@@ -8,15 +8,19 @@
 
 import pyuavcan_v0
 import os
+import bisect
 import datetime
 from functools import partial
 from PyQt5.QtWidgets import QDialog, QGridLayout, QLabel, QLineEdit, QGroupBox, QVBoxLayout, QHBoxLayout, QStatusBar,\
-    QHeaderView, QSpinBox, QCheckBox, QFileDialog, QApplication, QPlainTextEdit
+    QHeaderView, QSpinBox, QCheckBox, QFileDialog, QApplication, QPlainTextEdit, QProgressBar
 from PyQt5.QtCore import QTimer, Qt
-from PyQt5.QtGui import QPalette
+from PyQt5.QtGui import QPalette, QBrush
 from logging import getLogger
 from . import get_monospace_font, make_icon_button, BasicTable, show_error, request_confirmation
 from .node_monitor import node_health_to_color, node_mode_to_color
+from .node_history import render_event, export_history, EVENT_RESTART, EVENT_OFFLINE
+from .param_fetcher import ParamFetcher
+from .param_cache import ParamCache
 
 
 logger = getLogger(__name__)
@@ -528,19 +532,115 @@ class ConfigParamEditWindow(QDialog):
             self.show_message('Set request sent')
 
 
+class EventHistory(QGroupBox):
+    EVENT_COLORS = {
+        EVENT_RESTART: Qt.red,
+        EVENT_OFFLINE: Qt.lightGray,
+    }
+
+    def __init__(self, parent, target_node_id, node_history):
+        super(EventHistory, self).__init__(parent)
+        self.setTitle('Event history')
+
+        self._target_node_id = target_node_id
+        self._node_history = node_history
+        self._num_displayed_events = 0
+
+        self._export_button = make_icon_button('download', 'Export the event history into a CSV file', self,
+                                               text='Export', on_clicked=self._do_export)
+
+        columns = [
+            BasicTable.Column('Time',
+                              lambda m: m[0][0]),
+            BasicTable.Column('Event',
+                              lambda m: (m[0][1], self.EVENT_COLORS.get(int(m[1]['kind']))),
+                              resize_mode=QHeaderView.Stretch),
+            BasicTable.Column('Mode',
+                              lambda m: (m[0][2], node_mode_to_color(int(m[1]['mode'])))),
+            BasicTable.Column('Health',
+                              lambda m: (m[0][3], node_health_to_color(int(m[1]['health'])))),
+            BasicTable.Column('Uptime',
+                              lambda m: m[0][4]),
+        ]
+
+        self._table = BasicTable(self, columns, font=get_monospace_font())
+        self._table.setMaximumHeight(160)
+
+        self._update_timer = QTimer(self)
+        self._update_timer.timeout.connect(self._update)
+        self._update_timer.setSingleShot(False)
+        self._update_timer.start(1000)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self._table)
+        layout.addWidget(self._export_button)
+        self.setLayout(layout)
+
+        self._update()
+
+    def _get_events(self):
+        history = self._node_history.get(self._target_node_id) if self._node_history is not None else None
+        return history.events if history is not None else []
+
+    def _update(self):
+        # Events are only appended, so only the new ones need to be rendered
+        events = self._get_events()
+        if len(events) <= self._num_displayed_events:
+            return
+
+        self._table.setUpdatesEnabled(False)
+        for ev in events[self._num_displayed_events:]:
+            row = self._table.rowCount()
+            self._table.insertRow(row)
+            self._table.set_row(row, (render_event(ev), ev))
+        self._table.setUpdatesEnabled(True)
+        self._num_displayed_events = len(events)
+        self._table.scrollToBottom()
+
+    def _do_export(self):
+        events = self._get_events()
+        if not len(events):
+            show_error('Export error', 'There is nothing to export', 'No events have been recorded', self)
+            return
+
+        path, _ = QFileDialog().getSaveFileName(self, 'Export event history',
+                                                'node_%d_events.csv' % self._target_node_id, 'CSV (*.csv)')
+        if not path:
+            return
+
+        try:
+            export_history(path, events)
+        except Exception as ex:
+            show_error('Export error', 'Could not export event history', ex, self)
+        else:
+            self.window().show_message('%d events exported into %s', len(events), path)
+
+
 class ConfigParams(QGroupBox):
     VALUE_COLUMN = 3
+    CHANGED_COLOR = Qt.yellow
 
-    def __init__(self, parent, node, target_node_id):
+    def __init__(self, parent, node, target_node_id, node_monitor):
         super(ConfigParams, self).__init__(parent)
         self.setTitle('Configuration parameters (double click to change)')
 
         self._node = node
         self._target_node_id = target_node_id
+        self._node_monitor = node_monitor
+        self._param_cache = ParamCache()
 
         self._read_all_button = make_icon_button('refresh', 'Fetch all config parameters from the node', self,
                                                  text='Fetch All', on_clicked=self._do_reload)
 
+        self._window_spinbox = QSpinBox(self)
+        self._window_spinbox.setToolTip('Maximum number of param requests in flight; the actual number adapts to '
+                                        'the response latency of the node')
+        self._window_spinbox.setRange(1, ParamFetcher.MAX_WINDOW)
+        self._window_spinbox.setValue(ParamFetcher.DEFAULT_WINDOW)
+
+        self._progress_bar = QProgressBar(self)
+        self._progress_bar.setVisible(False)
+
         opcodes = pyuavcan_v0.protocol.param.ExecuteOpcode.Request()
 
         self._save_button = \
@@ -575,13 +675,19 @@ class ConfigParams(QGroupBox):
         self._table.on_enter_pressed = self._on_cell_enter_pressed
 
         self._params = []
+        self._param_indexes = []        # Sorted; params may be received out of order
+        self._fetcher = None
+        self._refreshing = False        # True if the table is populated from the cache and is being refreshed
+        self._num_changed = 0
 
         layout = QVBoxLayout(self)
         controls_layout = QHBoxLayout(self)
         controls_layout.addWidget(self._read_all_button, 1)
+        controls_layout.addWidget(self._window_spinbox)
         controls_layout.addWidget(self._save_button, 1)
         controls_layout.addWidget(self._erase_button, 1)
         layout.addLayout(controls_layout)
+        layout.addWidget(self._progress_bar)
         layout.addWidget(self._table)
         self.setLayout(layout)
 
@@ -597,43 +703,112 @@ class ConfigParams(QGroupBox):
         win = ConfigParamEditWindow(self, self._node, self._target_node_id, self._params[index], update_callback)
         win.show()
 
-    def _on_fetch_response(self, index, e):
-        if e is None:
-            self.window().show_message('Param fetch failed: request timed out')
+    def _get_node_info(self):
+        try:
+            return self._node_monitor.get(self._target_node_id).info
+        except KeyError:
+            return None
+
+    def _render_param(self, index, param):
+        return [str(c.render((index, param))) for c in self._table.columns]
+
+    def _mark_changed(self, row):
+        self._num_changed += 1
+        self._table.item(row, self.VALUE_COLUMN).setBackground(QBrush(self.CHANGED_COLOR))
+
+    def _on_param_fetched(self, index, param):
+        row = bisect.bisect_left(self._param_indexes, index)
+        if row < len(self._param_indexes) and self._param_indexes[row] == index:
+            # Refreshing a param that was loaded from the cache; only the differences are re-rendered
+            old_param, self._params[row] = self._params[row], param
+            if self._render_param(index, old_param) != self._render_param(index, param):
+                self._table.set_row(row, (index, param))
+                self._mark_changed(row)
+        else:
+            self._param_indexes.insert(row, index)
+            self._params.insert(row, param)
+            self._table.insertRow(row)
+            self._table.set_row(row, (index, param))
+            if self._refreshing:
+                self._mark_changed(row)
+        self._update_progress()
+
+    def _on_fetch_done(self, error):
+        self._progress_bar.setVisible(False)
+        if error is not None:
+            self.window().show_message('Param fetch failed after %d params: %s', self._fetcher.num_received, error)
             return
 
-        if len(e.response.name) == 0:
-            self.window().show_message('%d params fetched successfully', index)
+        if self._refreshing:
+            # The params that were cached but are no longer reported by the node
+            num_params = self._fetcher.num_expected
+            num_removed = len(self._params) - num_params
+            if num_removed > 0:
+                self._num_changed += num_removed
+                del self._params[num_params:]
+                del self._param_indexes[num_params:]
+                self._table.setRowCount(num_params)
+            self.window().show_message('%d params refreshed, %d differ from the cache', num_params, self._num_changed)
+        else:
+            self.window().show_message('%d params fetched successfully', len(self._params))
+
+        info = self._get_node_info()
+        if info is not None:
+            try:
+                self._param_cache.store(info, list(zip(self._param_indexes, self._params)))
+            except Exception:
+                logger.error('Could not store params in the cache', exc_info=True)
+
+    def load_from_cache(self):
+        """Populates the table from the cache, if the node is known, and starts a background refresh."""
+        info = self._get_node_info()
+        params = self._param_cache.load(info) if info is not None else None
+        if not params:
             return
 
-        self._params.append(e.response)
-        self._table.setRowCount(self._table.rowCount() + 1)
-        self._table.set_row(self._table.rowCount() - 1, (index, e.response))
+        for index, param in params:
+            self._param_indexes.append(index)
+            self._params.append(param)
+            self._table.insertRow(self._table.rowCount())
+            self._table.set_row(self._table.rowCount() - 1, (index, param))
 
-        try:
-            index += 1
-            self.window().show_message('Requesting index %d', index)
-            self._node.defer(0.1, lambda: self._node.request(pyuavcan_v0.protocol.param.GetSet.Request(index=index),
-                                                             self._target_node_id,
-                                                             partial(self._on_fetch_response, index),
-                                                             priority=REQUEST_PRIORITY))
-        except Exception as ex:
-            logger.error('Param fetch error', exc_info=True)
-            self.window().show_message('Could not send param get request: %r', ex)
+        self.window().show_message('%d params loaded from the cache, refreshing...', len(params))
+        self._start_fetch(refresh=True)
 
-    def _do_reload(self):
-        try:
-            index = 0
-            self._node.request(pyuavcan_v0.protocol.param.GetSet.Request(index=index),
-                               self._target_node_id,
-                               partial(self._on_fetch_response, index),
-                               priority=REQUEST_PRIORITY)
-        except Exception as ex:
-            show_error('Node error', 'Could not send param get request', ex, self)
+    def _update_progress(self):
+        expected = self._fetcher.num_expected
+        if expected is None:
+            self._progress_bar.setRange(0, 0)           # The number of params is not known yet
         else:
-            self.window().show_message('Param fetch request sent')
+            self._progress_bar.setRange(0, expected)
+            self._progress_bar.setValue(self._fetcher.num_received)
+
+    def cancel_fetch(self):
+        if self._fetcher is not None:
+            self._fetcher.cancel()
+            self._fetcher = None
+        self._progress_bar.setVisible(False)
+
+    def _start_fetch(self, refresh):
+        self.cancel_fetch()
+        if not refresh:
             self._table.setRowCount(0)
             self._params = []
+            self._param_indexes = []
+        self._refreshing = refresh
+        self._num_changed = 0
+
+        expected_names = {index: p.name.decode() for index, p in zip(self._param_indexes, self._params)}
+        self._fetcher = ParamFetcher(self._node, self._target_node_id, self._on_param_fetched, self._on_fetch_done,
+                                     max_window=self._window_spinbox.value(), priority=REQUEST_PRIORITY,
+                                     expected_names=expected_names)
+        self._progress_bar.setVisible(True)
+        self._update_progress()
+        self._fetcher.start()
+
+    def _do_reload(self):
+        self.window().show_message('Fetching params...')
+        self._start_fetch(refresh=False)
 
     def _do_execute_opcode(self, opcode):
         request = pyuavcan_v0.protocol.param.ExecuteOpcode.Request(opcode=opcode)
@@ -658,7 +833,7 @@ class ConfigParams(QGroupBox):
 
 class NodePropertiesWindow(QDialog):
     def __init__(self, parent, node, target_node_id, file_server_widget, node_monitor,
-                 dynamic_node_id_allocator_widget):
+                 dynamic_node_id_allocator_widget, node_history=None):
         super(NodePropertiesWindow, self).__init__(parent)
         self.setAttribute(Qt.WA_DeleteOnClose)              # This is required to stop background timers!
         self.setWindowTitle('Node Properties [%d]' % target_node_id)
@@ -670,7 +845,8 @@ class NodePropertiesWindow(QDialog):
 
         self._info_box = InfoBox(self, target_node_id, node_monitor)
         self._controls = Controls(self, node, target_node_id, file_server_widget, dynamic_node_id_allocator_widget)
-        self._config_params = ConfigParams(self, node, target_node_id)
+        self._event_history = EventHistory(self, target_node_id, node_history)
+        self._config_params = ConfigParams(self, node, target_node_id, node_monitor)
 
         self._status_bar = QStatusBar(self)
         self._status_bar.setSizeGripEnabled(False)
@@ -678,6 +854,7 @@ class NodePropertiesWindow(QDialog):
         layout = QVBoxLayout(self)
         layout.addWidget(self._info_box)
         layout.addWidget(self._controls)
+        layout.addWidget(self._event_history)
         layout.addWidget(self._config_params)
         layout.addWidget(self._status_bar)
 
@@ -687,9 +864,15 @@ class NodePropertiesWindow(QDialog):
 
         self.setLayout(layout)
 
+        self._config_params.load_from_cache()
+
     def show_message(self, text, *fmt, duration=0):
         self._status_bar.showMessage(text % fmt, duration * 1000)
 
+    def closeEvent(self, qcloseevent):
+        self._config_params.cancel_fetch()
+        super(NodePropertiesWindow, self).closeEvent(qcloseevent)
+
     @property
     def target_node_id(self):
         return self._target_node_id
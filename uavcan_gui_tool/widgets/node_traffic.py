@@ -0,0 +1,186 @@
+#
+# Copyright (C) 2016  UAVCAN Development Team  <uavcan.org>
+#
+# This software is distributed under the terms of the MIT License.
+#
+# Author: Pavel Kirienko <pavel.kirienko@zubax.com>
+#
+
+import pyuavcan_v0
+from pyuavcan_v0.dsdl.common import crc16_from_bytes
+from logging import getLogger
+
+
+logger = getLogger(__name__)
+
+
+class NodeTrafficStats:
+    RATE_UPDATE_INTERVAL = 1.0
+
+    def __init__(self):
+        self.num_frames = 0
+        self.num_bytes = 0
+        self.num_transfers = 0
+        self.num_crc_errors = 0
+        self.num_missing_frame_errors = 0
+        self.num_transfer_id_gaps = 0
+        self.message_type_ids = set()
+
+        self.frames_per_sec = 0.0
+        self.bytes_per_sec = 0.0
+        self.transfers_per_sec = 0.0
+        self._rate_checkpoint = None        # ts_mono, frames, bytes, transfers
+
+    @property
+    def num_errors(self):
+        return self.num_crc_errors + self.num_missing_frame_errors + self.num_transfer_id_gaps
+
+    def update_rates(self, ts_mono):
+        """Rates are recomputed at most once per RATE_UPDATE_INTERVAL, so this is cheap to call on every update."""
+        if self._rate_checkpoint is not None:
+            ts, frames, nbytes, transfers = self._rate_checkpoint
+            dt = ts_mono - ts
+            if dt < self.RATE_UPDATE_INTERVAL:
+                return
+            self.frames_per_sec = (self.num_frames - frames) / dt
+            self.bytes_per_sec = (self.num_bytes - nbytes) / dt
+            self.transfers_per_sec = (self.num_transfers - transfers) / dt
+        self._rate_checkpoint = ts_mono, self.num_frames, self.num_bytes, self.num_transfers
+
+
+class _TransferState:
+    __slots__ = ['in_progress', 'transfer_id', 'next_toggle', 'crc', 'expected_crc',
+                 'last_transfer_id', 'last_transfer_ts']
+
+    def __init__(self):
+        self.in_progress = False
+        self.transfer_id = None
+        self.next_toggle = 0
+        self.crc = None
+        self.expected_crc = None
+        self.last_transfer_id = None
+        self.last_transfer_ts = None
+
+
+class NodeTrafficMonitor:
+    """
+    Collects per-node traffic statistics from every received CAN frame, in constant time per frame.
+    Transfers are tracked per CAN ID (excluding the priority) without being reassembled: the tail bytes are checked
+    for missing frames, the CRC of multi-frame transfers is computed incrementally, and the transfer ID of every
+    completed message transfer is compared with the previous one (service transfer IDs are not required to be
+    contiguous from the server's perspective). Frames from anonymous nodes are ignored.
+    """
+    TRANSFER_ID_TIMEOUT = 2.0
+
+    def __init__(self, node):
+        self._stats = {}                # Node ID : NodeTrafficStats
+        self._transfers = {}            # CAN ID without priority : _TransferState
+        self._base_crcs = {}            # (data type ID, kind) : base CRC, or None if the data type is unknown
+        self._hook_handle = node.can_driver.add_io_hook(self._on_frame)
+
+    def get(self, node_id):
+        """Returns NodeTrafficStats of the node, or None if nothing has been received from it."""
+        return self._stats.get(node_id)
+
+    def close(self):
+        self._hook_handle.remove()
+
+    def _get_base_crc(self, data_type_id, kind):
+        try:
+            return self._base_crcs[data_type_id, kind]
+        except KeyError:
+            t = pyuavcan_v0.DATATYPES.get((data_type_id, kind))
+            out = self._base_crcs[data_type_id, kind] = t.base_crc if t is not None else None
+            return out
+
+    def _on_frame(self, direction, frame):
+        if direction != 'rx' or not frame.extended or not frame.data:
+            return
+
+        can_id = frame.id
+        source_node_id = can_id & 0x7F
+        if source_node_id == 0:
+            return
+
+        try:
+            stats = self._stats[source_node_id]
+        except KeyError:
+            stats = self._stats[source_node_id] = NodeTrafficStats()
+
+        stats.num_frames += 1
+        stats.num_bytes += len(frame.data)
+
+        service_not_message = (can_id >> 7) & 1
+        if service_not_message:
+            data_type_id, kind = (can_id >> 16) & 0xFF, pyuavcan_v0.dsdl.CompoundType.KIND_SERVICE
+        else:
+            data_type_id, kind = (can_id >> 8) & 0xFFFF, pyuavcan_v0.dsdl.CompoundType.KIND_MESSAGE
+            stats.message_type_ids.add(data_type_id)
+
+        key = can_id & 0xFFFFFF
+        try:
+            state = self._transfers[key]
+        except KeyError:
+            state = self._transfers[key] = _TransferState()
+
+        tail = frame.data[-1]
+        start_of_transfer = tail & 0x80
+        end_of_transfer = tail & 0x40
+        toggle = tail & 0x20
+        transfer_id = tail & 0x1F
+        payload = frame.data[:-1]
+
+        if start_of_transfer:
+            if state.in_progress:
+                stats.num_missing_frame_errors += 1     # The end of the previous transfer was lost
+                state.in_progress = False
+            if toggle:
+                stats.num_missing_frame_errors += 1
+                return
+            if end_of_transfer:
+                self._complete_transfer(stats, state, transfer_id, frame.ts_monotonic, not service_not_message)
+                return
+            if len(payload) < 2:
+                stats.num_missing_frame_errors += 1
+                return
+            base_crc = self._get_base_crc(data_type_id, kind)
+            state.in_progress = True
+            state.transfer_id = transfer_id
+            state.next_toggle = 0x20
+            state.expected_crc = payload[0] | (payload[1] << 8)
+            state.crc = crc16_from_bytes(payload[2:], initial=base_crc) if base_crc is not None else None
+            return
+
+        # Every broken transfer is counted once, the remaining frames of that transfer are ignored
+        if not state.in_progress:
+            if transfer_id != state.transfer_id:
+                stats.num_missing_frame_errors += 1     # The first frame was lost
+                state.transfer_id = transfer_id
+            return
+
+        if transfer_id != state.transfer_id or toggle != state.next_toggle:
+            stats.num_missing_frame_errors += 1
+            state.in_progress = False
+            state.transfer_id = transfer_id
+            return
+
+        state.next_toggle ^= 0x20
+        if state.crc is not None:
+            state.crc = crc16_from_bytes(payload, initial=state.crc)
+
+        if end_of_transfer:
+            state.in_progress = False
+            if state.crc is not None and state.crc != state.expected_crc:
+                stats.num_crc_errors += 1
+            else:
+                self._complete_transfer(stats, state, transfer_id, frame.ts_monotonic, not service_not_message)
+
+    def _complete_transfer(self, stats, state, transfer_id, ts_mono, check_gaps):
+        stats.num_transfers += 1
+        if check_gaps and state.last_transfer_id is not None and \
+                ts_mono - state.last_transfer_ts < self.TRANSFER_ID_TIMEOUT:
+            # Zero difference is a duplicate, e.g. from a redundant interface; it is not a gap
+            if ((transfer_id - state.last_transfer_id) & 0x1F) > 1:
+                stats.num_transfer_id_gaps += 1
+        state.last_transfer_id = transfer_id
+        state.last_transfer_ts = ts_mono
@@ -0,0 +1,98 @@
+#
+# Copyright (C) 2016  UAVCAN Development Team  <uavcan.org>
+#
+# This software is distributed under the terms of the MIT License.
+#
+# Author: Pavel Kirienko <pavel.kirienko@zubax.com>
+#
+
+import os
+import json
+import time
+import hashlib
+import tempfile
+import pyuavcan_v0
+from pyuavcan_v0.transport import bits_from_bytes, bytes_from_bits
+from logging import getLogger
+
+
+logger = getLogger(__name__)
+
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'uavcan_gui_tool', 'param_cache')
+
+
+def make_cache_key(node_info):
+    """
+    The key is built from the fields of uavcan.protocol.GetNodeInfo that identify the firmware running on the node:
+    the node name, the hardware unique ID, and the software version including the VCS commit and the image CRC
+    if they are reported.
+    """
+    sw = node_info.software_version
+    return {
+        'name': node_info.name.decode(),
+        'unique_id': ''.join('%02x' % x for x in node_info.hardware_version.unique_id),
+        'software_version': '%d.%d' % (sw.major, sw.minor),
+        'vcs_commit': sw.vcs_commit if sw.optional_field_flags & sw.OPTIONAL_FIELD_FLAG_VCS_COMMIT else None,
+        'image_crc': sw.image_crc if sw.optional_field_flags & sw.OPTIONAL_FIELD_FLAG_IMAGE_CRC else None,
+    }
+
+
+def _pack_param(param):
+    # noinspection PyProtectedMember
+    bits = param._pack()
+    if len(bits) & 7:
+        bits += '0' * (8 - (len(bits) & 7))
+    return bytes(bytes_from_bits(bits)).hex()
+
+
+def _unpack_param(text):
+    param = pyuavcan_v0.protocol.param.GetSet.Response()
+    # noinspection PyProtectedMember
+    param._unpack(bits_from_bytes(bytes.fromhex(text)))
+    return param
+
+
+class ParamCache:
+    """
+    Stores the configuration parameters of nodes on disk, one JSON file per cache key. Parameters are stored in their
+    serialized form, exactly as they were received in param.GetSet responses.
+    """
+    def __init__(self, directory=DEFAULT_CACHE_DIR):
+        self._directory = directory
+
+    def _get_path(self, key):
+        digest = hashlib.sha1(json.dumps(key, sort_keys=True).encode()).hexdigest()
+        return os.path.join(self._directory, digest + '.json')
+
+    def load(self, node_info):
+        """Returns a list of (index, param), or None if there is nothing cached for this node."""
+        key = make_cache_key(node_info)
+        path = self._get_path(key)
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+            if data['key'] != key:
+                logger.warning('Param cache key mismatch in %r', path)
+                return None
+            return [(index, _unpack_param(text)) for index, text in data['params']]
+        except FileNotFoundError:
+            return None
+        except Exception:
+            logger.error('Could not load param cache from %r', path, exc_info=True)
+            return None
+
+    def store(self, node_info, params):
+        """Params is a list of (index, param). The file is replaced atomically."""
+        key = make_cache_key(node_info)
+        path = self._get_path(key)
+        data = {
+            'key': key,
+            'saved_at': time.time(),
+            'params': [(index, _pack_param(p)) for index, p in params],
+        }
+        os.makedirs(self._directory, exist_ok=True)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(data, f)
+        os.replace(path + '.tmp', path)
+        logger.info('%d params of node %r cached in %r', len(params), key['name'], path)
@@ -0,0 +1,210 @@
+#
+# Copyright (C) 2016  UAVCAN Development Team  <uavcan.org>
+#
+# This software is distributed under the terms of the MIT License.
+#
+# Author: Pavel Kirienko <pavel.kirienko@zubax.com>
+#
+
+import time
+import pyuavcan_v0
+from functools import partial
+from logging import getLogger
+
+
+logger = getLogger(__name__)
+
+
+class ParamFetcher:
+    """
+    Fetches all configuration parameters of a node by index, keeping several requests in flight at once.
+    The end of the parameter list is the first index for which the node returns an empty name; requests for the
+    indexes past the end that are already in flight are ignored.
+    Pacing is adaptive: the window grows by one request per response and is halved on every timeout, and the
+    request timeout follows the smoothed response latency. Timed out indexes are retried individually.
+    Parameters may be reported out of order.
+
+    Responses are matched to requests by the transfer ID, which wraps around every TRANSFER_ID_PERIOD requests, so a
+    response to a request that is still in flight or has timed out recently could be mistaken for the response to a
+    newer request with the same transfer ID. Hence, no more than TRANSFER_ID_PERIOD - 1 requests are sent after a
+    request that has not been answered, until it is answered or LATE_RESPONSE_FACTOR times its timeout has passed.
+    As a second line of defense, a response is rejected and the index is retried if the name of the parameter was
+    already received for another index, or if it differs from the expected name; a differing name is accepted once
+    it is confirmed by a retry.
+    """
+    DEFAULT_WINDOW = 8
+    MAX_WINDOW = 16             # Limits the load on the node; transfer ID reuse is prevented separately, see above
+    MIN_TIMEOUT = 0.2
+    MAX_TIMEOUT = 2.0
+    MAX_RETRIES = 3
+    TRANSFER_ID_PERIOD = 32
+    LATE_RESPONSE_FACTOR = 2
+
+    def __init__(self, node, target_node_id, on_param, on_done, max_window=DEFAULT_WINDOW, priority=None,
+                 expected_names=None):
+        """
+        on_param(index, param) is invoked for every received parameter.
+        on_done(error) is invoked once; the error is None if all parameters have been fetched.
+        expected_names is an optional dict {index: name}, e.g. from the cache.
+        """
+        self._node = node
+        self._target_node_id = target_node_id
+        self._on_param = on_param
+        self._on_done = on_done
+        self._priority = priority
+        self._max_window = max(1, min(self.MAX_WINDOW, max_window))
+
+        self._window = min(2, self._max_window)     # Starting slow, in case the node cannot keep up
+        self._timeout = self.MAX_TIMEOUT
+        self._smoothed_latency = None
+
+        self._next_index = 0
+        self._end_index = None
+        self._in_flight = set()
+        self._retry_queue = []
+        self._num_retries = {}          # Index : number of retries so far
+        self._received = set()
+        self._finished = False
+
+        self._expected_names = expected_names or {}
+        self._indexes_by_name = {}      # Name : index, of the params received so far
+        self._num_sent = 0
+        self._unanswered = {}           # Request number : deadline of a late response; includes the timed out ones
+        self._deferred_fill = None
+
+    @property
+    def num_received(self):
+        return len(self._received)
+
+    @property
+    def num_expected(self):
+        """The total number of parameters, or None if it is not known yet."""
+        return self._end_index
+
+    @property
+    def finished(self):
+        return self._finished
+
+    def start(self):
+        self._fill()
+
+    def cancel(self):
+        """Responses to the requests that are still in flight will be ignored."""
+        self._finished = True
+        self._cancel_deferred_fill()
+
+    def _finish(self, error=None):
+        if not self._finished:
+            self._finished = True
+            self._cancel_deferred_fill()
+            self._on_done(error)
+
+    def _cancel_deferred_fill(self):
+        if self._deferred_fill is not None:
+            self._deferred_fill.remove()
+            self._deferred_fill = None
+
+    def _on_deferred_fill(self):
+        self._deferred_fill = None
+        self._fill()
+
+    def _get_transfer_id_hold_time(self):
+        """
+        Returns for how long the next request must be held back to avoid reusing the transfer ID of a request
+        whose response may still arrive, or zero if it can be sent now.
+        """
+        now = time.monotonic()
+        self._unanswered = {n: deadline for n, deadline in self._unanswered.items() if deadline > now}
+        blocking = [deadline for n, deadline in self._unanswered.items()
+                    if self._num_sent - n >= self.TRANSFER_ID_PERIOD]
+        return max(blocking) - now if blocking else 0
+
+    def _fill(self):
+        while not self._finished and len(self._in_flight) < self._window:
+            if not self._retry_queue and self._end_index is not None:
+                break
+            hold_time = self._get_transfer_id_hold_time()
+            if hold_time > 0:
+                if self._deferred_fill is None:
+                    logger.info('Param requests are held back for %.1f sec to avoid transfer ID reuse', hold_time)
+                    self._deferred_fill = self._node.defer(hold_time, self._on_deferred_fill)
+                break
+            if self._retry_queue:
+                index = self._retry_queue.pop(0)
+            elif self._end_index is None:
+                index = self._next_index
+                self._next_index += 1
+            else:
+                break
+            try:
+                self._send(index)
+            except Exception as ex:
+                logger.error('Param fetch error', exc_info=True)
+                self._finish(ex)
+
+    def _send(self, index):
+        self._in_flight.add(index)
+        self._unanswered[self._num_sent] = time.monotonic() + self._timeout * self.LATE_RESPONSE_FACTOR
+        self._node.request(pyuavcan_v0.protocol.param.GetSet.Request(index=index), self._target_node_id,
+                           partial(self._on_response, index, self._num_sent, time.monotonic()),
+                           priority=self._priority, timeout=self._timeout)
+        self._num_sent += 1
+
+    def _is_past_end(self, index):
+        return self._end_index is not None and index >= self._end_index
+
+    def _is_name_consistent(self, index, name):
+        other_index = self._indexes_by_name.get(name)
+        if other_index is not None and other_index != index:
+            return False
+        expected = self._expected_names.get(index)
+        return expected is None or expected == name or self._num_retries.get(index, 0) > 0
+
+    def _on_response(self, index, request_number, sent_at, e):
+        if self._finished:
+            return
+        self._in_flight.discard(index)
+
+        if e is None:
+            self._on_timeout(index)
+        else:
+            self._unanswered.pop(request_number, None)
+            latency = time.monotonic() - sent_at
+            self._smoothed_latency = latency if self._smoothed_latency is None else \
+                self._smoothed_latency + (latency - self._smoothed_latency) * 0.125
+            self._timeout = max(self.MIN_TIMEOUT, min(self.MAX_TIMEOUT, self._smoothed_latency * 4))
+            self._window = min(self._max_window, self._window + 1)
+
+            if not len(e.response.name):
+                if not self._is_past_end(index):
+                    self._end_index = index
+                    self._retry_queue = [x for x in self._retry_queue if x < index]
+            elif not self._is_past_end(index) and index not in self._received:
+                name = e.response.name.decode()
+                if self._is_name_consistent(index, name):
+                    self._received.add(index)
+                    self._indexes_by_name[name] = index
+                    self._on_param(index, e.response)
+                else:
+                    logger.warning('Param %d: unexpected name %r, the response may be stale', index, name)
+                    self._retry(index)
+
+        if self._end_index is not None and len(self._received) >= self._end_index:
+            self._finish()
+        else:
+            self._fill()
+
+    def _on_timeout(self, index):
+        self._window = max(1, self._window // 2)
+        self._timeout = min(self.MAX_TIMEOUT, self._timeout * 2)
+        if not self._is_past_end(index):
+            logger.info('Param %d request timed out, retrying', index)
+            self._retry(index)
+
+    def _retry(self, index):
+        self._num_retries[index] = self._num_retries.get(index, 0) + 1
+        if self._num_retries[index] > self.MAX_RETRIES:
+            self._finish(TimeoutError('Parameter %d could not be fetched after %d retries' %
+                                      (index, self.MAX_RETRIES)))
+        else:
+            self._retry_queue.append(index)
@@ -8,13 +8,16 @@
 
 import os
 import sys
+import time
 import queue
 import pyuavcan_v0
 import logging
 import multiprocessing
 from PyQt5.QtWidgets import QApplication
-from PyQt5.QtCore import QTimer
+from PyQt5.QtCore import QTimer, QMetaObject, Qt
 from .window import PlotterWindow
+from ..time_cursor import TimeCursor
+from .broadcast_ring import SHARED_MEMORY_AVAILABLE, BroadcastRingWriter, BroadcastRingReader
 
 logger = logging.getLogger(__name__)
 
@@ -42,6 +45,13 @@ class IPCChannel:
         except queue.Full:
             pass
 
+    def receive(self, timeout):
+        """Returns: (True, object) if successful, (False, None) if nothing was received within the timeout """
+        try:
+            return True, self._q.get(timeout=timeout)
+        except queue.Empty:
+            return False, None
+
     def receive_nonblocking(self):
         """Returns: (True, object) if successful, (False, None) if no data to read """
         try:
@@ -52,8 +62,10 @@ class IPCChannel:
 
 IPC_COMMAND_STOP = 'stop'
 
+BROADCAST_RING_POLL_INTERVAL = 0.01
+
 
-def _process_entry_point(channel):
+def _process_entry_point(channel, time_cursor_link, broadcast_ring_name):
     logger.info('Plotter process started with PID %r', os.getpid())
     app = QApplication(sys.argv)    # Inheriting args from the parent process
 
@@ -68,20 +80,44 @@ def _process_entry_point(channel):
     exit_check_timer.timeout.connect(exit_if_should)
     exit_check_timer.start(2000)
 
-    def get_transfer():
+    # If available, transfers are received from the broadcast ring shared by all plotters; the channel is then
+    # used only for control messages
+    broadcast_ring = BroadcastRingReader(broadcast_ring_name) if broadcast_ring_name else None
+
+    def handle_channel_object(obj):
+        # Invoked from the ingest thread, hence the application is stopped via a queued invocation
+        if obj == IPC_COMMAND_STOP:
+            logger.info('Plotter process has received a stop request, goodbye')
+            QMetaObject.invokeMethod(app, 'quit', Qt.QueuedConnection)
+        elif isinstance(obj, TimeCursor):
+            time_cursor_link.accept(obj)
+        else:
+            return obj
+
+    def get_transfer(timeout):
+        if broadcast_ring is None:
+            received, obj = channel.receive(timeout)
+            return handle_channel_object(obj) if received else None
+
         received, obj = channel.receive_nonblocking()
         if received:
-            if obj == IPC_COMMAND_STOP:
-                logger.info('Plotter process has received a stop request, goodbye')
-                app.exit(0)
-            else:
-                return obj
+            handle_channel_object(obj)
+
+        tr = broadcast_ring.read()
+        if tr is None:
+            time.sleep(min(timeout, BROADCAST_RING_POLL_INTERVAL))
+        return tr
 
-    win = PlotterWindow(get_transfer)
+    win = PlotterWindow(get_transfer, time_cursor_link)
     win.show()
 
     logger.info('Plotter process %r initialized successfully, now starting the event loop', os.getpid())
-    sys.exit(app.exec_())
+    exit_code = app.exec_()
+
+    # The shared memory must not be released while the ingest thread may still be reading from it
+    if win.shutdown() and broadcast_ring is not None:
+        broadcast_ring.close()
+    sys.exit(exit_code)
 
 
 class CompactMessage:
@@ -147,23 +183,35 @@ class MessageTransfer:
 
 
 class PlotterManager:
-    def __init__(self, node):
+    def __init__(self, node, time_cursor_broker):
         self._node = node
+        self._time_cursor_broker = time_cursor_broker
         self._inferiors = []    # process object, channel
         self._hook_handle = None
+        self._broadcast_ring = None
 
     def _transfer_hook(self, tr):
         if tr.direction == 'rx' and not tr.service_not_message and len(self._inferiors):
             msg = MessageTransfer(tr)
+
+            # The message is serialized once for all plotters
+            if self._broadcast_ring is not None:
+                try:
+                    self._broadcast_ring.write(msg)
+                except Exception:
+                    logger.error('Failed to write into the broadcast ring', exc_info=True)
+
             for proc, channel in self._inferiors[:]:
                 if proc.is_alive():
-                    try:
-                        channel.send_nonblocking(msg)
-                    except Exception:
-                        logger.error('Failed to send data to process %r', proc, exc_info=True)
+                    if self._broadcast_ring is None:
+                        try:
+                            channel.send_nonblocking(msg)
+                        except Exception:
+                            logger.error('Failed to send data to process %r', proc, exc_info=True)
                 else:
                     logger.info('Plotter process %r appears to be dead, removing', proc)
                     self._inferiors.remove((proc, channel))
+                    self._time_cursor_broker.remove_subscriber(channel)
 
     def spawn_plotter(self):
         channel = IPCChannel()
@@ -171,7 +219,18 @@ class PlotterManager:
         if self._hook_handle is None:
             self._hook_handle = self._node.add_transfer_hook(self._transfer_hook)
 
-        proc = multiprocessing.Process(target=_process_entry_point, name='plotter', args=(channel,))
+        if self._broadcast_ring is None and SHARED_MEMORY_AVAILABLE:
+            try:
+                self._broadcast_ring = BroadcastRingWriter()
+            except Exception:
+                logger.error('Could not create the broadcast ring, falling back to per-process queues',
+                             exc_info=True)
+
+        time_cursor_link = self._time_cursor_broker.add_subscriber(channel)
+        broadcast_ring_name = self._broadcast_ring.name if self._broadcast_ring is not None else None
+
+        proc = multiprocessing.Process(target=_process_entry_point, name='plotter',
+                                       args=(channel, time_cursor_link, broadcast_ring_name))
         proc.daemon = True
         proc.start()
 
@@ -202,3 +261,7 @@ class PlotterManager:
                 proc.terminate()
             except Exception:
                 pass
+
+        if self._broadcast_ring is not None:
+            self._broadcast_ring.close()
+            self._broadcast_ring = None
@@ -0,0 +1,161 @@
+#
+# Copyright (C) 2016  UAVCAN Development Team  <uavcan.org>
+#
+# This software is distributed under the terms of the MIT License.
+#
+# Author: Pavel Kirienko <pavel.kirienko@zubax.com>
+#
+
+"""
+Single-writer, multiple-reader broadcast ring in shared memory. Every message is serialized only once by the
+writer, no matter how many readers there are; every reader keeps its own cursor, so slow readers do not affect
+the writer or each other - a reader that falls behind by more than the capacity of the ring loses the oldest data.
+Layout: a header containing two 8-byte positions, followed by the data area, where records (4-byte length,
+then payload) are written back-to-back, wrapping around at the end. The positions are byte counts since the
+creation of the ring: the reserved position is published before a record is written, and the committed position
+after. Readers never read past the committed position, and a copied block is valid only if the reserved position
+was still within the capacity of the ring from the start of the block when the copy was finished.
+"""
+
+import struct
+import pickle
+import logging
+from collections import deque
+
+try:
+    from multiprocessing import shared_memory
+    SHARED_MEMORY_AVAILABLE = True
+except ImportError:
+    SHARED_MEMORY_AVAILABLE = False
+
+
+logger = logging.getLogger(__name__)
+
+_POSITION = struct.Struct('<Q')
+_COMMITTED_OFFSET = 0
+_RESERVED_OFFSET = _POSITION.size
+_HEADER_SIZE = _POSITION.size * 2
+_LENGTH = struct.Struct('<I')
+
+
+class _RingBase:
+    def __init__(self, shm):
+        self._shm = shm
+        self._capacity = shm.size - _HEADER_SIZE
+        self._data = shm.buf[_HEADER_SIZE:]
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    def _get_write_position(self):
+        return _POSITION.unpack_from(self._shm.buf, _COMMITTED_OFFSET)[0]
+
+    def _get_reserved_position(self):
+        return _POSITION.unpack_from(self._shm.buf, _RESERVED_OFFSET)[0]
+
+    def _read_wrapped(self, position, size):
+        offset = position % self._capacity
+        first = min(size, self._capacity - offset)
+        return bytes(self._data[offset:offset + first]) + bytes(self._data[:size - first])
+
+    def _release(self):
+        self._data.release()
+        self._shm.close()
+
+
+class BroadcastRingWriter(_RingBase):
+    DEFAULT_CAPACITY = 16 * 1024 * 1024
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        super(BroadcastRingWriter, self).__init__(shared_memory.SharedMemory(create=True,
+                                                                            size=_HEADER_SIZE + capacity))
+        self._write_position = 0
+        _POSITION.pack_into(self._shm.buf, _RESERVED_OFFSET, self._write_position)
+        _POSITION.pack_into(self._shm.buf, _COMMITTED_OFFSET, self._write_position)
+
+    def _write_wrapped(self, position, data):
+        offset = position % self._capacity
+        first = min(len(data), self._capacity - offset)
+        self._data[offset:offset + first] = data[:first]
+        self._data[:len(data) - first] = data[first:]
+
+    def write(self, obj):
+        payload = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+        record = _LENGTH.pack(len(payload)) + payload
+        if len(record) > self._capacity:
+            raise ValueError('Object is too large for the ring: %d bytes' % len(record))
+
+        # The space is reserved before it is overwritten, so that readers can detect that their copy may be corrupted;
+        # the record is committed after it is written, so that readers never see an incomplete record
+        _POSITION.pack_into(self._shm.buf, _RESERVED_OFFSET, self._write_position + len(record))
+        self._write_wrapped(self._write_position, record)
+        self._write_position += len(record)
+        _POSITION.pack_into(self._shm.buf, _COMMITTED_OFFSET, self._write_position)
+
+    def close(self):
+        self._release()
+        self._shm.unlink()
+
+
+class BroadcastRingReader(_RingBase):
+    """Reading starts from the moment the reader is attached."""
+    MAX_BYTES_PER_READ = 1024 * 1024
+
+    def __init__(self, name):
+        super(BroadcastRingReader, self).__init__(shared_memory.SharedMemory(name=name))
+        self._read_position = self._get_write_position()
+        self._pending = deque()
+        self.num_lost_bytes = 0
+
+    def _skip_to(self, position):
+        self.num_lost_bytes += position - self._read_position
+        self._read_position = position
+
+    def _copy(self, size):
+        """Returns the copied bytes, or None if the writer has overwritten them while they were being copied."""
+        block = self._read_wrapped(self._read_position, size)
+        # The writer may have started overwriting the block before committing anything, hence the reserved position
+        if self._get_reserved_position() - self._read_position > self._capacity:
+            self._skip_to(self._get_write_position())
+            return None
+        return block
+
+    def _fetch(self):
+        write_position = self._get_write_position()
+        available = write_position - self._read_position
+        if available > self._capacity:
+            self._skip_to(write_position)               # Fell behind, the unread data has been overwritten
+            return
+
+        block = self._copy(min(available, self.MAX_BYTES_PER_READ))
+        offset = 0
+        while block is not None and offset + _LENGTH.size <= len(block):
+            size, = _LENGTH.unpack_from(block, offset)
+            end = offset + _LENGTH.size + size
+            if end > available:
+                logger.warning('Broadcast ring record is inconsistent, resynchronizing')
+                self._skip_to(write_position)
+                return
+            if end > len(block):
+                if offset > 0:
+                    break
+                block = self._copy(end)                 # A single record that is larger than the usual read
+                continue
+            try:
+                self._pending.append(pickle.loads(block[offset + _LENGTH.size:end]))
+            except Exception:
+                logger.error('Could not deserialize broadcast ring record', exc_info=True)
+            offset = end
+
+        if block is not None:
+            self._read_position += offset
+
+    def read(self):
+        """Returns the next object, or None if there is nothing to read."""
+        if not self._pending:
+            self._fetch()
+        return self._pending.popleft() if self._pending else None
+
+    def close(self):
+        self._release()
@@ -0,0 +1,151 @@
+#
+# Copyright (C) 2016  UAVCAN Development Team  <uavcan.org>
+#
+# This software is distributed under the terms of the MIT License.
+#
+# Author: Pavel Kirienko <pavel.kirienko@zubax.com>
+#
+
+import os
+import shutil
+import atexit
+import logging
+import tempfile
+import numpy
+
+
+logger = logging.getLogger(__name__)
+
+
+class DiskTimeSeries:
+    """
+    Append-only on-disk store of (x, y) points, where x must be non-decreasing (i.e. it is a time series).
+    Points are accumulated in memory and written to disk in fixed-size chunks; flushed chunks are read back via a
+    read-only memory map. For every chunk, a min/max summary of Y over blocks of SUMMARY_BLOCK_SIZE points is kept in
+    memory, so that wide ranges can be rendered without touching the disk at all.
+    """
+    CHUNK_SIZE = 65536
+    SUMMARY_BLOCK_SIZE = 256
+
+    def __init__(self, directory, name):
+        self._path = os.path.join(directory, name + '.bin')
+        self._file = open(self._path, 'wb')
+        self._mmap = None
+
+        self._pending = numpy.empty((self.CHUNK_SIZE, 2), dtype=numpy.float64)
+        self._num_pending = 0
+        self._num_chunks = 0
+
+        self._chunk_last_x = []
+        self._summaries = []        # Per chunk: array of (x, y_min, y_max)
+
+    def __len__(self):
+        return self._num_chunks * self.CHUNK_SIZE + self._num_pending
+
+    def append(self, x, y):
+        self._pending[self._num_pending] = x, y
+        self._num_pending += 1
+        if self._num_pending >= self.CHUNK_SIZE:
+            self._flush_chunk()
+
+    def extend(self, xs, ys):
+        pos = 0
+        while pos < len(xs):
+            n = min(len(xs) - pos, self.CHUNK_SIZE - self._num_pending)
+            self._pending[self._num_pending:self._num_pending + n, 0] = xs[pos:pos + n]
+            self._pending[self._num_pending:self._num_pending + n, 1] = ys[pos:pos + n]
+            self._num_pending += n
+            pos += n
+            if self._num_pending >= self.CHUNK_SIZE:
+                self._flush_chunk()
+
+    def _flush_chunk(self):
+        chunk = self._pending
+        self._file.write(chunk.tobytes())
+        self._file.flush()
+
+        block_starts = numpy.arange(0, self.CHUNK_SIZE, self.SUMMARY_BLOCK_SIZE)
+        self._summaries.append(numpy.column_stack((chunk[block_starts, 0],
+                                                   numpy.minimum.reduceat(chunk[:, 1], block_starts),
+                                                   numpy.maximum.reduceat(chunk[:, 1], block_starts))))
+        self._chunk_last_x.append(chunk[-1, 0])
+
+        self._num_chunks += 1
+        self._num_pending = 0
+        self._mmap = None           # Will be re-created with the new size when needed
+
+    def _get_mmap(self):
+        if self._mmap is None:
+            self._mmap = numpy.memmap(self._path, dtype=numpy.float64, mode='r',
+                                      shape=(self._num_chunks * self.CHUNK_SIZE, 2))
+        return self._mmap
+
+    def _find(self, x):
+        """Returns the index of the first flushed point whose X is not less than x. Touches at most one chunk."""
+        chunk_index = int(numpy.searchsorted(self._chunk_last_x, x, side='left'))
+        if chunk_index >= self._num_chunks:
+            return self._num_chunks * self.CHUNK_SIZE
+        base = chunk_index * self.CHUNK_SIZE
+        return base + int(numpy.searchsorted(self._get_mmap()[base:base + self.CHUNK_SIZE, 0], x, side='left'))
+
+    def query(self, x_min, x_max, max_points):
+        """
+        Returns (x, y) arrays with the points where x_min <= x < x_max. If there are more than max_points such points,
+        the min/max summaries are returned instead, two points per summary block.
+        Only the chunks that overlap with the requested range are accessed.
+        """
+        xs, ys = [], []
+
+        first = self._find(x_min)
+        last = self._find(x_max)
+        if last - first > max_points:
+            blocks_per_chunk = self.CHUNK_SIZE // self.SUMMARY_BLOCK_SIZE
+            lo = first // self.CHUNK_SIZE
+            hi = (last - 1) // self.CHUNK_SIZE + 1
+            summary = numpy.concatenate(self._summaries[lo:hi])
+            summary = summary[first // self.SUMMARY_BLOCK_SIZE - lo * blocks_per_chunk:
+                              (last - 1) // self.SUMMARY_BLOCK_SIZE + 1 - lo * blocks_per_chunk]
+            xs.append(numpy.repeat(summary[:, 0], 2))
+            ys.append(summary[:, 1:].ravel())
+        elif last > first:
+            data = self._get_mmap()[first:last]
+            xs.append(data[:, 0])
+            ys.append(data[:, 1])
+
+        if self._num_pending > 0:
+            data = self._pending[:self._num_pending]
+            data = data[(data[:, 0] >= x_min) & (data[:, 0] < x_max)]
+            xs.append(data[:, 0])
+            ys.append(data[:, 1])
+
+        if not xs:
+            return numpy.empty(0), numpy.empty(0)
+        return numpy.concatenate(xs), numpy.concatenate(ys)
+
+    def close(self):
+        self._mmap = None
+        self._file.close()
+        try:
+            os.unlink(self._path)
+        except Exception:
+            logger.error('Could not remove %r', self._path, exc_info=True)
+
+
+class DiskStoreDirectory:
+    """
+    Temporary directory holding the files of DiskTimeSeries instances; removed with all its contents on close,
+    or at exit if it was not closed.
+    """
+    def __init__(self):
+        self.path = tempfile.mkdtemp(prefix='uavcan_plotter_')
+        self._counter = 0
+        atexit.register(self.close)
+        logger.info('Plot history will be stored in %r', self.path)
+
+    def new_series(self):
+        self._counter += 1
+        return DiskTimeSeries(self.path, 'curve_%d' % self._counter)
+
+    def close(self):
+        atexit.unregister(self.close)
+        shutil.rmtree(self.path, ignore_errors=True)
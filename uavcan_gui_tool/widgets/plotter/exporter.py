@@ -0,0 +1,201 @@
+#
+# Copyright (C) 2016  UAVCAN Development Team  <uavcan.org>
+#
+# This software is distributed under the terms of the MIT License.
+#
+# Author: Pavel Kirienko <pavel.kirienko@zubax.com>
+#
+
+import os
+import io
+import zipfile
+import logging
+import tempfile
+import threading
+import numpy
+from collections import OrderedDict
+from numpy.lib import format as npy_format
+
+
+logger = logging.getLogger(__name__)
+
+
+# Number of points copied out of a ring buffer at once; this is the upper bound of the extra memory used by an export
+CHUNK_SIZE = 65536
+
+
+class ExportableCurve:
+    """
+    Snapshot of the retained range of a curve. Must be constructed from the thread that owns the ring buffers;
+    the data itself is read later, chunk by chunk, from the exporting thread. The export fails if the curve is
+    cleared or resized in the meantime.
+    """
+    def __init__(self, description, x, y):
+        self.description = description
+        self.x = x
+        self.y = y
+        self.end = x.total
+        self.first = self.end - len(x)
+        self._generations = x.generation, y.generation
+
+    def __len__(self):
+        return self.end - self.first
+
+    def iter_chunks(self, fill_gaps):
+        """
+        Yields (x, y) array pairs. Points that were evicted from the ring buffers before they could be read are
+        either skipped or, if fill_gaps is set, replaced with NaN, so that the total length is exactly len(self).
+        Raises RuntimeError if the curve has been reset.
+        """
+        pos = self.first
+        while pos < self.end:
+            count = min(CHUNK_SIZE, self.end - pos)
+            x_first, x = self.x.read(pos, count)
+            y_first, y = self.y.read(pos, count)
+            if (self.x.generation, self.y.generation) != self._generations:
+                raise RuntimeError('Curve %r has been reset during the export' % self.description)
+
+            first = min(max(x_first, y_first), self.end)
+            x = x[first - x_first:]
+            y = y[first - y_first:]
+            n = max(0, min(len(x), len(y), self.end - first))
+
+            if fill_gaps and first > pos:
+                gap = numpy.full(first - pos, numpy.nan)
+                yield gap, gap
+
+            if n > 0:
+                yield x[:n], y[:n]
+            elif first == pos:
+                break                           # Should not happen unless the buffers are inconsistent
+
+            pos = first + n
+
+        if fill_gaps and pos < self.end:
+            gap = numpy.full(self.end - pos, numpy.nan)
+            yield gap, gap
+
+
+def _write_csv_header(f, curves):
+    for idx, c in enumerate(curves):
+        f.write('# curve %d: %s\n' % (idx, c.description))
+    f.write('curve,x,y\n')
+
+
+def export_csv(path, curves):
+    """Returns the number of exported points."""
+    num_points = 0
+    with open(path, 'w', newline='') as f:
+        _write_csv_header(f, curves)
+        for idx, c in enumerate(curves):
+            for x, y in c.iter_chunks(fill_gaps=False):
+                rows = numpy.column_stack((numpy.full(len(x), idx), x, y))
+                numpy.savetxt(f, rows, fmt=['%d', '%.9f', '%.9g'], delimiter=',')
+                num_points += len(x)
+    return num_points
+
+
+def export_npz(path, curves):
+    """
+    Every curve is stored as an array of shape (N, 2) named curve_<index>; the column 0 contains X, the column 1
+    contains Y. The array named "descriptions" contains curve descriptions in the same order.
+    The file is compatible with numpy.load().
+    Every curve is written into a temporary file first, because writing into a zip member requires Python 3.6.
+    """
+    num_points = 0
+    dtype = numpy.dtype(numpy.float64)
+    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_STORED, allowZip64=True) as zf:
+        f = io.BytesIO()
+        npy_format.write_array(f, numpy.array([c.description for c in curves], dtype=str))
+        zf.writestr('descriptions.npy', f.getvalue())
+
+        for idx, c in enumerate(curves):
+            fd, tmp_path = tempfile.mkstemp(suffix='.npy', dir=os.path.dirname(os.path.abspath(path)))
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    npy_format.write_array_header_1_0(f, {
+                        'descr': npy_format.dtype_to_descr(dtype),
+                        'fortran_order': False,
+                        'shape': (len(c), 2),
+                    })
+                    for x, y in c.iter_chunks(fill_gaps=True):
+                        f.write(numpy.column_stack((x, y)).astype(dtype, copy=False).tobytes())
+                        num_points += len(x)
+                zf.write(tmp_path, 'curve_%d.npy' % idx)
+            finally:
+                os.unlink(tmp_path)
+    return num_points
+
+
+EXPORT_FORMATS = OrderedDict([
+    ('CSV (*.csv)', export_csv),
+    ('NumPy archive (*.npz)', export_npz),
+])
+
+
+class ExportTask(threading.Thread):
+    """
+    Runs an export function in a background thread. The owner is expected to poll is_alive() and then
+    inspect num_points and error.
+    """
+    def __init__(self, export_function, path, curves):
+        super(ExportTask, self).__init__(name='plot_export', daemon=True)
+        self.path = path
+        self.num_points = 0
+        self.num_expected_points = sum(map(len, curves))
+        self.error = None
+        self._export_function = export_function
+        self._curves = curves
+
+    def run(self):
+        logger.info('Exporting %d points from %d curves into %r',
+                    self.num_expected_points, len(self._curves), self.path)
+        try:
+            self.num_points = self._export_function(self.path, self._curves)
+        except Exception as ex:
+            logger.error('Export failed', exc_info=True)
+            self.error = ex
+        else:
+            logger.info('Export finished, %d points written', self.num_points)
+
+
+class ContinuousLogger:
+    """
+    Appends every extracted sample to a CSV file as it is plotted. Every row contains the timestamp, the index of
+    the extractor, and the extracted value (one column per element if the value is a sequence).
+    Extractor definitions are written into comment lines when they are first encountered.
+    """
+    BUFFER_SIZE = 1024 * 1024
+
+    def __init__(self, path):
+        self.path = path
+        self._extractor_indexes = {}
+        self._num_samples = 0
+        self._file = open(path, 'w', buffering=self.BUFFER_SIZE, newline='')
+        self._file.write('time,extractor,value...\n')
+
+    @property
+    def num_samples(self):
+        return self._num_samples
+
+    def log(self, extractor, timestamp, value):
+        try:
+            index = self._extractor_indexes[extractor]
+        except KeyError:
+            index = len(self._extractor_indexes)
+            self._extractor_indexes[extractor] = index
+            self._file.write('# extractor %d: %r\n' % (index, extractor))
+
+        try:
+            values = ','.join(map(repr, map(float, value)))
+        except TypeError:
+            values = repr(float(value))
+
+        self._file.write('%.6f,%d,%s\n' % (timestamp, index, values))
+        self._num_samples += 1
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
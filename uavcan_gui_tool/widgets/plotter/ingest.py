@@ -0,0 +1,58 @@
+#
+# Copyright (C) 2016  UAVCAN Development Team  <uavcan.org>
+#
+# This software is distributed under the terms of the MIT License.
+#
+# Author: Pavel Kirienko <pavel.kirienko@zubax.com>
+#
+
+import logging
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+
+class IngestWorker(threading.Thread):
+    """
+    Drains the incoming transfers and evaluates the extractors in a background thread, so that heavy expressions
+    do not stall the GUI. The results are accumulated into a batch which the GUI thread takes at redraw time;
+    everything that touches Qt objects (i.e. adding values to the plots) stays in the GUI thread.
+    Batch entries are tuples (data type name, monotonic timestamp, [(plot container, extractor, value)]).
+    """
+    RECEIVE_TIMEOUT = 0.1
+
+    def __init__(self, get_transfer, get_plot_containers):
+        super(IngestWorker, self).__init__(name='plotter_ingest', daemon=True)
+        self._get_transfer = get_transfer
+        self._get_plot_containers = get_plot_containers
+        self._lock = threading.Lock()
+        self._batch = []
+        self._should_stop = False
+        self.discard = False        # If set, received transfers are dropped without processing
+
+    def run(self):
+        logger.info('Ingest worker started')
+        while not self._should_stop:
+            try:
+                tr = self._get_transfer(self.RECEIVE_TIMEOUT)
+                if tr is None or self.discard:
+                    continue
+
+                results = []
+                for plc in self._get_plot_containers():
+                    results += [(plc, extractor, value) for extractor, value in plc.extract(tr)]
+
+                with self._lock:
+                    self._batch.append((tr.data_type_name, tr.ts_mono, results))
+            except Exception:
+                logger.error('Ingest worker failure', exc_info=True)
+        logger.info('Ingest worker stopped')
+
+    def take_batch(self):
+        with self._lock:
+            batch, self._batch = self._batch, []
+        return batch
+
+    def stop(self):
+        self._should_stop = True
@@ -13,12 +13,34 @@ from ....thirdparty.pyqtgraph import mkPen, InfiniteLine
 
 
 class AbstractPlotArea:
+    # Whether X of every curve is time, i.e. it never decreases
+    IS_TIME_SERIES = False
+
     def add_value(self, extractor, timestamp, value):
         pass
 
     def remove_curves_provided_by_extractor(self, extractor):
         pass
 
+    def get_curves(self):
+        """Returns a list of (extractor, curve index, X ring buffer, Y ring buffer) for all curves being plotted."""
+        return []
+
+    def get_visible_x_range(self):
+        return None
+
+    def get_selection(self):
+        """Returns the X range between the crosshair reference point and the cursor, or None if not selected."""
+        return None
+
+    def get_time_cursor(self):
+        """Returns the X of the crosshair reference point if X is time, otherwise None."""
+        return None
+
+    def set_time_cursor(self, x):
+        """Shows the time cursor that was set elsewhere (e.g. in another window); ignored if X is not time."""
+        pass
+
     def update(self):
         pass
 
@@ -27,6 +49,7 @@ class AbstractPlotArea:
 
 
 def add_crosshair(plot, render_measurements, color=Qt.gray):
+    """Returns a function that returns the current and the reference coordinates; either may be None."""
     pen = mkPen(color=QColor(color), width=1)
     vline = InfiniteLine(angle=90, movable=False, pen=pen)
     hline = InfiniteLine(angle=0, movable=False, pen=pen)
@@ -58,11 +81,19 @@ def add_crosshair(plot, render_measurements, color=Qt.gray):
     plot.scene().sigMouseMoved.connect(update)
     plot.scene().sigMouseClicked.connect(set_reference)
 
+    return lambda: (current_coordinates, reference_coordinates)
+
 
 from .yt import PlotAreaYTWidget
 from .xy import PlotAreaXYWidget
+from .spectrum import PlotAreaSpectrumWidget
+from .histogram import PlotAreaHistogramWidget
+from .heatmap import PlotAreaHeatmapWidget
 
 PLOT_AREAS = OrderedDict([
     ('Y-T plot', PlotAreaYTWidget),
     ('X-Y plot', PlotAreaXYWidget),
+    ('Spectrum plot', PlotAreaSpectrumWidget),
+    ('Histogram', PlotAreaHistogramWidget),
+    ('Heatmap', PlotAreaHeatmapWidget),
 ])
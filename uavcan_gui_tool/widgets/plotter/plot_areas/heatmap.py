@@ -0,0 +1,164 @@
+#
+# Copyright (C) 2016  UAVCAN Development Team  <uavcan.org>
+#
+# This software is distributed under the terms of the MIT License.
+#
+# Author: Pavel Kirienko <pavel.kirienko@zubax.com>
+#
+
+import numpy
+import logging
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QSpinBox, QLabel, QCheckBox
+from PyQt5.QtGui import QColor
+from PyQt5.QtCore import Qt, QRectF
+from ....thirdparty.pyqtgraph import PlotWidget, ImageItem, ColorMap
+from . import AbstractPlotArea, add_crosshair
+from ... import make_icon_button
+from ..ring_buffer import RingBuffer
+
+
+logger = logging.getLogger(__name__)
+
+
+def _make_lookup_table():
+    # Black - blue - cyan - yellow - white, readable on the black background of other plots
+    positions = [0.0, 0.25, 0.5, 0.75, 1.0]
+    colors = [(0, 0, 0, 255), (0, 0, 255, 255), (0, 255, 255, 255), (255, 255, 0, 255), (255, 255, 255, 255)]
+    return ColorMap(numpy.array(positions), numpy.array(colors, dtype=numpy.ubyte)).getLookupTable(0.0, 1.0, 256)
+
+
+class ImageContainer:
+    """
+    Keeps the history of an array-valued extractor in a 2-D ring buffer (one row per sample) and renders it with
+    a single image item, so that the cost of a redraw does not depend on the number of array elements.
+    """
+    def __init__(self, image, num_rows, num_elements):
+        self.image = image
+        self.t = RingBuffer(num_rows)
+        self.values = RingBuffer(num_rows, sample_shape=(num_elements,))
+        self.dirty = False
+
+    @property
+    def num_elements(self):
+        return self.values.sample_shape[0]
+
+    def add_row(self, t, values):
+        self.t.append(t)
+        self.values.append(values)
+        self.dirty = True
+
+    def set_num_rows(self, num_rows):
+        if self.t.capacity != num_rows:
+            self.t.resize(num_rows)
+            self.values.resize(num_rows)
+            self.dirty = True
+
+    def update(self, element_offset, auto_levels):
+        if not self.dirty or len(self.t) < 2:
+            return
+        self.dirty = False
+
+        # Axis 0 of the image is X (time), axis 1 is Y (array element index)
+        self.image.setImage(self.values.view(), autoLevels=auto_levels or self.image.levels is None)
+
+        # Samples are not equidistant in time, so the time axis is approximate
+        t = self.t.view()
+        self.image.setRect(QRectF(t[0], element_offset, max(t[-1] - t[0], 1e-9), self.num_elements))
+
+
+class PlotAreaHeatmapWidget(QWidget, AbstractPlotArea):
+    MAX_ELEMENTS = 4096
+
+    def __init__(self, parent, display_measurements):
+        super(PlotAreaHeatmapWidget, self).__init__(parent)
+
+        self._extractor_associations = {}       # Extractor : image container
+        self._lookup_table = _make_lookup_table()
+
+        self._clear_button = make_icon_button('eraser', 'Clear all images', self, on_clicked=self.reset)
+
+        self._num_rows_spinbox = QSpinBox(self)
+        self._num_rows_spinbox.setToolTip('Number of samples to display')
+        self._num_rows_spinbox.setMinimum(2)
+        self._num_rows_spinbox.setMaximum(100000)
+        self._num_rows_spinbox.setValue(1000)
+
+        self._auto_levels_checkbox = QCheckBox('Auto levels', self)
+        self._auto_levels_checkbox.setToolTip('Stretch the color map over the displayed range of values')
+        self._auto_levels_checkbox.setChecked(True)
+
+        self._plot = PlotWidget(self, background=QColor(Qt.black))
+        self._plot.showButtons()
+        self._plot.enableAutoRange()
+        self._plot.showGrid(x=True, y=True, alpha=0.4)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self._plot, 1)
+
+        controls_layout = QHBoxLayout(self)
+        controls_layout.addWidget(self._clear_button)
+        controls_layout.addStretch(1)
+        controls_layout.addWidget(QLabel('Samples:', self))
+        controls_layout.addWidget(self._num_rows_spinbox)
+        controls_layout.addWidget(self._auto_levels_checkbox)
+
+        layout.addLayout(controls_layout)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(layout)
+
+        # Crosshair
+        def _render_measurements(cur, ref):
+            text = 'time %.6f sec,  element %d' % (cur[0], int(cur[1]))
+            if ref is None:
+                return text
+            dt = cur[0] - ref[0]
+            display_measurements(text + ';' + ' ' * 4 + 'dt %.6f sec' % dt)
+
+        display_measurements('Hover to sample Time/Element, click to set new reference')
+        add_crosshair(self._plot, _render_measurements)
+
+    def _forge_image(self, num_elements):
+        logger.info('Adding new image with %d elements', num_elements)
+        image = ImageItem()
+        image.setLookupTable(self._lookup_table)
+        self._plot.addItem(image)
+        return ImageContainer(image, self._num_rows_spinbox.value(), num_elements)
+
+    def add_value(self, extractor, timestamp, values):
+        values = numpy.asarray(values, dtype=numpy.float64).ravel()
+        if len(values) > self.MAX_ELEMENTS:
+            raise RuntimeError('%r elements is much too many' % len(values))
+
+        # If the number of elements changed, the history is no longer valid
+        if extractor in self._extractor_associations and \
+           len(values) != self._extractor_associations[extractor].num_elements:
+            self.remove_curves_provided_by_extractor(extractor)
+
+        if extractor not in self._extractor_associations:
+            self._extractor_associations[extractor] = self._forge_image(len(values))
+
+        self._extractor_associations[extractor].add_row(timestamp, values)
+
+    def remove_curves_provided_by_extractor(self, extractor):
+        try:
+            self._plot.removeItem(self._extractor_associations[extractor].image)
+            del self._extractor_associations[extractor]
+        except KeyError:
+            pass
+
+        # Remaining images may have to be moved
+        for c in self._extractor_associations.values():
+            c.dirty = True
+
+    def reset(self):
+        for k in list(self._extractor_associations.keys()):
+            self.remove_curves_provided_by_extractor(k)
+        self._plot.enableAutoRange()
+
+    def update(self):
+        # Images of different extractors are stacked on top of each other
+        element_offset = 0
+        for c in self._extractor_associations.values():
+            c.set_num_rows(self._num_rows_spinbox.value())
+            c.update(element_offset, self._auto_levels_checkbox.isChecked())
+            element_offset += c.num_elements
@@ -0,0 +1,294 @@
+#
+# Copyright (C) 2016  UAVCAN Development Team  <uavcan.org>
+#
+# This software is distributed under the terms of the MIT License.
+#
+# Author: Pavel Kirienko <pavel.kirienko@zubax.com>
+#
+
+import math
+import numpy
+import logging
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QSpinBox, QComboBox, QLabel, QDoubleSpinBox
+from PyQt5.QtGui import QColor
+from PyQt5.QtCore import Qt
+from ....thirdparty.pyqtgraph import PlotWidget, mkPen, mkBrush
+from . import AbstractPlotArea, add_crosshair
+from ... import make_icon_button, get_monospace_font
+
+
+logger = logging.getLogger(__name__)
+
+
+MODE_ADAPTIVE = 'Adaptive'
+MODE_FIXED = 'Fixed'
+
+
+class RunningStatistics:
+    """Welford's algorithm; O(1) per sample, numerically stable."""
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.min = None
+        self.max = None
+        self._m2 = 0.0
+
+    def add(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (x - self.mean)
+        self.min = x if self.min is None else min(self.min, x)
+        self.max = x if self.max is None else max(self.max, x)
+
+    @property
+    def stddev(self):
+        return math.sqrt(self._m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+
+class IncrementalHistogram:
+    """
+    Histogram that is updated in O(1) per sample; the stored history is never re-scanned.
+    In the fixed mode, samples outside of the configured range are only counted as underflow/overflow.
+    In the adaptive mode, the range is extended by merging adjacent bins pairwise (doubling the bin width)
+    whenever a sample falls outside of it; this costs O(number of bins) but happens at most a logarithmic
+    number of times, so the amortized cost per sample remains O(1).
+    """
+    def __init__(self, num_bins, value_range=None):
+        self.num_bins = num_bins + num_bins % 2         # Pairwise merging requires an even number of bins
+        self.counts = numpy.zeros(self.num_bins, dtype=numpy.int64)
+        self.underflow = 0
+        self.overflow = 0
+        self.adaptive = value_range is None
+        if self.adaptive:
+            self._origin = None
+            self._width = None
+        else:
+            lo, hi = value_range
+            if not hi > lo:
+                raise ValueError('Invalid histogram range: [%r, %r]' % (lo, hi))
+            self._origin = lo
+            self._width = (hi - lo) / self.num_bins
+
+    @property
+    def edges(self):
+        if self._origin is None:
+            return numpy.zeros(0)
+        return self._origin + self._width * numpy.arange(self.num_bins + 1)
+
+    def _extend_to_cover(self, x):
+        while not (self._origin <= x < self._origin + self._width * self.num_bins):
+            merged = self.counts.reshape(-1, 2).sum(axis=1)
+            padding = numpy.zeros(self.num_bins // 2, dtype=self.counts.dtype)
+            self._width *= 2
+            if x < self._origin:
+                self._origin -= self._width * (self.num_bins // 2)
+                self.counts = numpy.concatenate((padding, merged))
+            else:
+                self.counts = numpy.concatenate((merged, padding))
+
+    def add(self, x):
+        if not math.isfinite(x):
+            return
+
+        if self._origin is None:
+            # The initial bin width is tiny; it will be grown to the actual spread of the data as it arrives
+            self._width = max(abs(x) * 1e-6, 1e-9)
+            self._origin = x - self._width * (self.num_bins // 2)
+
+        if self.adaptive:
+            self._extend_to_cover(x)
+
+        index = int((x - self._origin) // self._width)
+        if index < 0:
+            self.underflow += 1
+        elif index >= self.num_bins:
+            self.overflow += 1
+        else:
+            self.counts[index] += 1
+
+
+class HistogramCurveContainer:
+    def __init__(self, plot, histogram):
+        self.plot = plot
+        self.histogram = histogram
+        self.stat = RunningStatistics()
+        self.dirty = False
+
+    def add_point(self, y):
+        if not math.isfinite(y):
+            return              # Ignored by the histogram as well; a single NaN would spoil the statistics forever
+        self.histogram.add(y)
+        self.stat.add(y)
+        self.dirty = True
+
+    def update(self):
+        if self.dirty:
+            self.dirty = False
+            edges = self.histogram.edges
+            if len(edges):
+                self.plot.setData(edges, self.histogram.counts)
+            else:
+                self.plot.clear()           # The adaptive range is not known until the first sample is received
+
+    def render_stat(self):
+        s = self.stat
+        if s.count == 0:
+            return 'no data'
+        return 'n %d,  mean %.6g,  std %.6g,  min %.6g,  max %.6g,  under/overflow %d/%d' % \
+            (s.count, s.mean, s.stddev, s.min, s.max, self.histogram.underflow, self.histogram.overflow)
+
+
+class PlotAreaHistogramWidget(QWidget, AbstractPlotArea):
+    MAX_CURVES_PER_EXTRACTOR = 9
+
+    def __init__(self, parent, display_measurements):
+        super(PlotAreaHistogramWidget, self).__init__(parent)
+
+        self._extractor_associations = {}       # Extractor : plots
+
+        self._clear_button = make_icon_button('eraser', 'Clear all histograms', self, on_clicked=self.reset)
+
+        self._num_bins_spinbox = QSpinBox(self)
+        self._num_bins_spinbox.setMinimum(2)
+        self._num_bins_spinbox.setMaximum(10000)
+        self._num_bins_spinbox.setValue(100)
+        self._num_bins_spinbox.valueChanged.connect(self.reset)
+
+        self._mode_box = QComboBox(self)
+        self._mode_box.setEditable(False)
+        self._mode_box.setToolTip('Adaptive mode extends the range automatically; '
+                                  'fixed mode counts samples outside of the range as underflow/overflow')
+        self._mode_box.addItems([MODE_ADAPTIVE, MODE_FIXED])
+        self._mode_box.setCurrentIndex(0)
+        self._mode_box.currentTextChanged.connect(self.reset)
+
+        def make_range_spinbox(value):
+            b = QDoubleSpinBox(self)
+            b.setMinimum(-1e9)
+            b.setMaximum(1e9)
+            b.setDecimals(6)
+            b.setValue(value)
+            b.valueChanged.connect(self.reset)
+            return b
+
+        self._range_min_spinbox = make_range_spinbox(-1)
+        self._range_max_spinbox = make_range_spinbox(1)
+
+        self._stat_label = QLabel(self)
+        self._stat_label.setFont(get_monospace_font())
+        self._stat_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+
+        self._plot = PlotWidget(self, background=QColor(Qt.black))
+        self._plot.showButtons()
+        self._plot.enableAutoRange()
+        self._plot.showGrid(x=True, y=True, alpha=0.4)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self._plot, 1)
+        layout.addWidget(self._stat_label)
+
+        controls_layout = QHBoxLayout(self)
+        controls_layout.addWidget(self._clear_button)
+        controls_layout.addStretch(1)
+        controls_layout.addWidget(QLabel('Bins:', self))
+        controls_layout.addWidget(self._num_bins_spinbox)
+        controls_layout.addWidget(QLabel('Range:', self))
+        controls_layout.addWidget(self._mode_box)
+        controls_layout.addWidget(self._range_min_spinbox)
+        controls_layout.addWidget(self._range_max_spinbox)
+
+        layout.addLayout(controls_layout)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(layout)
+
+        # Crosshair
+        def _render_measurements(cur, ref):
+            text = 'value %.6f,  count %.1f' % cur
+            if ref is None:
+                return text
+            dx = cur[0] - ref[0]
+            dy = cur[1] - ref[1]
+            display_measurements(text + ';' + ' ' * 4 + 'dvalue %.6f,  dcount %.1f' % (dx, dy))
+
+        display_measurements('Hover to sample Value/Count, click to set new reference')
+        add_crosshair(self._plot, _render_measurements)
+
+        self._update_range_controls()
+
+    def _update_range_controls(self):
+        fixed = self._mode_box.currentText() == MODE_FIXED
+        self._range_min_spinbox.setEnabled(fixed)
+        self._range_max_spinbox.setEnabled(fixed)
+
+    def _make_histogram(self):
+        if self._mode_box.currentText() == MODE_FIXED:
+            value_range = self._range_min_spinbox.value(), self._range_max_spinbox.value()
+        else:
+            value_range = None
+        return IncrementalHistogram(self._num_bins_spinbox.value(), value_range)
+
+    def _forge_curves(self, how_many, color):
+        out = []
+        darkening_values = [100, 200, 300]
+        for idx in range(how_many):
+            logger.info('Adding new histogram')
+            curve_color = QColor(color).darker(darkening_values[idx % len(darkening_values)])
+            fill_color = QColor(curve_color)
+            fill_color.setAlpha(64)
+            plot = self._plot.plot(name=str(idx), pen=mkPen(color=curve_color, width=1),
+                                   stepMode=True, fillLevel=0, brush=mkBrush(fill_color))
+            out.append(HistogramCurveContainer(plot, self._make_histogram()))
+        return out
+
+    def add_value(self, extractor, _timestamp, y):
+        try:
+            num_curves = len(y)
+        except Exception:
+            num_curves = 1
+            y = y,
+
+        if extractor in self._extractor_associations and num_curves != len(self._extractor_associations[extractor]):
+            self.remove_curves_provided_by_extractor(extractor)
+
+        if extractor not in self._extractor_associations:
+            if num_curves > self.MAX_CURVES_PER_EXTRACTOR:
+                raise RuntimeError('%r curves is much too many' % num_curves)
+            self._extractor_associations[extractor] = self._forge_curves(num_curves, extractor.color)
+
+        for idx, curve in enumerate(self._extractor_associations[extractor]):
+            curve.add_point(float(y[idx]))
+
+    def remove_curves_provided_by_extractor(self, extractor):
+        try:
+            curves = self._extractor_associations[extractor]
+            del self._extractor_associations[extractor]
+            for c in curves:
+                self._plot.removeItem(c.plot)
+        except KeyError:
+            pass
+
+    def reset(self):
+        self._update_range_controls()
+        if self._mode_box.currentText() == MODE_FIXED and \
+           not self._range_max_spinbox.value() > self._range_min_spinbox.value():
+            self._stat_label.setText('Invalid range')
+            return
+
+        for curves in self._extractor_associations.values():
+            for c in curves:
+                c.histogram = self._make_histogram()
+                c.stat = RunningStatistics()
+                c.dirty = True
+        self._plot.enableAutoRange()
+
+    def update(self):
+        lines = []
+        for extractor, curves in self._extractor_associations.items():
+            for idx, c in enumerate(curves):
+                c.update()
+                lines.append('%s [%d]: %s' % (extractor.extraction_expression.source, idx, c.render_stat()))
+
+        text = '\n'.join(lines)
+        if self._stat_label.text() != text:
+            self._stat_label.setText(text)
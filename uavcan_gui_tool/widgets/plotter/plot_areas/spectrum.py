@@ -0,0 +1,265 @@
+#
+# Copyright (C) 2016  UAVCAN Development Team  <uavcan.org>
+#
+# This software is distributed under the terms of the MIT License.
+#
+# Author: Pavel Kirienko <pavel.kirienko@zubax.com>
+#
+
+import time
+import numpy
+import logging
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QSpinBox, QComboBox, QLabel, QCheckBox, QDoubleSpinBox
+from PyQt5.QtGui import QColor
+from PyQt5.QtCore import Qt
+from ....thirdparty.pyqtgraph import PlotWidget, mkPen
+from . import AbstractPlotArea, add_crosshair
+from ... import make_icon_button
+from ..ring_buffer import RingBuffer
+
+
+logger = logging.getLogger(__name__)
+
+
+METHOD_FFT = 'FFT amplitude'
+METHOD_WELCH = 'Welch PSD'
+
+
+def resample_uniformly(t, y):
+    """
+    UAVCAN messages are not timestamped on a regular grid, so the samples are linearly interpolated onto a uniform
+    grid with the same number of points spanning the same time interval.
+    Returns (sampling frequency, resampled values).
+    """
+    duration = t[-1] - t[0]
+    if duration <= 0:
+        raise ValueError('Timestamps do not span any time')
+    grid = numpy.linspace(t[0], t[-1], len(t))
+    return (len(t) - 1) / duration, numpy.interp(grid, t, y)
+
+
+def compute_spectrum(t, y, method, segment_length):
+    """
+    Returns (frequencies, values). For METHOD_FFT, values are single-sided amplitudes of a Hann-windowed FFT over
+    all samples. For METHOD_WELCH, values are the power spectral density averaged over Hann-windowed segments
+    with 50% overlap.
+    """
+    fs, y = resample_uniformly(t, y)
+
+    if method == METHOD_FFT:
+        window = numpy.hanning(len(y))
+        spectrum = numpy.abs(numpy.fft.rfft((y - y.mean()) * window)) * 2 / window.sum()
+        spectrum[0] /= 2
+        return numpy.fft.rfftfreq(len(y), 1 / fs), spectrum
+
+    if method == METHOD_WELCH:
+        segment_length = min(segment_length, len(y))
+        step = max(1, segment_length // 2)
+        num_segments = (len(y) - segment_length) // step + 1
+        indexes = numpy.arange(segment_length)[None, :] + step * numpy.arange(num_segments)[:, None]
+        segments = y[indexes]
+        segments = segments - segments.mean(axis=1, keepdims=True)
+
+        window = numpy.hanning(segment_length)
+        power = numpy.abs(numpy.fft.rfft(segments * window, axis=1)) ** 2
+        psd = power.mean(axis=0) / (fs * (window ** 2).sum())
+        psd[1:-1 if segment_length % 2 == 0 else None] *= 2         # Single-sided; DC and Nyquist are not doubled
+        return numpy.fft.rfftfreq(segment_length, 1 / fs), psd
+
+    raise ValueError('Unknown method: %r' % method)
+
+
+class SpectrumCurveContainer:
+    MIN_SAMPLES = 8
+
+    def __init__(self, plot, window_size, darkening):
+        self.plot = plot
+        self.t = RingBuffer(window_size)
+        self.y = RingBuffer(window_size)
+        self.dirty = False
+        self._darkening = darkening         # Curves of the same extractor are distinguished by darkening
+        self._color = None
+
+    def set_color(self, color):
+        if self._color != color:
+            self._color = QColor(color)
+            self.plot.setPen(mkPen(color=self._color.darker(self._darkening), width=1))
+
+    def add_point(self, t, y):
+        self.t.append(t)
+        self.y.append(y)
+        self.dirty = True
+
+    def set_window_size(self, window_size):
+        if self.t.capacity != window_size:
+            self.t.resize(window_size)
+            self.y.resize(window_size)
+            self.dirty = True
+
+    def update(self, method, segment_length, log_scale):
+        if not self.dirty or len(self.t) < self.MIN_SAMPLES:
+            return
+        self.dirty = False
+        freq, values = compute_spectrum(self.t.view(), self.y.view(), method, segment_length)
+        if log_scale:
+            values = 10 * numpy.log10(numpy.maximum(values, 1e-30))
+        self.plot.setData(freq, values)
+
+
+class PlotAreaSpectrumWidget(QWidget, AbstractPlotArea):
+    MAX_CURVES_PER_EXTRACTOR = 9
+
+    def __init__(self, parent, display_measurements):
+        super(PlotAreaSpectrumWidget, self).__init__(parent)
+
+        self._extractor_associations = {}       # Extractor : plots
+        self._last_update_at = 0
+
+        self._clear_button = make_icon_button('eraser', 'Clear all curves', self, on_clicked=self.reset)
+
+        self._window_size_spinbox = QSpinBox(self)
+        self._window_size_spinbox.setToolTip('Spectrum is computed over this many last samples of each curve')
+        self._window_size_spinbox.setMinimum(16)
+        self._window_size_spinbox.setMaximum(1000000)
+        self._window_size_spinbox.setValue(4096)
+
+        self._method_box = QComboBox(self)
+        self._method_box.setEditable(False)
+        self._method_box.addItems([METHOD_WELCH, METHOD_FFT])
+        self._method_box.setCurrentIndex(0)
+        self._method_box.currentTextChanged.connect(self._invalidate)
+
+        self._segment_length_spinbox = QSpinBox(self)
+        self._segment_length_spinbox.setToolTip('Welch segment length; shorter segments reduce variance '
+                                                'at the cost of frequency resolution')
+        self._segment_length_spinbox.setMinimum(16)
+        self._segment_length_spinbox.setMaximum(1000000)
+        self._segment_length_spinbox.setValue(512)
+        self._segment_length_spinbox.valueChanged.connect(self._invalidate)
+
+        self._update_rate_spinbox = QDoubleSpinBox(self)
+        self._update_rate_spinbox.setToolTip('How many times per second the spectrum is recomputed')
+        self._update_rate_spinbox.setMinimum(0.1)
+        self._update_rate_spinbox.setMaximum(20)
+        self._update_rate_spinbox.setDecimals(1)
+        self._update_rate_spinbox.setValue(2)
+
+        self._log_scale_checkbox = QCheckBox('dB', self)
+        self._log_scale_checkbox.setToolTip('Display values in decibels')
+        self._log_scale_checkbox.setChecked(True)
+        self._log_scale_checkbox.clicked.connect(self._invalidate)
+
+        self._plot = PlotWidget(self, background=QColor(Qt.black))
+        self._plot.showButtons()
+        self._plot.enableAutoRange()
+        self._plot.showGrid(x=True, y=True, alpha=0.4)
+        self._legend = None
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self._plot, 1)
+
+        controls_layout = QHBoxLayout(self)
+        controls_layout.addWidget(self._clear_button)
+        controls_layout.addStretch(1)
+        controls_layout.addWidget(QLabel('Samples:', self))
+        controls_layout.addWidget(self._window_size_spinbox)
+        controls_layout.addWidget(self._method_box)
+        controls_layout.addWidget(QLabel('Segment:', self))
+        controls_layout.addWidget(self._segment_length_spinbox)
+        controls_layout.addWidget(QLabel('Updates/sec:', self))
+        controls_layout.addWidget(self._update_rate_spinbox)
+        controls_layout.addWidget(self._log_scale_checkbox)
+
+        layout.addLayout(controls_layout)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(layout)
+
+        # Crosshair
+        def _render_measurements(cur, ref):
+            text = 'freq %.6f Hz,  y %.6f' % cur
+            if ref is None:
+                return text
+            df = cur[0] - ref[0]
+            dy = cur[1] - ref[1]
+            display_measurements(text + ';' + ' ' * 4 + 'df %.6f Hz,  dy %.6f' % (df, dy))
+
+        display_measurements('Hover to sample Frequency/Y, click to set new reference')
+        add_crosshair(self._plot, _render_measurements)
+
+    def _invalidate(self):
+        for curves in self._extractor_associations.values():
+            for c in curves:
+                c.dirty = True
+
+    def _forge_curves(self, how_many, color):
+        if how_many > 1 and self._legend is None:
+            self._legend = self._plot.addLegend()
+
+        out = []
+        darkening_values = [100, 200, 300]
+        for idx in range(how_many):
+            logger.info('Adding new spectrum curve')
+            curve = SpectrumCurveContainer(self._plot.plot(name=str(idx)), self._window_size_spinbox.value(),
+                                           darkening_values[idx % len(darkening_values)])
+            curve.set_color(color)
+            out.append(curve)
+        return out
+
+    def add_value(self, extractor, timestamp, y):
+        try:
+            num_curves = len(y)
+        except Exception:
+            num_curves = 1
+            y = y,
+
+        if extractor in self._extractor_associations and num_curves != len(self._extractor_associations[extractor]):
+            self.remove_curves_provided_by_extractor(extractor)
+
+        if extractor not in self._extractor_associations:
+            if num_curves > self.MAX_CURVES_PER_EXTRACTOR:
+                raise RuntimeError('%r curves is much too many' % num_curves)
+            self._extractor_associations[extractor] = self._forge_curves(num_curves, extractor.color)
+
+        for idx, curve in enumerate(self._extractor_associations[extractor]):
+            curve.add_point(timestamp, float(y[idx]))
+
+    def remove_curves_provided_by_extractor(self, extractor):
+        try:
+            curves = self._extractor_associations[extractor]
+            del self._extractor_associations[extractor]
+            for c in curves:
+                self._plot.removeItem(c.plot)
+        except KeyError:
+            pass
+
+        if self._legend is not None:
+            self._legend.scene().removeItem(self._legend)
+            self._legend = None
+
+    def get_curves(self):
+        out = []
+        for extractor, curves in self._extractor_associations.items():
+            out += [(extractor, idx, c.t, c.y) for idx, c in enumerate(curves)]
+        return out
+
+    def reset(self):
+        for k in list(self._extractor_associations.keys()):
+            self.remove_curves_provided_by_extractor(k)
+        self._plot.enableAutoRange()
+
+    def update(self):
+        if time.monotonic() - self._last_update_at < 1 / self._update_rate_spinbox.value():
+            return
+        self._last_update_at = time.monotonic()
+
+        method = self._method_box.currentText()
+        self._segment_length_spinbox.setEnabled(method == METHOD_WELCH)
+
+        for extractor, curves in self._extractor_associations.items():
+            for c in curves:
+                c.set_color(extractor.color)
+                c.set_window_size(self._window_size_spinbox.value())
+                try:
+                    c.update(method, self._segment_length_spinbox.value(), self._log_scale_checkbox.isChecked())
+                except ValueError:
+                    logger.debug('Spectrum could not be computed', exc_info=True)
@@ -11,55 +11,86 @@ import logging
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QSpinBox, QComboBox, QLabel, QCheckBox, QDoubleSpinBox
 from PyQt5.QtGui import QColor
 from PyQt5.QtCore import Qt
-from ....thirdparty.pyqtgraph import PlotWidget, mkPen
+from ....thirdparty.pyqtgraph import PlotWidget, ScatterPlotItem, mkPen
 from . import AbstractPlotArea, add_crosshair
 from ... import make_icon_button
+from ..ring_buffer import RingBuffer
 
 
 logger = logging.getLogger(__name__)
 
 
 class AbstractPlotContainer:
-    def __init__(self, plot):
+    def __init__(self, plot, max_data_points):
         self.plot = plot
-        self.x = []
-        self.y = []
+        self.x = RingBuffer(max_data_points)
+        self.y = RingBuffer(max_data_points)
+        self.dirty = False
 
     def add_point(self, x, y, max_data_points):
-        while len(self.x) >= max_data_points:
-            self.x.pop(0)
-            self.y.pop(0)
-        assert len(self.x) == len(self.y)
+        if self.x.capacity != max_data_points:
+            self.x.resize(max_data_points)
+            self.y.resize(max_data_points)
         self.x.append(x)
         self.y.append(y)
+        self.dirty = True
 
     def update(self):
-        self.plot.setData(self.x, self.y)
+        if self.dirty:
+            self.dirty = False
+            self.plot.setData(self.x.view(), self.y.view())
 
 
 class LinePlotContainer(AbstractPlotContainer):
-    def __init__(self, plot, pen):
-        super(LinePlotContainer, self).__init__(plot)
+    def __init__(self, plot, pen, max_data_points):
+        super(LinePlotContainer, self).__init__(plot, max_data_points)
         self.pen = pen
 
     def set_color(self, color):
-        self.pen.setColor(color)
-        self.plot.setPen(self.pen)
+        if self.pen.color() != color:
+            self.pen.setColor(color)
+            self.plot.setPen(self.pen)
 
 
 class ScatterPlotContainer(AbstractPlotContainer):
-    def __init__(self, parent, color):
-        self.parent = parent
-        super(ScatterPlotContainer, self).__init__(self._inst(color))
-
-    def _inst(self, color):
-        return self.parent.scatterPlot(symbol='+', size=2, pen=mkPen(color=color, width=1))
+    """
+    Keeps a single persistent scatter plot item. Points received since the last redraw are appended to it in one
+    batch; the item is rebuilt from the ring buffers only when the evicted points that it still displays exceed
+    REBUILD_SLACK of the capacity, so the amortized cost per point remains constant.
+    """
+    REBUILD_SLACK = 0.25
+
+    def __init__(self, parent, color, max_data_points):
+        self._color = QColor(color)
+        plot = ScatterPlotItem(symbol='+', size=2, pen=mkPen(color=self._color, width=1), pxMode=True)
+        parent.addItem(plot)
+        super(ScatterPlotContainer, self).__init__(plot, max_data_points)
+        self._num_displayed = 0
+        self._displayed_up_to = 0       # Value of RingBuffer.total at the last redraw
 
     def set_color(self, color):
-        # We have to re-create the plot from scratch, because seems to be impossible to re-color a ScatterPlot
-        # once it has been created. Either it's bug in PyQtGraph, or I'm doing something wrong.
-        self.parent.removeItem(self.plot)
-        self.plot = self._inst(color)
+        if self._color != color:
+            self._color = QColor(color)
+            self.plot.setPen(mkPen(color=self._color, width=1))
+
+    def update(self):
+        if not self.dirty:
+            return
+        self.dirty = False
+
+        num_new = self.x.total - self._displayed_up_to
+        can_append = 0 <= num_new <= len(self.x) and \
+            self._num_displayed + num_new <= self.x.capacity * (1 + self.REBUILD_SLACK)
+
+        if can_append:
+            if num_new > 0:
+                self.plot.addPoints(x=self.x.view()[-num_new:], y=self.y.view()[-num_new:])
+                self._num_displayed += num_new
+        else:
+            self.plot.setData(x=self.x.view(), y=self.y.view())
+            self._num_displayed = len(self.x)
+
+        self._displayed_up_to = self.x.total
 
 
 class PlotAreaXYWidget(QWidget, AbstractPlotArea):
@@ -153,9 +184,9 @@ class PlotAreaXYWidget(QWidget, AbstractPlotArea):
 
         mode = self._plot_mode_box.currentText().lower()
         if mode == 'line':
-            return LinePlotContainer(self._plot.plot(), mkPen(color=color, width=1))
+            return LinePlotContainer(self._plot.plot(), mkPen(color=color, width=1), self._max_data_points)
         elif mode == 'scatter':
-            return ScatterPlotContainer(self._plot, color)
+            return ScatterPlotContainer(self._plot, color, self._max_data_points)
         else:
             raise RuntimeError('Invalid plot mode: %r' % mode)
 
@@ -171,12 +202,14 @@ class PlotAreaXYWidget(QWidget, AbstractPlotArea):
             self._extractor_associations[extractor] = self._forge_curve(extractor.color)
 
         self._extractor_associations[extractor].add_point(float(x), float(y), self._max_data_points)
-        self._extractor_associations[extractor].set_color(extractor.color)
 
     def remove_curves_provided_by_extractor(self, extractor):
         self._plot.removeItem(self._extractor_associations[extractor].plot)
         del self._extractor_associations[extractor]
 
+    def get_curves(self):
+        return [(extractor, 0, c.x, c.y) for extractor, c in self._extractor_associations.items()]
+
     def _do_clear(self):
         for k in list(self._extractor_associations.keys()):
             self.remove_curves_provided_by_extractor(k)
@@ -186,5 +219,6 @@ class PlotAreaXYWidget(QWidget, AbstractPlotArea):
         self._plot.enableAutoRange()
 
     def update(self):
-        for c in self._extractor_associations.values():
+        for extractor, c in self._extractor_associations.items():
+            c.set_color(extractor.color)
             c.update()
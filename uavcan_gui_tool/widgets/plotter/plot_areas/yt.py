@@ -6,13 +6,16 @@
 # Author: Pavel Kirienko <pavel.kirienko@zubax.com>
 #
 
+import numpy
 import logging
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QComboBox, QDoubleSpinBox, QLabel
 from PyQt5.QtGui import QColor
 from PyQt5.QtCore import Qt
-from ....thirdparty.pyqtgraph import PlotWidget, mkPen
+from ....thirdparty.pyqtgraph import PlotWidget, mkPen, InfiniteLine
 from . import AbstractPlotArea, add_crosshair
 from ... import make_icon_button
+from ..ring_buffer import RingBuffer
+from ..disk_store import DiskStoreDirectory
 
 
 logger = logging.getLogger(__name__)
@@ -20,22 +23,33 @@ logger = logging.getLogger(__name__)
 
 class CurveContainer:
     MAX_DATA_POINTS = 200000
+    MAX_POINTS_FROM_DISK = 20000
 
     def __init__(self, plot, base_color, darkening, pen):
         self.base_color = base_color
         self.darkening = darkening
         self.pen = pen
         self.plot = plot
-        self.x = []
-        self.y = []
+        self.x = RingBuffer(self.MAX_DATA_POINTS)
+        self.y = RingBuffer(self.MAX_DATA_POINTS)
+        self.history = None
+        self.dirty = False
+        self._drawn_x_range = None
 
     def add_point(self, x, y):
-        while len(self.x) >= self.MAX_DATA_POINTS:
-            self.x.pop(0)
-            self.y.pop(0)
-        assert len(self.x) == len(self.y)
         self.x.append(x)
         self.y.append(y)
+        self.dirty = True
+        if self.history is not None:
+            self.history.append(x, y)
+
+    def set_history(self, history):
+        """The in-memory data is copied into the new history store, so that nothing is lost once it is evicted."""
+        if self.history is not None:
+            self.history.close()
+        self.history = history
+        if self.history is not None:
+            self.history.extend(self.x.view(), self.y.view())
 
     def set_color(self, color):
         if self.base_color != color:
@@ -43,12 +57,70 @@ class CurveContainer:
             color = self.base_color.darker(self.darkening)
             logger.info('Updating color %r --> %r', self.pen.color(), color)
             self.pen.setColor(color)
-
-    def update(self):
-        self.plot.setData(self.x, self.y, pen=self.pen)
+            self.dirty = True
+
+    def update(self, x_range):
+        x, y = self.x.view(), self.y.view()
+
+        # If the visible range extends beyond the in-memory buffer, the older part is loaded from the disk
+        from_history = self.history is not None and len(x) > 0 and x_range[0] < x[0]
+
+        # Nothing is redrawn unless new data has arrived, or a different part of the history has become visible
+        if not self.dirty and not (from_history and x_range != self._drawn_x_range):
+            return
+        self.dirty = False
+        self._drawn_x_range = x_range
+
+        if from_history:
+            hx, hy = self.history.query(x_range[0], x[0], self.MAX_POINTS_FROM_DISK)
+            if len(hx) > 0:
+                x = numpy.concatenate((hx, x))
+                y = numpy.concatenate((hy, y))
+
+        self.plot.setData(x, y, pen=self.pen)
+
+
+class Trigger:
+    """
+    Single-shot trigger: fires once when the source curve crosses the level in the specified direction,
+    and completes once the post-trigger interval has been received. Every sample is checked in constant time.
+    """
+    EDGE_RISING = 'Rising'
+    EDGE_FALLING = 'Falling'
+    EDGE_EITHER = 'Either'
+
+    def __init__(self, source, level, edge, pre_trigger, post_trigger):
+        self.source = source                # (extractor, curve index)
+        self.level = level
+        self.edge = edge
+        self.pre_trigger = pre_trigger
+        self.post_trigger = post_trigger
+        self.trigger_x = None
+        self._prev_y = None
+
+    def feed(self, x, y):
+        if self.trigger_x is not None:
+            return
+        prev_y, self._prev_y = self._prev_y, y
+        if prev_y is None:
+            return
+        rising = prev_y < self.level <= y
+        falling = prev_y > self.level >= y
+        if (self.edge == self.EDGE_RISING and rising) or \
+           (self.edge == self.EDGE_FALLING and falling) or \
+           (self.edge == self.EDGE_EITHER and (rising or falling)):
+            self.trigger_x = x
+
+    def is_complete(self, max_x):
+        return self.trigger_x is not None and max_x >= self.trigger_x + self.post_trigger
+
+    @property
+    def window(self):
+        return self.trigger_x - self.pre_trigger, self.trigger_x + self.post_trigger
 
 
 class PlotAreaYTWidget(QWidget, AbstractPlotArea):
+    IS_TIME_SERIES = True
     INITIAL_X_RANGE = 120
     MAX_CURVES_PER_EXTRACTOR = 9
 
@@ -64,6 +136,15 @@ class PlotAreaYTWidget(QWidget, AbstractPlotArea):
 
         self._clear_button = make_icon_button('eraser', 'Clear all curves', self, on_clicked=self._do_clear)
 
+        self._disk_store = None
+        self._disk_history_button = make_icon_button('database', 'Keep the full history on disk; older data will be '
+                                                     'loaded from the disk when zoomed or panned into', self,
+                                                     checkable=True, on_clicked=self._toggle_disk_history)
+
+        self._trigger_button = make_icon_button('flash', 'Single-shot trigger: capture a window around the moment '
+                                                'when a curve crosses the specified level', self,
+                                                checkable=True, on_clicked=self._toggle_trigger_mode)
+
         self._plot = PlotWidget(self, background=QColor(Qt.black))
         self._plot.showButtons()
         self._plot.enableAutoRange()
@@ -72,15 +153,65 @@ class PlotAreaYTWidget(QWidget, AbstractPlotArea):
         # noinspection PyArgumentList
         self._plot.setRange(xRange=(0, self.INITIAL_X_RANGE), padding=0)
 
+        # Trigger; nothing is redrawn while the trigger is armed, and the captured window stays frozen
+        self._trigger = None
+        self._captured_trigger = None
+        self._capture_pending = False
+        self._trigger_line = None
+        self._trigger_source_keys = []
+
+        self._time_cursor_line = None
+
+        self._trigger_panel = QWidget(self)
+        self._trigger_source_box = QComboBox(self._trigger_panel)
+        self._trigger_source_box.setToolTip('Curve to trigger on')
+        self._trigger_edge_box = QComboBox(self._trigger_panel)
+        self._trigger_edge_box.addItems([Trigger.EDGE_RISING, Trigger.EDGE_FALLING, Trigger.EDGE_EITHER])
+
+        def make_spinbox(tooltip, minimum, value):
+            b = QDoubleSpinBox(self._trigger_panel)
+            b.setToolTip(tooltip)
+            b.setMinimum(minimum)
+            b.setMaximum(1e9)
+            b.setDecimals(6)
+            b.setValue(value)
+            return b
+
+        self._trigger_level_spinbox = make_spinbox('Trigger level', -1e9, 0)
+        self._pre_trigger_spinbox = make_spinbox('Seconds to capture before the trigger', 0, 1)
+        self._post_trigger_spinbox = make_spinbox('Seconds to capture after the trigger', 0, 1)
+        self._arm_button = make_icon_button('refresh', 'Arm the trigger again', self._trigger_panel, text='Arm',
+                                            on_clicked=self._arm_trigger)
+        self._trigger_status_label = QLabel(self._trigger_panel)
+
+        trigger_layout = QHBoxLayout(self._trigger_panel)
+        trigger_layout.addWidget(self._trigger_source_box, 1)
+        trigger_layout.addWidget(self._trigger_edge_box)
+        trigger_layout.addWidget(QLabel('Level:', self._trigger_panel))
+        trigger_layout.addWidget(self._trigger_level_spinbox)
+        trigger_layout.addWidget(QLabel('Pre/post, sec:', self._trigger_panel))
+        trigger_layout.addWidget(self._pre_trigger_spinbox)
+        trigger_layout.addWidget(self._post_trigger_spinbox)
+        trigger_layout.addWidget(self._arm_button)
+        trigger_layout.addWidget(self._trigger_status_label)
+        trigger_layout.setContentsMargins(0, 0, 0, 0)
+        self._trigger_panel.setLayout(trigger_layout)
+        self._trigger_panel.hide()
+
         layout = QHBoxLayout(self)
 
         controls_layout = QVBoxLayout(self)
         controls_layout.addWidget(self._clear_button)
         controls_layout.addWidget(self._autoscroll_checkbox)
+        controls_layout.addWidget(self._disk_history_button)
+        controls_layout.addWidget(self._trigger_button)
         controls_layout.addStretch(1)
         layout.addLayout(controls_layout)
 
-        layout.addWidget(self._plot, 1)
+        plot_layout = QVBoxLayout(self)
+        plot_layout.addWidget(self._plot, 1)
+        plot_layout.addWidget(self._trigger_panel)
+        layout.addLayout(plot_layout, 1)
 
         layout.setContentsMargins(0, 0, 0, 0)
         self.setLayout(layout)
@@ -99,7 +230,7 @@ class PlotAreaYTWidget(QWidget, AbstractPlotArea):
             display_measurements(text + ';' + ' ' * 4 + 'dt %.6f sec,  freq %s Hz,  dy %.6f' % (dt, freq, dy))
 
         display_measurements('Hover to sample Time/Y, click to set new reference')
-        add_crosshair(self._plot, _render_measurements)
+        self._get_crosshair_coordinates = add_crosshair(self._plot, _render_measurements)
 
     def _forge_curves(self, how_many, base_color):
         if how_many > 1 and self._legend is None:
@@ -119,7 +250,10 @@ class PlotAreaYTWidget(QWidget, AbstractPlotArea):
                 pattern = dash_patterns[int(idx / len(darkening_values)) % len(dash_patterns)]
                 pen = mkPen(color=base_color.darker(darkening), width=1, dash=pattern)
                 plot = self._plot.plot(name=str(idx), pen=pen)
-                out.append(CurveContainer(plot, base_color, darkening, pen))
+                curve = CurveContainer(plot, base_color, darkening, pen)
+                if self._disk_store is not None:
+                    curve.set_history(self._disk_store.new_series())
+                out.append(curve)
             except Exception:
                 logger.error('Could not add curve', exc_info=True)
         return out
@@ -142,20 +276,27 @@ class PlotAreaYTWidget(QWidget, AbstractPlotArea):
                 raise RuntimeError('%r curves is much too many' % num_curves)
             self._extractor_associations[extractor] = self._forge_curves(num_curves, extractor.color)
 
-        # Actually plotting
+        # Actually plotting; colors are updated once per redraw rather than per point
         for idx, curve in enumerate(self._extractor_associations[extractor]):
             curve.add_point(x, float(y[idx]))
-            curve.set_color(extractor.color)
+            if self._trigger is not None and self._trigger.source == (extractor, idx):
+                self._trigger.feed(x, float(y[idx]))
 
         # Updating the rightmost value
         self._max_x = max(self._max_x, x)
 
+        if self._trigger is not None and self._trigger.is_complete(self._max_x):
+            self._captured_trigger = self._trigger
+            self._capture_pending = True
+            self._trigger = None
+
     def remove_curves_provided_by_extractor(self, extractor):
         try:
             curves = self._extractor_associations[extractor]
             del self._extractor_associations[extractor]
             for c in curves:
                 self._plot.removeItem(c.plot)
+                c.set_history(None)
         except KeyError:
             pass
 
@@ -163,10 +304,137 @@ class PlotAreaYTWidget(QWidget, AbstractPlotArea):
             self._legend.scene().removeItem(self._legend)
             self._legend = None
 
+    def get_curves(self):
+        out = []
+        for extractor, curves in self._extractor_associations.items():
+            out += [(extractor, idx, c.x, c.y) for idx, c in enumerate(curves)]
+        return out
+
+    def get_visible_x_range(self):
+        (xmin, xmax), _ = self._plot.viewRange()
+        return xmin, xmax
+
+    def get_selection(self):
+        cur, ref = self._get_crosshair_coordinates()
+        if cur is None or ref is None:
+            return None
+        return min(cur[0], ref[0]), max(cur[0], ref[0])
+
+    def get_time_cursor(self):
+        _, ref = self._get_crosshair_coordinates()
+        return None if ref is None else ref[0]
+
+    def set_time_cursor(self, x):
+        if self._time_cursor_line is None:
+            self._time_cursor_line = InfiniteLine(angle=90, movable=False,
+                                                  pen=mkPen(QColor(Qt.magenta), width=1, dash=[6, 3]))
+            self._plot.addItem(self._time_cursor_line, ignoreBounds=True)
+        self._time_cursor_line.setPos(x)
+
+        # Bringing the cursor into view; autoscroll would move it away immediately
+        (xmin, xmax), _ = self._plot.viewRange()
+        if not (xmin <= x <= xmax):
+            self._autoscroll_checkbox.setChecked(False)
+            diff = xmax - xmin
+            # noinspection PyArgumentList
+            self._plot.setRange(xRange=(x - diff / 2, x + diff / 2), padding=0)
+
     def _do_clear(self):
         for k in list(self._extractor_associations.keys()):
             self.remove_curves_provided_by_extractor(k)
 
+    def _toggle_disk_history(self):
+        if self._disk_history_button.isChecked():
+            if self._disk_store is None:
+                self._disk_store = DiskStoreDirectory()
+                for curves in self._extractor_associations.values():
+                    for c in curves:
+                        c.set_history(self._disk_store.new_series())
+        else:
+            for curves in self._extractor_associations.values():
+                for c in curves:
+                    c.set_history(None)
+            if self._disk_store is not None:
+                self._disk_store.close()
+                self._disk_store = None
+
+    def _toggle_trigger_mode(self):
+        self._trigger_panel.setVisible(self._trigger_button.isChecked())
+        if self._trigger_button.isChecked():
+            self._update_trigger_sources()
+            self._arm_trigger()
+        else:
+            self._trigger = None
+            self._captured_trigger = None
+            self._capture_pending = False
+            self._remove_trigger_line()
+            # Resuming the normal operation
+            for curves in self._extractor_associations.values():
+                for c in curves:
+                    c.dirty = True
+
+    def _arm_trigger(self):
+        self._captured_trigger = None
+        self._capture_pending = False
+        self._remove_trigger_line()
+
+        index = self._trigger_source_box.currentIndex()
+        if index < 0:
+            self._trigger = None
+            self._trigger_status_label.setText('No curves')
+            return
+
+        self._trigger = Trigger(self._trigger_source_keys[index],
+                                self._trigger_level_spinbox.value(),
+                                self._trigger_edge_box.currentText(),
+                                self._pre_trigger_spinbox.value(),
+                                self._post_trigger_spinbox.value())
+        self._trigger_status_label.setText('Armed')
+
+    def _update_trigger_sources(self):
+        keys = []
+        for extractor, curves in self._extractor_associations.items():
+            keys += [(extractor, idx) for idx in range(len(curves))]
+        if keys == self._trigger_source_keys:
+            return
+
+        selected = self._trigger_source_box.currentIndex()
+        selected = self._trigger_source_keys[selected] if selected >= 0 else None
+        self._trigger_source_keys = keys
+        self._trigger_source_box.clear()
+        self._trigger_source_box.addItems(['%s [%d]' % (e.extraction_expression.source, idx) for e, idx in keys])
+        if selected in keys:
+            self._trigger_source_box.setCurrentIndex(keys.index(selected))
+
+    def _remove_trigger_line(self):
+        if self._trigger_line is not None:
+            self._plot.removeItem(self._trigger_line)
+            self._trigger_line = None
+
+    def _render_capture(self):
+        self._capture_pending = False
+        xmin, xmax = self._captured_trigger.window
+        for curves in self._extractor_associations.values():
+            for c in curves:
+                x, y = c.x.view(), c.y.view()
+                lo = numpy.searchsorted(x, xmin, side='left')
+                hi = numpy.searchsorted(x, xmax, side='right')
+                # Copying, because the ring buffers keep receiving new data while the capture is displayed
+                c.plot.setData(x[lo:hi].copy(), y[lo:hi].copy(), pen=c.pen)
+
+        trigger_x = self._captured_trigger.trigger_x
+        self._trigger_line = InfiniteLine(pos=trigger_x, angle=90, movable=False,
+                                          pen=mkPen(QColor(Qt.yellow), width=1, dash=[3, 3]))
+        self._plot.addItem(self._trigger_line)
+        # noinspection PyArgumentList
+        self._plot.setRange(xRange=(xmin, xmax), padding=0)
+        self._trigger_status_label.setText('Captured at %.6f' % trigger_x)
+
+    def closeEvent(self, qcloseevent):
+        self._disk_history_button.setChecked(False)
+        self._toggle_disk_history()
+        super(PlotAreaYTWidget, self).closeEvent(qcloseevent)
+
     def reset(self):
         self._do_clear()
         self._max_x = 0
@@ -175,16 +443,25 @@ class PlotAreaYTWidget(QWidget, AbstractPlotArea):
         self._plot.setRange(xRange=(0, self.INITIAL_X_RANGE), padding=0)
 
     def update(self):
+        if self._trigger_button.isChecked():
+            self._update_trigger_sources()
+            if self._capture_pending:
+                self._render_capture()
+            return
+
         # Updating curves
-        for curves in self._extractor_associations.values():
+        x_range, _ = self._plot.viewRange()
+        for extractor, curves in self._extractor_associations.items():
             for c in curves:
-                c.update()
+                c.set_color(extractor.color)
+                c.update(tuple(x_range))
 
-        # Updating view range
+        # Updating view range; the plot is not touched if it is already scrolled to the end
         if self._autoscroll_checkbox.isChecked():
-            (xmin, xmax), _ = self._plot.viewRange()
-            diff = xmax - xmin
-            xmax = self._max_x
-            xmin = self._max_x - diff
-            # noinspection PyArgumentList
-            self._plot.setRange(xRange=(xmin, xmax), padding=0)
+            xmin, xmax = x_range
+            if xmax != self._max_x:
+                diff = xmax - xmin
+                xmax = self._max_x
+                xmin = self._max_x - diff
+                # noinspection PyArgumentList
+                self._plot.setRange(xRange=(xmin, xmax), padding=0)
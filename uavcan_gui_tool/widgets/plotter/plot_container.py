@@ -7,10 +7,12 @@
 #
 
 import logging
-from PyQt5.QtWidgets import QDockWidget, QVBoxLayout, QHBoxLayout, QWidget, QLabel
+from PyQt5.QtWidgets import QDockWidget, QVBoxLayout, QHBoxLayout, QWidget, QLabel, QFileDialog
 from PyQt5.QtCore import Qt
-from .. import make_icon_button
+from .. import make_icon_button, show_error
 from .value_extractor_views import NewValueExtractorWindow, ExtractorWidget
+from .exporter import EXPORT_FORMATS, ExportableCurve, ExportTask, ContinuousLogger
+from .rolling_statistics_views import StatisticsWidget
 
 
 logger = logging.getLogger(__name__)
@@ -25,26 +27,50 @@ class PlotContainerWidget(QDockWidget):
 
         self._plot_area = plot_area_class(self, display_measurements=self.setWindowTitle)
 
-        self.update = self._plot_area.update
         self.reset = self._plot_area.reset
+        self.get_time_cursor = self._plot_area.get_time_cursor
+        self.set_time_cursor = self._plot_area.set_time_cursor
 
         self._active_data_types = active_data_types
         self._extractors = []
 
+        self._export_task = None
+        self._continuous_logger = None
+
         self._new_extractor_button = make_icon_button('plus', 'Add new value extractor', self,
                                                       on_clicked=self._do_new_extractor)
 
+        self._export_button = make_icon_button('floppy-o', 'Export all curves into a file', self,
+                                               on_clicked=self._do_export)
+
+        self._continuous_logging_button = make_icon_button('file-text-o',
+                                                           'Log every plotted sample into a file continuously',
+                                                           self, checkable=True,
+                                                           on_clicked=self._toggle_continuous_logging)
+
+        self._statistics_widget = StatisticsWidget(self, self._plot_area)
+        self._statistics_widget.setVisible(False)
+
+        self._statistics_button = make_icon_button('table', 'Show statistics of every curve', self, checkable=True,
+                                                   on_clicked=lambda: self._statistics_widget.setVisible(
+                                                       self._statistics_button.isChecked()))
+        self._statistics_button.setVisible(self._plot_area.IS_TIME_SERIES)
+
         self._how_to_label = QLabel('\u27F5 Click to configure plotting', self)
 
         widget = QWidget(self)
 
         layout = QVBoxLayout(widget)
         layout.addWidget(self._plot_area, 1)
+        layout.addWidget(self._statistics_widget)
 
         footer_layout = QHBoxLayout(self)
 
         controls_layout = QVBoxLayout(widget)
         controls_layout.addWidget(self._new_extractor_button)
+        controls_layout.addWidget(self._export_button)
+        controls_layout.addWidget(self._continuous_logging_button)
+        controls_layout.addWidget(self._statistics_button)
         controls_layout.addStretch(1)
         controls_layout.setContentsMargins(0, 0, 0, 0)
         footer_layout.addLayout(controls_layout)
@@ -89,16 +115,99 @@ class PlotContainerWidget(QDockWidget):
         win.on_done = done
         win.show()
 
-    def process_transfer(self, timestamp, tr):
-        for extractor in self._extractors:
+    def extract(self, tr):
+        """
+        Evaluates the extractors against the transfer. This method does not touch any Qt objects, so it can be
+        invoked from a background thread. Returns a list of (extractor, value).
+        """
+        out = []
+        for extractor in list(self._extractors):
             try:
                 value = extractor.try_extract(tr)
-                if value is None:
-                    continue
-                self._plot_area.add_value(extractor, timestamp, value)
+                if value is not None:
+                    out.append((extractor, value))
             except Exception:
                 extractor.register_error()
+        return out
+
+    def add_extracted_value(self, timestamp, extractor, value):
+        if extractor not in self._extractors:
+            return          # The extractor has been removed while the value was on its way
+        try:
+            self._plot_area.add_value(extractor, timestamp, value)
+            if self._continuous_logger is not None:
+                self._continuous_logger.log(extractor, timestamp, value)
+        except Exception:
+            extractor.register_error()
+
+    def update(self):
+        self._plot_area.update()
+
+        if self._continuous_logger is not None:
+            self._continuous_logger.flush()
+
+        if self._export_task is not None and not self._export_task.is_alive():
+            task, self._export_task = self._export_task, None
+            self._export_button.setEnabled(True)
+            if task.error is not None:
+                show_error('Export error', 'Could not export curves into %s' % task.path, task.error, self)
+            else:
+                self._show_status('Exported %d of %d points into %s' %
+                                  (task.num_points, task.num_expected_points, task.path))
+
+    def _show_status(self, text):
+        try:
+            self.parentWidget().statusBar().showMessage(text, 10000)
+        except Exception:
+            logger.info('%s', text)
+
+    def _ask_file_name(self, caption, filters):
+        path, selected_filter = QFileDialog().getSaveFileName(self, caption, '', ';;'.join(filters))
+        return path, selected_filter
+
+    def _do_export(self):
+        curves = [ExportableCurve('%r [%d]' % (extractor, idx), x, y)
+                  for extractor, idx, x, y in self._plot_area.get_curves()]
+        if not curves:
+            show_error('Export error', 'There is nothing to export', 'Add an extractor first', self)
+            return
+
+        path, selected_filter = self._ask_file_name('Export curves', EXPORT_FORMATS.keys())
+        if not path:
+            return
+
+        # The data is read from the ring buffers in the background, so the plot remains responsive
+        self._export_task = ExportTask(EXPORT_FORMATS[selected_filter], path, curves)
+        self._export_task.start()
+        self._export_button.setEnabled(False)
+        self._show_status('Exporting %d points...' % self._export_task.num_expected_points)
+
+    def _toggle_continuous_logging(self):
+        if self._continuous_logger is not None:
+            self._stop_continuous_logging()
+            return
+
+        path, _ = self._ask_file_name('Log samples continuously', ['CSV (*.csv)'])
+        if path:
+            try:
+                self._continuous_logger = ContinuousLogger(path)
+            except Exception as ex:
+                show_error('Logging error', 'Could not open log file', ex, self)
+            else:
+                self._show_status('Logging all plotted samples into %s' % path)
+
+        self._continuous_logging_button.setChecked(self._continuous_logger is not None)
+
+    def _stop_continuous_logging(self):
+        if self._continuous_logger is not None:
+            self._continuous_logger.close()
+            self._show_status('%d samples logged into %s' % (self._continuous_logger.num_samples,
+                                                             self._continuous_logger.path))
+            self._continuous_logger = None
+        self._continuous_logging_button.setChecked(False)
 
     def closeEvent(self, qcloseevent):
         super(PlotContainerWidget, self).closeEvent(qcloseevent)
+        self._plot_area.close()                             # Lets the plot area release its resources
+        self._stop_continuous_logging()
         self.on_close()
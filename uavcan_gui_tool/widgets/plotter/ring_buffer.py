@@ -0,0 +1,99 @@
+#
+# Copyright (C) 2016  UAVCAN Development Team  <uavcan.org>
+#
+# This software is distributed under the terms of the MIT License.
+#
+# Author: Pavel Kirienko <pavel.kirienko@zubax.com>
+#
+
+import numpy
+
+
+class RingBuffer:
+    """
+    Fixed-capacity FIFO of float64 samples backed by a NumPy array.
+    Every sample is stored twice, at positions i and i + capacity, so that the retained history is always
+    available as a contiguous view without copying, and appending is O(1).
+    A sample is a scalar by default; a non-empty sample_shape makes every sample an array of that shape.
+    A buffer of zero capacity retains nothing, but still counts the appended samples.
+    """
+    def __init__(self, capacity, sample_shape=()):
+        self._capacity = int(capacity)
+        self._sample_shape = tuple(sample_shape)
+        self._buf = numpy.zeros((self._capacity * 2,) + self._sample_shape, dtype=numpy.float64)
+        self._total = 0         # Number of samples ever appended; reset by clear() and resize()
+        self._reserved = 0      # Same as total, but incremented before the sample is written rather than after
+        self._generation = 0    # Incremented by clear() and resize(), before the buffer is modified
+
+    def __len__(self):
+        return min(self._total, self._capacity)
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    @property
+    def sample_shape(self):
+        return self._sample_shape
+
+    @property
+    def generation(self):
+        """Changes whenever the retained samples are reset, see read()."""
+        return self._generation
+
+    @property
+    def total(self):
+        """Number of samples appended since the last clear(), including those that were already evicted."""
+        return self._total
+
+    def append(self, value):
+        self._reserved = self._total + 1
+        if self._capacity:
+            pos = self._total % self._capacity
+            self._buf[pos] = value
+            self._buf[pos + self._capacity] = value
+        self._total += 1
+
+    def clear(self):
+        self._generation += 1
+        self._total = 0
+        self._reserved = 0
+
+    def resize(self, capacity):
+        """Changes the capacity, retaining as many of the most recent samples as possible."""
+        capacity = int(capacity)
+        self._generation += 1
+        data = self.view()[max(0, len(self) - capacity):]      # Note that [-0:] would retain everything
+        padding = numpy.zeros((capacity - len(data),) + self._sample_shape)
+        self._buf = numpy.concatenate((data, padding, data, padding))
+        self._capacity = capacity
+        self._total = len(data)
+        self._reserved = self._total
+
+    def view(self):
+        """Returns a contiguous view of the retained samples, oldest first. The view must not be modified."""
+        length = len(self)
+        if not length:
+            return self._buf[:0]
+        start = (self._total - length) % self._capacity
+        return self._buf[start:start + length]
+
+    def last(self):
+        return self._buf[(self._total - 1) % self._capacity] if len(self) else None
+
+    def read(self, first, count):
+        """
+        Copies up to 'count' samples starting from the absolute sample number 'first' (see total).
+        This method may be invoked from a different thread than the one that appends: samples that
+        were overwritten during the copy are dropped from the beginning of the result. If the buffer may be
+        cleared or resized concurrently, the result is valid only if the generation was the same before and after.
+        Returns (absolute number of the first returned sample, array).
+        """
+        first = max(first, self._total - len(self))
+        count = max(0, min(count, self._total - first))
+        start = first % self._capacity if count else 0
+        out = self._buf[start:start + count].copy()
+        # Whatever has been appended since we started copying, including a sample that is being written right now,
+        # may have overwritten the oldest part of the copy
+        evicted = max(0, (self._reserved - self._capacity) - first)
+        return first + evicted, out[evicted:]
@@ -0,0 +1,133 @@
+#
+# Copyright (C) 2016  UAVCAN Development Team  <uavcan.org>
+#
+# This software is distributed under the terms of the MIT License.
+#
+# Author: Pavel Kirienko <pavel.kirienko@zubax.com>
+#
+
+import math
+import numpy
+from collections import deque, namedtuple
+
+
+Statistics = namedtuple('Statistics', ['count', 'mean', 'stddev', 'min', 'max', 'rms', 'peak_to_peak'])
+
+
+def find_window(x_buf, x_min, x_max):
+    """
+    Returns the absolute sample numbers [lo, hi) of the samples of a ring buffer where x_min <= x <= x_max.
+    X must be non-decreasing; the search is logarithmic.
+    """
+    x = x_buf.view()
+    oldest = x_buf.total - len(x)
+    lo = int(numpy.searchsorted(x, x_min, side='left'))
+    hi = int(numpy.searchsorted(x, x_max, side='right'))
+    return oldest + lo, oldest + hi
+
+
+class WindowStatistics:
+    """
+    Statistics over a window of consecutive samples of a ring buffer, identified by absolute sample numbers
+    (see RingBuffer.total). When the window slides forward, only the samples that entered or left the window are
+    processed: sums are updated incrementally, and min/max are tracked with monotonic candidate queues.
+    Otherwise the window is recomputed from scratch; a window that did not change is not recomputed at all.
+    Non-finite samples (NaN, infinity) are skipped; the count is the number of finite samples.
+    """
+    RESYNC_INTERVAL = 1000      # Incremental updates before the sums are recomputed to stop rounding error buildup
+
+    def __init__(self):
+        self._lo = 0
+        self._hi = 0
+        self._valid = False
+        self._num_incremental_updates = 0
+        self._reference = 0.0       # Sums are computed relative to this value to reduce cancellation
+        self._sum = 0.0
+        self._sum_squares = 0.0
+        self._num_finite = 0
+        self._min_candidates = deque()     # (sample number, value), values are non-decreasing
+        self._max_candidates = deque()     # (sample number, value), values are non-increasing
+
+    def update(self, y_buf, lo, hi):
+        """
+        Returns Statistics for the samples [lo, hi), or None if the window is empty.
+        If there are no finite samples in the window, all fields except the count are None.
+        """
+        oldest = y_buf.total - len(y_buf)
+        lo = max(lo, oldest)
+        if hi <= lo:
+            self._valid = False
+            return None
+
+        if (lo, hi) != (self._lo, self._hi) or not self._valid:
+            slides_forward = self._valid and self._lo <= lo <= self._hi <= hi and self._lo >= oldest
+            if slides_forward and self._num_incremental_updates < self.RESYNC_INTERVAL:
+                self._slide(y_buf, oldest, lo, hi)
+                self._num_incremental_updates += 1
+            else:
+                self._rebuild(y_buf, oldest, lo, hi)
+                self._num_incremental_updates = 0
+            self._lo, self._hi = lo, hi
+            self._valid = True
+
+        n = self._num_finite
+        if n == 0 or not self._min_candidates or not self._max_candidates:
+            return Statistics(count=0, mean=None, stddev=None, min=None, max=None, rms=None, peak_to_peak=None)
+
+        mean_offset = self._sum / n
+        variance = max(0.0, self._sum_squares / n - mean_offset ** 2)
+        mean = self._reference + mean_offset
+        minimum = self._min_candidates[0][1]
+        maximum = self._max_candidates[0][1]
+        return Statistics(count=n,
+                          mean=mean,
+                          stddev=math.sqrt(variance * n / (n - 1)) if n > 1 else 0.0,
+                          min=minimum,
+                          max=maximum,
+                          rms=math.sqrt(variance + mean ** 2),
+                          peak_to_peak=maximum - minimum)
+
+    def _rebuild(self, y_buf, oldest, lo, hi):
+        y = y_buf.view()[lo - oldest:hi - oldest]
+        finite = numpy.isfinite(y)
+        indexes = numpy.arange(lo, hi)[finite]
+        y = y[finite]
+
+        self._num_finite = len(y)
+        self._reference = float(y[0]) if len(y) else 0.0
+        d = y - self._reference
+        self._sum = float(d.sum())
+        self._sum_squares = float((d * d).sum())
+
+        # Min candidates are the samples that are not greater than any sample following them; same for max
+        suffix_min = numpy.minimum.accumulate(y[::-1])[::-1]
+        suffix_max = numpy.maximum.accumulate(y[::-1])[::-1]
+        self._min_candidates = deque(zip(indexes[y == suffix_min].tolist(), y[y == suffix_min].tolist()))
+        self._max_candidates = deque(zip(indexes[y == suffix_max].tolist(), y[y == suffix_max].tolist()))
+
+    def _slide(self, y_buf, oldest, lo, hi):
+        view = y_buf.view()
+
+        entered = view[self._hi - oldest:hi - oldest]
+        left = view[self._lo - oldest:lo - oldest]
+        entered_finite = numpy.isfinite(entered)
+        left_finite = numpy.isfinite(left)
+        d_entered = entered[entered_finite] - self._reference
+        d_left = left[left_finite] - self._reference
+        self._sum += float(d_entered.sum()) - float(d_left.sum())
+        self._sum_squares += float((d_entered * d_entered).sum()) - float((d_left * d_left).sum())
+        self._num_finite += int(entered_finite.sum()) - int(left_finite.sum())
+
+        for index, value in zip(numpy.arange(self._hi, hi)[entered_finite].tolist(),
+                                entered[entered_finite].tolist()):
+            while self._min_candidates and self._min_candidates[-1][1] > value:
+                self._min_candidates.pop()
+            self._min_candidates.append((index, value))
+            while self._max_candidates and self._max_candidates[-1][1] < value:
+                self._max_candidates.pop()
+            self._max_candidates.append((index, value))
+
+        while self._min_candidates and self._min_candidates[0][0] < lo:
+            self._min_candidates.popleft()
+        while self._max_candidates and self._max_candidates[0][0] < lo:
+            self._max_candidates.popleft()
@@ -0,0 +1,123 @@
+#
+# Copyright (C) 2016  UAVCAN Development Team  <uavcan.org>
+#
+# This software is distributed under the terms of the MIT License.
+#
+# Author: Pavel Kirienko <pavel.kirienko@zubax.com>
+#
+
+from PyQt5.QtWidgets import QWidget, QHBoxLayout, QVBoxLayout, QComboBox, QDoubleSpinBox, QLabel, QTableWidget, \
+    QTableWidgetItem, QHeaderView, QAbstractItemView
+from PyQt5.QtCore import Qt, QTimer
+from .. import get_monospace_font
+from .rolling_statistics import WindowStatistics, find_window
+
+
+MODE_LAST_SECONDS = 'Last N seconds'
+MODE_VISIBLE_RANGE = 'Visible range'
+MODE_SELECTION = 'Reference to cursor'
+
+
+class StatisticsWidget(QWidget):
+    COLUMNS = ['Curve', 'N', 'Mean', 'Stddev', 'Min', 'Max', 'RMS', 'Peak-to-peak']
+
+    def __init__(self, parent, plot_area):
+        super(StatisticsWidget, self).__init__(parent)
+        self.setAttribute(Qt.WA_DeleteOnClose)              # This is required to stop background timers!
+
+        self._plot_area = plot_area
+        # (Y ring buffer, its generation) : WindowStatistics; a curve that was re-created or reset gets a new entry
+        self._window_statistics = {}
+
+        self._update_timer = QTimer(self)
+        self._update_timer.setSingleShot(False)
+        self._update_timer.timeout.connect(self._update)
+
+        self._mode_box = QComboBox(self)
+        self._mode_box.setEditable(False)
+        self._mode_box.addItems([MODE_LAST_SECONDS, MODE_VISIBLE_RANGE, MODE_SELECTION])
+        self._mode_box.setToolTip('Click on the plot to set the reference point for the "%s" mode' % MODE_SELECTION)
+        self._mode_box.currentTextChanged.connect(self._update)
+
+        self._duration_spinbox = QDoubleSpinBox(self)
+        self._duration_spinbox.setMinimum(0.001)
+        self._duration_spinbox.setMaximum(1e6)
+        self._duration_spinbox.setDecimals(3)
+        self._duration_spinbox.setValue(10)
+        self._duration_spinbox.valueChanged.connect(self._update)
+
+        self._table = QTableWidget(self)
+        self._table.setFont(get_monospace_font())
+        self._table.setColumnCount(len(self.COLUMNS))
+        self._table.setHorizontalHeaderLabels(self.COLUMNS)
+        self._table.verticalHeader().setVisible(False)
+        self._table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self._table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self._table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self._table.setMinimumHeight(100)
+
+        controls_layout = QHBoxLayout(self)
+        controls_layout.addWidget(QLabel('Statistics over:', self))
+        controls_layout.addWidget(self._mode_box)
+        controls_layout.addWidget(self._duration_spinbox)
+        controls_layout.addStretch(1)
+
+        layout = QVBoxLayout(self)
+        layout.addLayout(controls_layout)
+        layout.addWidget(self._table, 1)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(layout)
+
+    def setVisible(self, visible):
+        super(StatisticsWidget, self).setVisible(visible)
+        if visible:
+            self._update_timer.start(200)
+        else:
+            self._update_timer.stop()
+
+    def _get_x_range(self, x_buf):
+        mode = self._mode_box.currentText()
+        self._duration_spinbox.setEnabled(mode == MODE_LAST_SECONDS)
+        if mode == MODE_LAST_SECONDS:
+            last = x_buf.last()
+            return None if last is None else (last - self._duration_spinbox.value(), last)
+        if mode == MODE_VISIBLE_RANGE:
+            return self._plot_area.get_visible_x_range()
+        if mode == MODE_SELECTION:
+            return self._plot_area.get_selection()
+
+    def _set_cell(self, row, col, text):
+        item = self._table.item(row, col)
+        if item is None:
+            item = QTableWidgetItem(text)
+            item.setTextAlignment(Qt.AlignVCenter | (Qt.AlignLeft if col == 0 else Qt.AlignRight))
+            self._table.setItem(row, col, item)
+        elif item.text() != text:
+            item.setText(text)
+
+    def _update(self):
+        curves = self._plot_area.get_curves()
+
+        # Forgetting the curves that are no longer plotted or have been reset
+        keys = set((y_buf, y_buf.generation) for _extractor, _idx, _x, y_buf in curves)
+        for k in list(self._window_statistics.keys()):
+            if k not in keys:
+                del self._window_statistics[k]
+
+        if self._table.rowCount() != len(curves):
+            self._table.setRowCount(len(curves))
+
+        for row, (extractor, idx, x_buf, y_buf) in enumerate(curves):
+            ws = self._window_statistics.setdefault((y_buf, y_buf.generation), WindowStatistics())
+            x_range = self._get_x_range(x_buf)
+            stat = ws.update(y_buf, *find_window(x_buf, *x_range)) if x_range is not None else None
+
+            self._set_cell(row, 0, '%s [%d]' % (extractor.extraction_expression.source, idx))
+            if stat is None:
+                cells = ['0'] + ['-'] * (len(self.COLUMNS) - 2)
+            else:
+                cells = ['%d' % stat.count] + ['N/A' if x is None else '%.6g' % x
+                                               for x in (stat.mean, stat.stddev, stat.min, stat.max,
+                                                         stat.rms, stat.peak_to_peak)]
+            for col, text in enumerate(cells):
+                self._set_cell(row, col + 1, text)
@@ -0,0 +1,177 @@
+#
+# Copyright (C) 2016  UAVCAN Development Team  <uavcan.org>
+#
+# This software is distributed under the terms of the MIT License.
+#
+# Author: Pavel Kirienko <pavel.kirienko@zubax.com>
+#
+
+"""
+Stateful functions that can be invoked from the plotter expressions, e.g. "deriv(msg.position)".
+Every call site in an expression gets its own state object, so that "ema(msg.a) - ema(msg.b)" works as expected.
+The state is updated once per evaluation in constant time; the timestamp of the transfer is supplied implicitly.
+"""
+
+import ast
+import math
+import numpy
+from collections import deque
+
+
+def _to_value(x):
+    if isinstance(x, (list, tuple, numpy.ndarray)):
+        return numpy.asarray(x, dtype=numpy.float64)
+    return float(x)
+
+
+def _to_result(x):
+    return x.tolist() if isinstance(x, numpy.ndarray) else x
+
+
+class ExponentialMovingAverage:
+    """ema(x, alpha=0.1) - exponential moving average with the smoothing factor alpha in (0, 1]"""
+    def __init__(self):
+        self._state = None
+
+    def __call__(self, _timestamp, x, alpha=0.1):
+        x = _to_value(x)
+        if self._state is None:
+            self._state = x
+        else:
+            self._state = self._state + (x - self._state) * alpha
+        return _to_result(self._state)
+
+
+class SimpleMovingAverage:
+    """sma(x, n) - arithmetic mean of the last n samples"""
+    RESYNC_INTERVAL = 10000     # Samples between recomputations of the running sum, to stop rounding error buildup
+
+    def __init__(self):
+        self._window = deque()
+        self._sum = 0.0
+        self._num_updates = 0
+
+    def __call__(self, _timestamp, x, n):
+        x = _to_value(x)
+        n = max(1, int(n))
+        self._window.append(x)
+        self._sum = self._sum + x
+        while len(self._window) > n:
+            self._sum = self._sum - self._window.popleft()
+
+        self._num_updates += 1
+        if self._num_updates >= self.RESYNC_INTERVAL:
+            self._num_updates = 0
+            self._sum = sum(self._window)
+
+        return _to_result(self._sum / len(self._window))
+
+
+class Derivative:
+    """deriv(x) - rate of change of x per second; zero until two samples are available"""
+    def __init__(self):
+        self._prev = None
+        self._derivative = 0.0
+
+    def __call__(self, timestamp, x):
+        x = _to_value(x)
+        if self._prev is not None:
+            prev_t, prev_x = self._prev
+            if timestamp > prev_t:
+                self._derivative = (x - prev_x) / (timestamp - prev_t)
+        elif isinstance(x, numpy.ndarray):
+            self._derivative = numpy.zeros_like(x)
+        self._prev = timestamp, x
+        return _to_result(self._derivative)
+
+
+class Integral:
+    """integ(x) - integral of x over time, trapezoidal rule"""
+    def __init__(self):
+        self._prev = None
+        self._integral = 0.0
+
+    def __call__(self, timestamp, x):
+        x = _to_value(x)
+        if self._prev is not None:
+            prev_t, prev_x = self._prev
+            self._integral = self._integral + (x + prev_x) * 0.5 * max(0.0, timestamp - prev_t)
+        elif isinstance(x, numpy.ndarray):
+            self._integral = numpy.zeros_like(x)
+        self._prev = timestamp, x
+        return _to_result(self._integral)
+
+
+class LowPassFilter:
+    """lowpass(x, fc) - first order low-pass filter with the cutoff frequency fc Hz; works with irregular sampling"""
+    def __init__(self):
+        self._prev_t = None
+        self._state = None
+
+    def __call__(self, timestamp, x, fc):
+        x = _to_value(x)
+        if self._state is None:
+            self._state = x
+        else:
+            dt = max(0.0, timestamp - self._prev_t)
+            rc = 1.0 / (2 * math.pi * fc)
+            self._state = self._state + (x - self._state) * (dt / (rc + dt))
+        self._prev_t = timestamp
+        return _to_result(self._state)
+
+
+class Rate:
+    """rate(tau=1.0) - how many times per second the expression is evaluated, smoothed with the time constant tau"""
+    def __init__(self):
+        self._prev_t = None
+        self._rate = 0.0
+
+    def __call__(self, timestamp, tau=1.0):
+        if self._prev_t is not None and timestamp > self._prev_t:
+            dt = timestamp - self._prev_t
+            # Every event is an impulse of area 1; the impulse train is passed through a first order filter
+            decay = math.exp(-dt / tau)
+            self._rate = self._rate * decay + (1 - decay) / dt
+        self._prev_t = timestamp
+        return self._rate
+
+
+SIGNAL_FUNCTIONS = {
+    'ema': ExponentialMovingAverage,
+    'sma': SimpleMovingAverage,
+    'deriv': Derivative,
+    'integ': Integral,
+    'lowpass': LowPassFilter,
+    'rate': Rate,
+}
+
+TIMESTAMP_VARIABLE = '__timestamp__'
+
+
+class _CallSiteTransformer(ast.NodeTransformer):
+    def __init__(self):
+        self.call_sites = []        # (variable name, state object)
+
+    def visit_Call(self, node):
+        self.generic_visit(node)        # Nested invocations get their own states, e.g. deriv(lowpass(x, 10))
+        if isinstance(node.func, ast.Name) and node.func.id in SIGNAL_FUNCTIONS:
+            name = '__signal_%d__' % len(self.call_sites)
+            self.call_sites.append((name, SIGNAL_FUNCTIONS[node.func.id]()))
+            node.func = ast.copy_location(ast.Name(id=name, ctx=ast.Load()), node.func)
+            node.args.insert(0, ast.Name(id=TIMESTAMP_VARIABLE, ctx=ast.Load()))
+        return node
+
+
+def compile_with_signal_functions(source, filename):
+    """
+    Compiles the expression, binding every invocation of a signal function to a new state object.
+    Returns (code object, dict of the variables that must be supplied to eval() in addition to the timestamp).
+    """
+    tree = ast.parse(source, filename, 'eval')
+    transformer = _CallSiteTransformer()
+    tree = ast.fix_missing_locations(transformer.visit(tree))
+    return compile(tree, filename, 'eval'), dict(transformer.call_sites)
+
+
+def describe_signal_functions():
+    return '\n'.join(cls.__doc__ for cls in SIGNAL_FUNCTIONS.values())
@@ -6,6 +6,9 @@
 # Author: Pavel Kirienko <pavel.kirienko@zubax.com>
 #
 
+import time
+from .signal_functions import compile_with_signal_functions, TIMESTAMP_VARIABLE
+
 
 EXPRESSION_VARIABLE_FOR_MESSAGE = 'msg'
 EXPRESSION_VARIABLE_FOR_SRC_NODE_ID = 'src_node_id'
@@ -18,13 +21,15 @@ class Expression:
     def __init__(self, source=None):
         self._source = None
         self._compiled = None
+        self._signal_states = {}
         self.set(source)
 
     def set(self, source):
         source = source.strip()
-        code = compile(str(source), '<custom-expression>', 'eval')  # May throw
+        code, signal_states = compile_with_signal_functions(str(source), '<custom-expression>')  # May throw
         self._source = source
         self._compiled = code
+        self._signal_states = signal_states
 
     @property
     def source(self):
@@ -32,6 +37,8 @@ class Expression:
 
     # noinspection PyShadowingBuiltins
     def evaluate(self, **locals):
+        locals.update(self._signal_states)
+        locals.setdefault(TIMESTAMP_VARIABLE, time.monotonic())
         try:
             return eval(self._compiled, globals(), locals)
         except Exception as ex:
@@ -57,6 +64,7 @@ class Extractor:
         evaluation_kwargs = {
             EXPRESSION_VARIABLE_FOR_MESSAGE: tr.message,
             EXPRESSION_VARIABLE_FOR_SRC_NODE_ID: tr.source_node_id,
+            TIMESTAMP_VARIABLE: tr.ts_mono,
         }
 
         for exp in self.filter_expressions:
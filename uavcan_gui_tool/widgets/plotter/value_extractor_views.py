@@ -15,6 +15,7 @@ from .. import make_icon_button, get_monospace_font, CommitableComboBoxWithHisto
 from ...active_data_type_detector import ActiveDataTypeDetector
 from .value_extractor import EXPRESSION_VARIABLE_FOR_MESSAGE, EXPRESSION_VARIABLE_FOR_SRC_NODE_ID, Expression, \
     Extractor
+from .signal_functions import SIGNAL_FUNCTIONS, describe_signal_functions
 
 
 DEFAULT_COLORS = [
@@ -57,6 +58,7 @@ def _make_expression_completer(owner, data_type):
         return []
 
     suggestions = [(EXPRESSION_VARIABLE_FOR_MESSAGE + x) for x in make_suggestions(data_type)]
+    suggestions += [(x + '(') for x in sorted(SIGNAL_FUNCTIONS.keys())]
 
     model.setStringList(suggestions)
     comp.setModel(model)
@@ -127,7 +129,8 @@ class NewValueExtractorWindow(QDialog):
         # Existence is torment.
         self._extraction_expression_box = QLineEdit(self)
         self._extraction_expression_box.setFont(get_monospace_font())
-        self._extraction_expression_box.setToolTip('Example: msg.cmd[0] / 16384')
+        self._extraction_expression_box.setToolTip('Example: msg.cmd[0] / 16384\n\n'
+                                                   'Stateful functions:\n' + describe_signal_functions())
 
         # Node ID filter
         self._node_id_filter_checkbox = QCheckBox('Accept messages only from specific node', self)
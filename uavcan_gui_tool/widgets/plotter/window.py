@@ -15,30 +15,39 @@ from PyQt5.QtGui import QKeySequence
 from .. import get_app_icon, get_icon
 from .plot_areas import PLOT_AREAS
 from .plot_container import PlotContainerWidget
+from .ingest import IngestWorker
 
 
 logger = logging.getLogger(__name__)
 
 
 class PlotterWindow(QMainWindow):
-    def __init__(self, get_transfer_callback):
+    MIN_UPDATE_INTERVAL = 0.05
+    MAX_UPDATE_INTERVAL = 0.5
+    UPDATE_CPU_BUDGET = 0.25            # Fraction of the GUI thread time that can be spent on updates
+    UPDATE_COST_SMOOTHING_FACTOR = 0.1
+    INGEST_WORKER_JOIN_TIMEOUT = 1.0
+
+    def __init__(self, get_transfer_callback, time_cursor_link):
         super(PlotterWindow, self).__init__()
         self.setWindowTitle('UAVCAN Plotter')
         self.setWindowIcon(get_app_icon())
 
         self._active_data_types = set()
 
-        self._get_transfer = get_transfer_callback
-
         self._update_timer = QTimer(self)
         self._update_timer.setSingleShot(False)
         self._update_timer.timeout.connect(self._update)
-        self._update_timer.start(50)
+        self._update_timer.start(int(self.MIN_UPDATE_INTERVAL * 1000))
+        self._update_cost = 0
 
         self._base_time = time.monotonic()
 
         self._plot_containers = []
 
+        self._time_cursor_link = time_cursor_link
+        self._published_time_cursors = {}       # Plot container : the last published X of its time cursor
+
         #
         # Control menu
         #
@@ -85,7 +94,28 @@ class PlotterWindow(QMainWindow):
         self.setCentralWidget(None)
         self.resize(600, 400)
 
+        # Started last, because the worker accesses the plot containers from its own thread
+        self._ingest_worker = IngestWorker(get_transfer_callback, lambda: list(self._plot_containers))
+        self._ingest_worker.start()
+
+    def shutdown(self):
+        """
+        Stops the ingest worker and waits for it to finish; to be invoked once the event loop has exited.
+        Returns False if the worker did not finish in time.
+        """
+        self._ingest_worker.stop()
+        self._ingest_worker.join(self.INGEST_WORKER_JOIN_TIMEOUT)
+        return not self._ingest_worker.is_alive()
+
+    def closeEvent(self, event):
+        # Plot containers are not closed along with the window, but they hold resources such as temporary files
+        for plc in list(self._plot_containers):
+            plc.close()
+        self._ingest_worker.stop()
+        super(PlotterWindow, self).closeEvent(event)
+
     def _on_stop_toggled(self, checked):
+        self._ingest_worker.discard = checked
         self._pause_action.setChecked(False)
         self.statusBar().showMessage('Stopped' if checked else 'Un-stopped')
 
@@ -95,6 +125,7 @@ class PlotterWindow(QMainWindow):
     def _do_add_new_plot(self, plot_area_name):
         def remove():
             self._plot_containers.remove(plc)
+            self._published_time_cursors.pop(plc, None)
 
         plc = PlotContainerWidget(self, PLOT_AREAS[plot_area_name], self._active_data_types)
         plc.on_close = remove
@@ -124,24 +155,60 @@ class PlotterWindow(QMainWindow):
         logger.info('Reset done, new time base %r', self._base_time)
 
     def _update(self):
+        started_at = time.monotonic()
+        try:
+            self._do_update()
+        finally:
+            self._adjust_update_interval(time.monotonic() - started_at)
+
+    def _adjust_update_interval(self, cost):
+        """The update interval is extended if updates become expensive, so that the GUI remains responsive."""
+        self._update_cost += (cost - self._update_cost) * self.UPDATE_COST_SMOOTHING_FACTOR
+        interval = self._update_cost / self.UPDATE_CPU_BUDGET
+        interval = min(self.MAX_UPDATE_INTERVAL, max(self.MIN_UPDATE_INTERVAL, interval))
+        interval_ms = int(interval * 1000)
+        if abs(interval_ms - self._update_timer.interval()) >= 10:
+            self._update_timer.setInterval(interval_ms)
+
+    def _sync_time_cursor(self):
+        """
+        A time cursor set in one of the plots (by clicking on it) is shown in all other plots and sent to other
+        windows; a time cursor received from other windows is shown in all plots. Time is monotonic, as in transfers.
+        """
+        ts_mono = self._time_cursor_link.take_received()
+
+        for plc in self._plot_containers:
+            x = plc.get_time_cursor()
+            if x is not None and x != self._published_time_cursors.get(plc):
+                self._published_time_cursors[plc] = x
+                ts_mono = x + self._base_time
+                self._time_cursor_link.publish(ts_mono)
+
+        if ts_mono is not None:
+            for plc in self._plot_containers:
+                try:
+                    plc.set_time_cursor(ts_mono - self._base_time)
+                except Exception:
+                    logger.error('Plot container failed to set time cursor', exc_info=True)
+
+    def _do_update(self):
+        self._sync_time_cursor()
+
         if self._stop_action.isChecked():
-            while self._get_transfer() is not None:     # Discarding everything
-                pass
+            self._ingest_worker.take_batch()        # Discarding everything that was extracted before the stop
             return
 
         if not self._pause_action.isChecked():
-            while True:
-                tr = self._get_transfer()
-                if not tr:
-                    break
-
-                self._active_data_types.add(tr.data_type_name)
+            for data_type_name, ts_mono, results in self._ingest_worker.take_batch():
+                self._active_data_types.add(data_type_name)
 
-                for plc in self._plot_containers:
+                for plc, extractor, value in results:
+                    if plc not in self._plot_containers:
+                        continue
                     try:
-                        plc.process_transfer(tr.ts_mono - self._base_time, tr)
+                        plc.add_extracted_value(ts_mono - self._base_time, extractor, value)
                     except Exception:
-                        logger.error('Plot container failed to process a transfer', exc_info=True)
+                        logger.error('Plot container failed to process a value', exc_info=True)
 
         for plc in self._plot_containers:
             try:
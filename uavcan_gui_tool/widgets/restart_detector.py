@@ -0,0 +1,75 @@
+#
+# Copyright (C) 2016  UAVCAN Development Team  <uavcan.org>
+#
+# This software is distributed under the terms of the MIT License.
+#
+# Author: Pavel Kirienko <pavel.kirienko@zubax.com>
+#
+
+from collections import deque
+from logging import getLogger
+
+
+logger = getLogger(__name__)
+
+
+class NodeRestartStats:
+    def __init__(self, windows):
+        self.num_restarts = 0
+        self.last_uptime = None
+        self.in_reboot_loop = False
+        self._recent = {w: deque() for w in windows}        # Window : timestamps of the restarts within it
+
+    def count_recent(self, window):
+        """Number of restarts within the window as of the last update; window must be one of RestartDetector.WINDOWS"""
+        return len(self._recent[window])
+
+    def _update(self, ts_mono, restarted):
+        for window, timestamps in self._recent.items():
+            if restarted:
+                timestamps.append(ts_mono)
+            while timestamps and ts_mono - timestamps[0] > window:
+                timestamps.popleft()
+
+
+class RestartDetector:
+    """
+    Detects restarts of nodes from their NodeStatus messages: a restart is when the uptime goes backwards.
+    Restarts are counted within several sliding time windows; a node that has restarted at least
+    REBOOT_LOOP_THRESHOLD times within REBOOT_LOOP_WINDOW is considered to be in a reboot loop.
+    Every update takes constant amortized time, and nothing is done between updates.
+    """
+    WINDOWS = 60, 600, 3600
+    REBOOT_LOOP_WINDOW = 600
+    REBOOT_LOOP_THRESHOLD = 3
+
+    def __init__(self):
+        self._stats = {}            # Node ID : NodeRestartStats
+
+    def get(self, node_id):
+        """Returns NodeRestartStats of the node, or None if the node has never been seen."""
+        return self._stats.get(node_id)
+
+    def feed(self, node_id, uptime_sec, ts_mono):
+        """Returns True if a restart has been detected."""
+        try:
+            stats = self._stats[node_id]
+        except KeyError:
+            stats = self._stats[node_id] = NodeRestartStats(self.WINDOWS)
+
+        restarted = stats.last_uptime is not None and uptime_sec < stats.last_uptime
+        stats.last_uptime = uptime_sec
+        if restarted:
+            stats.num_restarts += 1
+            logger.info('Node %d has restarted', node_id)
+        stats._update(ts_mono, restarted)
+
+        in_reboot_loop = stats.count_recent(self.REBOOT_LOOP_WINDOW) >= self.REBOOT_LOOP_THRESHOLD
+        if in_reboot_loop != stats.in_reboot_loop:
+            stats.in_reboot_loop = in_reboot_loop
+            if in_reboot_loop:
+                logger.warning('Node %d appears to be in a reboot loop', node_id)
+            else:
+                logger.info('Node %d is no longer in a reboot loop', node_id)
+
+        return restarted
@@ -7,13 +7,22 @@
 #
 
 import time
+import fnmatch
 import pyuavcan_v0
 import logging
-import queue
 from PyQt5.QtWidgets import QWidget, QDialog, QPlainTextEdit, QSpinBox, QHBoxLayout, QVBoxLayout, QComboBox, \
-    QCompleter, QLabel
+    QCompleter, QLabel, QFileDialog
 from PyQt5.QtCore import Qt, QTimer
 from . import CommitableComboBoxWithHistory, make_icon_button, get_monospace_font, show_error, FilterBar
+from .message_snapshot import MessageSnapshotView
+from .message_buffer import MessageBuffer, OVERFLOW_POLICIES, POLICY_SPILL
+from .message_recording import MessageRecorder, ConversionTask, convert_to_yaml, convert_to_csv
+
+
+CONVERSION_FORMATS = {
+    'YAML (*.yaml)': convert_to_yaml,
+    'CSV (*.csv)': convert_to_csv,
+}
 
 
 logger = logging.getLogger(__name__)
@@ -71,6 +80,50 @@ class RateEstimator:
             return (sum(self._hist) / len(self._hist)), self._checkpoint_ts
 
 
+class MessageTypeSelection:
+    """
+    A comma-separated list of full message type names or shell-style patterns,
+    e.g. "uavcan.equipment.*, uavcan.protocol.NodeStatus".
+    """
+    def __init__(self, text):
+        self.patterns = [x.strip() for x in text.split(',') if x.strip()]
+        self._cache = {}            # Data type name : bool
+
+    @property
+    def single_type_name(self):
+        """Returns the data type name if the selection is just one name rather than a set or a pattern."""
+        if len(self.patterns) == 1 and not any(c in self.patterns[0] for c in '*?['):
+            return self.patterns[0]
+
+    def matches(self, data_type_name):
+        try:
+            return self._cache[data_type_name]
+        except KeyError:
+            out = self._cache[data_type_name] = any(fnmatch.fnmatchcase(data_type_name, p) for p in self.patterns)
+            return out
+
+    def get_matching_message_types(self):
+        return [name for name, t in pyuavcan_v0.TYPENAMES.items() if t.kind == t.KIND_MESSAGE and self.matches(name)]
+
+
+class ReceivedMessage:
+    """
+    Keeps only what is needed to render the message later, so that the transfer and its frames can be released.
+    The attributes mimic TransferEvent closely enough for pyuavcan_v0.to_yaml().
+    """
+    class TransferInfo:
+        def __init__(self, tr):
+            self.source_node_id = tr.source_node_id
+            self.dest_node_id = tr.dest_node_id
+            self.ts_monotonic = tr.ts_monotonic
+            self.ts_real = tr.ts_real
+
+    def __init__(self, event, text=None):
+        self.transfer = self.TransferInfo(event.transfer)
+        self.message = event.message
+        self.text = text            # Set if the message was rendered before buffering
+
+
 class SubscriberWindow(QDialog):
     WINDOW_NAME_PREFIX = 'Subscriber'
 
@@ -83,9 +136,15 @@ class SubscriberWindow(QDialog):
         self._active_data_type_detector = active_data_type_detector
         self._active_data_type_detector.message_types_updated.connect(self._update_data_type_list)
 
-        self._message_queue = queue.Queue()
+        # Messages are rendered only when they are about to be displayed, unless a text filter is active; the number
+        # of displayed rows is limited, so older messages can be dropped (or spilled) without rendering.
+        self._message_buffer = MessageBuffer(100)
 
         self._subscriber_handle = None
+        self._type_selection = None
+        self._recorder = None
+        self._finishing_recorder = None     # Stopped, but still writing the queued messages
+        self._conversion_task = None
 
         self._update_timer = QTimer(self)
         self._update_timer.setSingleShot(False)
@@ -102,10 +161,24 @@ class SubscriberWindow(QDialog):
         except AttributeError:      # Old PyQt
             pass
 
+        self._snapshot_view = MessageSnapshotView(self)
+        self._snapshot_view.setVisible(False)
+
+        self._node_id_filter_spinbox = QSpinBox(self)
+        self._node_id_filter_spinbox.setToolTip('Accept messages only from this node')
+        self._node_id_filter_spinbox.setMinimum(0)
+        self._node_id_filter_spinbox.setMaximum(127)
+        self._node_id_filter_spinbox.setSpecialValueText('Any node')
+
+        self._overflow_policy_box = QComboBox(self)
+        self._overflow_policy_box.setToolTip('What to do with non-displayed messages once the queue is full; '
+                                             'the queue is as long as the number of rows')
+        self._overflow_policy_box.addItems(OVERFLOW_POLICIES)
+        self._overflow_policy_box.currentTextChanged.connect(self._on_overflow_policy_changed)
+
         self._num_rows_spinbox = QSpinBox(self)
         self._num_rows_spinbox.setToolTip('Number of rows to display; large number will impair performance')
-        self._num_rows_spinbox.valueChanged.connect(
-            lambda: self._log_viewer.setMaximumBlockCount(self._num_rows_spinbox.value()))
+        self._num_rows_spinbox.valueChanged.connect(self._on_num_rows_changed)
         self._num_rows_spinbox.setMinimum(1)
         self._num_rows_spinbox.setMaximum(1000000)
         self._num_rows_spinbox.setValue(100)
@@ -113,15 +186,24 @@ class SubscriberWindow(QDialog):
         self._num_errors = 0
         self._num_messages_total = 0
         self._num_messages_past_filter = 0
+        self._num_messages_per_type = {}
 
         self._msgs_per_sec_estimator = RateEstimator()
 
         self._num_messages_total_label = QuantityDisplay(self, 'Total', 'msgs')
         self._num_messages_past_filter_label = QuantityDisplay(self, 'Accepted', 'msgs')
-        self._msgs_per_sec_label = QuantityDisplay(self, 'Accepting', 'msg/sec')
+        self._msgs_per_sec_label = QuantityDisplay(self, 'Receiving', 'msg/sec')
+        self._num_types_label = QuantityDisplay(self, 'Received', 'types')
+        self._num_queued_label = QuantityDisplay(self, 'Queued', 'msgs')
+        self._num_dropped_label = QuantityDisplay(self, 'Dropped', 'msgs')
+        self._num_dropped_label.setToolTip('Messages that were not displayed, because the queue overflowed or '
+                                           'newer messages did not leave room in the view')
+        self._num_spilled_label = QuantityDisplay(self, 'Spilled', 'msgs')
+        self._status_label = QLabel(self)
 
         self._type_selector = CommitableComboBoxWithHistory(self)
-        self._type_selector.setToolTip('Name of the message type to subscribe to')
+        self._type_selector.setToolTip('Name of the message type to subscribe to; multiple comma-separated names '
+                                       'and wildcards are accepted, e.g. uavcan.equipment.*')
         self._type_selector.setInsertPolicy(QComboBox.NoInsert)
         completer = QCompleter(self._type_selector)
         completer.setCaseSensitivity(Qt.CaseSensitive)
@@ -133,16 +215,27 @@ class SubscriberWindow(QDialog):
         self._type_selector.setFocus(Qt.OtherFocusReason)
 
         self._active_filter = None
-        self._filter_bar = FilterBar(self)
+        self._filter_bar = FilterBar(self, expression_help='Message is stored in the variable "msg", source node ID '
+                                                           'in "src_node_id"; e.g.: msg.esc_index == 3')
         self._filter_bar.on_filter = self._install_filter
 
         self._start_stop_button = make_icon_button('video-camera', 'Begin subscription', self, checkable=True,
                                                    on_clicked=self._toggle_start_stop)
-        self._pause_button = make_icon_button('pause', 'Pause updates, non-displayed messages will be queued in memory',
-                                              self, checkable=True)
+        self._pause_button = make_icon_button('pause', 'Pause updates, non-displayed messages will be queued according '
+                                              'to the overflow policy', self, checkable=True)
         self._clear_button = make_icon_button('trash-o', 'Clear output and reset stat counters', self,
                                               on_clicked=self._do_clear)
 
+        self._snapshot_button = make_icon_button('sitemap', 'Show the latest value of every field instead of the log; '
+                                                 'text filters are not applied in this mode',
+                                                 self, checkable=True, on_clicked=self._on_view_mode_changed)
+
+        self._record_button = make_icon_button('circle', 'Record received messages into a binary file; messages are '
+                                               'not rendered while recording, use the conversion tool to get YAML '
+                                               'or CSV', self, checkable=True, on_clicked=self._toggle_recording)
+        self._convert_button = make_icon_button('file-text-o', 'Convert a recording into YAML or CSV', self,
+                                                on_clicked=self._do_convert)
+
         self._show_all_message_types = make_icon_button('puzzle-piece',
                                                         'Show all known message types, not only those that are '
                                                         'currently being exchanged over the bus',
@@ -155,18 +248,29 @@ class SubscriberWindow(QDialog):
         controls_layout.addWidget(self._pause_button)
         controls_layout.addWidget(self._clear_button)
         controls_layout.addWidget(self._filter_bar.add_filter_button)
+        controls_layout.addWidget(self._snapshot_button)
+        controls_layout.addWidget(self._record_button)
+        controls_layout.addWidget(self._convert_button)
         controls_layout.addWidget(self._show_all_message_types)
         controls_layout.addWidget(self._type_selector, 1)
+        controls_layout.addWidget(self._node_id_filter_spinbox)
         controls_layout.addWidget(self._num_rows_spinbox)
+        controls_layout.addWidget(self._overflow_policy_box)
 
         layout.addLayout(controls_layout)
         layout.addWidget(self._filter_bar)
         layout.addWidget(self._log_viewer, 1)
+        layout.addWidget(self._snapshot_view, 1)
 
         stats_layout = QHBoxLayout(self)
         stats_layout.addWidget(self._num_messages_total_label)
         stats_layout.addWidget(self._num_messages_past_filter_label)
         stats_layout.addWidget(self._msgs_per_sec_label)
+        stats_layout.addWidget(self._num_types_label)
+        stats_layout.addWidget(self._num_queued_label)
+        stats_layout.addWidget(self._num_dropped_label)
+        stats_layout.addWidget(self._num_spilled_label)
+        stats_layout.addWidget(self._status_label)
         layout.addLayout(stats_layout)
 
         self.setLayout(layout)
@@ -183,27 +287,152 @@ class SubscriberWindow(QDialog):
             return True
         return self._active_filter.match(yaml_message)
 
+    def _has_text_filter(self):
+        return self._active_filter is not None and len(self._active_filter.text_matchers) > 0
+
+    def _apply_field_filter(self, e):
+        """Field expression filters are applied before anything is rendered."""
+        if self._active_filter is None:
+            return True
+        return self._active_filter.match_fields(msg=e.message, src_node_id=e.transfer.source_node_id)
+
+    def _on_num_rows_changed(self):
+        self._log_viewer.setMaximumBlockCount(self._num_rows_spinbox.value())
+        # Every message takes at least one row, so there is no point keeping more messages than rows
+        self._message_buffer.capacity = self._num_rows_spinbox.value()
+
+    def _on_overflow_policy_changed(self, policy):
+        spill_path = None
+        if policy == POLICY_SPILL:
+            # noinspection PyCallByClass
+            spill_path, _ = QFileDialog.getSaveFileName(self, 'Spill non-displayed messages into',
+                                                        'subscriber_spill.yaml', 'YAML (*.yaml)')
+        try:
+            if policy == POLICY_SPILL and not spill_path:
+                raise RuntimeError('No file selected')
+            self._message_buffer.set_policy(policy, spill_path)
+        except Exception as ex:
+            if policy == POLICY_SPILL and spill_path:
+                show_error('Overflow policy', 'Could not open the spill file', ex, self)
+            self._message_buffer.set_policy(self._message_buffer.policy)
+            self._overflow_policy_box.blockSignals(True)
+            self._overflow_policy_box.setCurrentText(self._message_buffer.policy)
+            self._overflow_policy_box.blockSignals(False)
+
+    def _on_transfer(self, tr):
+        """Used instead of a message handler when subscribed to more than one type."""
+        if tr.direction != 'rx' or tr.service_not_message:
+            return
+        if self._type_selection.matches(pyuavcan_v0.get_uavcan_data_type(tr.payload).full_name):
+            self._on_message(pyuavcan_v0.node.TransferEvent(tr, self._node, 'message'))
+
     def _on_message(self, e):
-        # Global statistics
+        # Nothing is rendered here, this is invoked for every message
+        node_id = self._node_id_filter_spinbox.value()
+        if node_id and e.transfer.source_node_id != node_id:
+            return
+
+        data_type_name = pyuavcan_v0.get_uavcan_data_type(e.message).full_name
         self._num_messages_total += 1
+        self._num_messages_per_type[data_type_name] = self._num_messages_per_type.get(data_type_name, 0) + 1
+        self._msgs_per_sec_estimator.register_event(e.transfer.ts_monotonic)
+        if not self._apply_field_filter(e):
+            return
+        if self._recorder is not None:
+            self._recorder.put(e)           # Bypassing the display entirely while recording
+        elif self._snapshot_button.isChecked():
+            self._snapshot_view.add_message(data_type_name, e.transfer.source_node_id, e.message)
+        elif self._has_text_filter():
+            # Text filters need the rendered message; filtering it before buffering ensures that the matching
+            # messages are not pushed out of the buffer by the non-matching ones
+            text = self._render(e)
+            if text is not None:
+                self._message_buffer.append(ReceivedMessage(e, text))
+        else:
+            self._message_buffer.append(ReceivedMessage(e))
+
+    def _on_view_mode_changed(self):
+        snapshot = self._snapshot_button.isChecked()
+        self._snapshot_view.setVisible(snapshot)
+        self._log_viewer.setVisible(not snapshot)
+        self._num_rows_spinbox.setEnabled(not snapshot)
+        self._message_buffer.skip_all()
+
+    def _toggle_recording(self):
+        if self._recorder is not None:
+            self._stop_recording()
+            return
 
-        # Rendering and filtering
+        # noinspection PyCallByClass
+        path, _ = QFileDialog.getSaveFileName(self, 'Record messages into', 'subscriber_recording.bin',
+                                              'Message recordings (*.bin)')
+        if path:
+            try:
+                self._recorder = MessageRecorder(path)
+            except Exception as ex:
+                show_error('Recording error', 'Could not open recording file', ex, self)
+
+        self._record_button.setChecked(self._recorder is not None)
+
+    def _stop_recording(self):
+        """The recorder finishes in the background, the result is reported by _update_recording_status()."""
+        if self._recorder is not None:
+            self._finishing_recorder, self._recorder = self._recorder, None
+            self._finishing_recorder.close()
+            self._status_label.setText('Finishing recording into %s...' % self._finishing_recorder.path)
+        self._record_button.setChecked(False)
+
+    def _update_recording_status(self):
+        if self._finishing_recorder is not None and not self._finishing_recorder.is_alive():
+            recorder, self._finishing_recorder = self._finishing_recorder, None
+            self._status_label.setText('%d msgs recorded into %s' % (recorder.num_recorded, recorder.path))
+            if recorder.error is not None:
+                show_error('Recording error', 'Recording into %s has failed' % recorder.path, recorder.error, self)
+
+        if self._recorder is not None:
+            if self._recorder.error is not None:
+                self._stop_recording()
+                return
+            self._status_label.setText('Recording: %d msgs, %d KiB, %d dropped' %
+                                       (self._recorder.num_recorded, self._recorder.num_bytes // 1024,
+                                        self._recorder.num_dropped))
+
+        if self._conversion_task is not None and not self._conversion_task.is_alive():
+            task, self._conversion_task = self._conversion_task, None
+            self._convert_button.setEnabled(True)
+            if task.error is not None:
+                show_error('Conversion error', 'Could not convert %s' % task.recording_path, task.error, self)
+            else:
+                self._status_label.setText('%d msgs converted into %s' % (task.num_messages, task.output_path))
+
+    def _do_convert(self):
+        # noinspection PyCallByClass
+        recording_path, _ = QFileDialog.getOpenFileName(self, 'Select recording', '', 'Message recordings (*.bin)')
+        if not recording_path:
+            return
+
+        # noinspection PyCallByClass
+        output_path, selected_filter = QFileDialog.getSaveFileName(self, 'Convert recording into', '',
+                                                                   ';;'.join(CONVERSION_FORMATS.keys()))
+        if not output_path:
+            return
+
+        self._conversion_task = ConversionTask(CONVERSION_FORMATS[selected_filter], recording_path, output_path)
+        self._conversion_task.start()
+        self._convert_button.setEnabled(False)
+        self._status_label.setText('Converting %s...' % recording_path)
+
+    def _render(self, msg):
+        """Returns the YAML text, or None if the message is rejected by the filter."""
         try:
-            text = pyuavcan_v0.to_yaml(e)
+            text = pyuavcan_v0.to_yaml(msg)
             if not self._apply_filter(text):
-                return
+                return None
         except Exception as ex:
             self._num_errors += 1
-            text = '!!! [%d] MESSAGE PROCESSING FAILED: %s' % (self._num_errors, ex)
-        else:
-            self._num_messages_past_filter += 1
-            self._msgs_per_sec_estimator.register_event(e.transfer.ts_monotonic)
-
-        # Sending the text for later rendering
-        try:
-            self._message_queue.put_nowait(text)
-        except queue.Full:
-            pass
+            return '!!! [%d] MESSAGE PROCESSING FAILED: %s' % (self._num_errors, ex)
+        self._num_messages_past_filter += 1
+        return text
 
     def _toggle_start_stop(self):
         try:
@@ -226,17 +455,27 @@ class SubscriberWindow(QDialog):
         self._do_stop()
         self._do_clear()
 
-        try:
-            selected_type = self._type_selector.currentText().strip()
-            if not selected_type:
+        selected_type = self._type_selector.currentText().strip()
+        self._type_selection = MessageTypeSelection(selected_type)
+        if not self._type_selection.patterns:
+            return
+
+        if self._type_selection.single_type_name:
+            try:
+                data_type = pyuavcan_v0.TYPENAMES[self._type_selection.single_type_name]
+            except Exception as ex:
+                show_error('Subscription error', 'Could not load requested data type', ex, self)
                 return
-            data_type = pyuavcan_v0.TYPENAMES[selected_type]
-        except Exception as ex:
-            show_error('Subscription error', 'Could not load requested data type', ex, self)
+        elif not self._type_selection.get_matching_message_types():
+            show_error('Subscription error', 'No known message types match the selection', selected_type, self)
             return
 
         try:
-            self._subscriber_handle = self._node.add_handler(data_type, self._on_message)
+            if self._type_selection.single_type_name:
+                self._subscriber_handle = self._node.add_handler(data_type, self._on_message)
+            else:
+                # There is one hook for all matching types; every type is matched against the patterns only once
+                self._subscriber_handle = self._node.add_transfer_hook(self._on_transfer)
         except Exception as ex:
             show_error('Subscription error', 'Could not create requested subscription', ex, self)
             return
@@ -251,18 +490,35 @@ class SubscriberWindow(QDialog):
         estimated_rate = self._msgs_per_sec_estimator.get_rate_with_timestamp()
         self._msgs_per_sec_label.set('N/A' if estimated_rate is None else ('%.0f' % estimated_rate[0]))
 
-        if self._pause_button.isChecked():
+        self._num_queued_label.set(len(self._message_buffer))
+        self._num_dropped_label.set(self._message_buffer.num_dropped)
+        self._num_spilled_label.set(self._message_buffer.num_spilled)
+        self._update_recording_status()
+
+        self._num_types_label.set(len(self._num_messages_per_type))
+        self._num_types_label.setToolTip('\n'.join('%s: %d' % kv for kv in sorted(self._num_messages_per_type.items())))
+
+        if self._pause_button.isChecked() or self._recorder is not None:
             return
 
-        self._log_viewer.setUpdatesEnabled(False)
-        while True:
-            try:
-                text = self._message_queue.get_nowait()
-            except queue.Empty:
-                break
-            else:
-                self._log_viewer.appendPlainText(text + '\n')
+        if self._snapshot_button.isChecked():
+            self._snapshot_view.update_display()
+            return
 
+        # Rendering starts from the newest message and stops once the view is full, the rest would be scrolled out
+        texts = []
+        num_rows = 0
+        while len(self._message_buffer) and num_rows < self._log_viewer.maximumBlockCount():
+            msg = self._message_buffer.pop_newest()
+            text = msg.text if msg.text is not None else self._render(msg)
+            if text is not None:
+                texts.append(text)
+                num_rows += text.count('\n') + 2
+        self._message_buffer.skip_all()
+
+        self._log_viewer.setUpdatesEnabled(False)
+        for text in reversed(texts):
+            self._log_viewer.appendPlainText(text + '\n')
         self._log_viewer.setUpdatesEnabled(True)
 
     def _update_data_type_list(self):
@@ -275,16 +531,21 @@ class SubscriberWindow(QDialog):
         self._type_selector.addItems(items)
 
     def _do_clear(self):
+        self._message_buffer.clear()
+        self._num_messages_per_type = {}
         self._num_messages_total = 0
         self._num_messages_past_filter = 0
         self._do_redraw()
         self._log_viewer.clear()
+        self._snapshot_view.clear()
 
     def closeEvent(self, qcloseevent):
+        self._message_buffer.close()
         try:
-            self._subscriber_handle.close()
+            self._subscriber_handle.remove()
         except Exception:
             pass
+        self._stop_recording()
         super(SubscriberWindow, self).closeEvent(qcloseevent)
 
     @staticmethod
@@ -0,0 +1,94 @@
+#
+# Copyright (C) 2016  UAVCAN Development Team  <uavcan.org>
+#
+# This software is distributed under the terms of the MIT License.
+#
+# Author: Pavel Kirienko <pavel.kirienko@zubax.com>
+#
+
+"""
+Time cursor synchronization between the tool windows that run in separate processes (plotters, bus monitors).
+The cursor is expressed in the monotonic time of the transport layer (ts_monotonic of frames and transfers),
+which is shared by all processes, so every window can map it onto its own data.
+Windows publish the cursor into a common upstream queue; the broker in the main process forwards it into the
+downstream IPC channels of all other windows, where it arrives interleaved with the regular data.
+"""
+
+import queue
+import logging
+import multiprocessing
+from PyQt5.QtCore import QTimer
+
+
+logger = logging.getLogger(__name__)
+
+
+class TimeCursor:
+    def __init__(self, origin, ts_mono):
+        self.origin = origin
+        self.ts_mono = ts_mono
+
+    def __repr__(self):
+        return 'TimeCursor(%r, %r)' % (self.origin, self.ts_mono)
+
+
+class TimeCursorLink:
+    """
+    The window side of the synchronization; it is passed into the child process.
+    """
+    def __init__(self, upstream, origin):
+        self._upstream = upstream
+        self._origin = origin
+        self._received = None
+
+    def publish(self, ts_mono):
+        try:
+            self._upstream.put_nowait(TimeCursor(self._origin, ts_mono))
+        except queue.Full:
+            pass
+
+    def accept(self, cursor):
+        """Invoked by the code that reads the downstream channel when it encounters a TimeCursor object."""
+        self._received = cursor.ts_mono
+
+    def take_received(self):
+        """Returns the latest received cursor position (monotonic time), or None if there was none since last call."""
+        ts_mono, self._received = self._received, None
+        return ts_mono
+
+
+class TimeCursorBroker:
+    POLL_INTERVAL = 50
+
+    def __init__(self, parent):
+        self._upstream = multiprocessing.Queue()
+        self._subscribers = []          # origin, channel
+        self._next_origin = 0
+
+        self._poll_timer = QTimer(parent)
+        self._poll_timer.setSingleShot(False)
+        self._poll_timer.timeout.connect(self._poll)
+        self._poll_timer.start(self.POLL_INTERVAL)
+
+    def add_subscriber(self, channel):
+        """Returns a new TimeCursorLink for the window that receives data from the specified IPC channel."""
+        self._next_origin += 1
+        self._subscribers.append((self._next_origin, channel))
+        return TimeCursorLink(self._upstream, self._next_origin)
+
+    def remove_subscriber(self, channel):
+        self._subscribers = [(o, ch) for o, ch in self._subscribers if ch is not channel]
+
+    def _poll(self):
+        while True:
+            try:
+                cursor = self._upstream.get_nowait()
+            except queue.Empty:
+                break
+
+            for origin, channel in self._subscribers:
+                if origin != cursor.origin:
+                    try:
+                        channel.send_nonblocking(cursor)
+                    except Exception:
+                        logger.error('Could not forward time cursor', exc_info=True)